@@ -1,9 +1,195 @@
 """CLI entry point for alphagenome-viewer."""
 
 import argparse
+import asyncio
 import os
+import subprocess
+import sys
 from pathlib import Path
 
+# Packages that should only load after startup (lazily or in the warm-up)
+HEAVY_PACKAGES = ("alphagenome", "anndata", "grpc", "matplotlib", "pandas", "pyarrow")
+
+
+def _score_batch(args, parser) -> None:
+    """Score a VCF/TSV file of variants, appending NDJSON rows to --output.
+
+    The output file doubles as the checkpoint: rerunning the same command
+    skips variants that already have a result row.
+    """
+    from app.config import OUTPUT_TYPE_DESCRIPTIONS
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.batch import (
+        open_variant_file,
+        parse_variants,
+        read_checkpoint,
+        score_variants_stream,
+        to_ndjson,
+    )
+
+    api_key = args.api_key or os.environ.get("ALPHAGENOME_API_KEY")
+    if not api_key:
+        parser.error("an API key is required (--api-key or $ALPHAGENOME_API_KEY)")
+    unknown = set(args.output_types) - set(OUTPUT_TYPE_DESCRIPTIONS)
+    if unknown:
+        parser.error(f"unknown output types: {', '.join(sorted(unknown))}")
+
+    done = read_checkpoint(args.output)
+    if done:
+        print(f"Resuming: {len(done)} variants already scored", file=sys.stderr)
+    service = AlphaGenomeService(api_key)
+
+    async def run():
+        if args.input == "-":
+            lines = sys.stdin
+        else:
+            lines = open_variant_file(open(args.input, "rb"), args.input)
+        with lines, open(args.output, "a", encoding="utf-8") as out:
+            async for row in score_variants_stream(
+                service,
+                parse_variants(lines),
+                args.output_types,
+                args.concurrency,
+                done,
+            ):
+                if row["type"] in ("progress", "summary"):
+                    counts = ", ".join(
+                        f"{k}={v}" for k, v in row.items() if k != "type"
+                    )
+                    print(f"{row['type']}: {counts}", file=sys.stderr)
+                else:
+                    out.write(to_ndjson(row))
+                    out.flush()
+
+    asyncio.run(run())
+
+
+def _predict_bed(args, parser) -> None:
+    """Predict every region of a BED file, writing NDJSON or Parquet rows."""
+    from app.config import OUTPUT_TYPE_DESCRIPTIONS
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.batch import open_variant_file, to_ndjson
+    from app.services.bulk import (
+        ParquetStream,
+        load_regions,
+        parse_bed,
+        predict_regions_stream,
+    )
+    from app.services.tiling import UNTILEABLE_OUTPUT_TYPES
+
+    api_key = args.api_key or os.environ.get("ALPHAGENOME_API_KEY")
+    if not api_key:
+        parser.error("an API key is required (--api-key or $ALPHAGENOME_API_KEY)")
+    unknown = set(args.output_types) - set(OUTPUT_TYPE_DESCRIPTIONS)
+    if unknown:
+        parser.error(f"unknown output types: {', '.join(sorted(unknown))}")
+    unsupported = UNTILEABLE_OUTPUT_TYPES.intersection(args.output_types)
+    if unsupported:
+        parser.error(f"unsupported output types: {', '.join(sorted(unsupported))}")
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "ndjson")
+
+    if args.input == "-":
+        lines = sys.stdin
+    else:
+        lines = open_variant_file(open(args.input, "rb"), args.input)
+    with lines:
+        try:
+            regions, errors = load_regions(parse_bed(lines))
+        except ValueError as e:
+            parser.error(str(e))
+    service = AlphaGenomeService(api_key)
+
+    async def run():
+        rows = predict_regions_stream(
+            service,
+            regions,
+            errors,
+            args.output_types,
+            args.ontology_terms,
+            args.concurrency,
+            args.width,
+        )
+        writer = ParquetStream(with_values=args.width is not None)
+        buffered = []
+        with open(args.output, "wb") as out:
+            async for row in rows:
+                if row["type"] in ("plan", "progress", "summary"):
+                    counts = ", ".join(
+                        f"{k}={v}" for k, v in row.items() if k != "type"
+                    )
+                    print(f"{row['type']}: {counts}", file=sys.stderr)
+                if fmt == "parquet":
+                    buffered.append(row)
+                    if row["type"] in ("progress", "summary"):
+                        out.write(writer.write(buffered))
+                        buffered = []
+                elif row["type"] in ("result", "error"):
+                    out.write(to_ndjson(row).encode("utf-8"))
+            if fmt == "parquet":
+                out.write(writer.close())
+
+    asyncio.run(run())
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        entries.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return entries
+
+
+def _profile_imports(args, parser) -> None:
+    """Time the import of a module in a fresh interpreter, by package.
+
+    Exits with status 1 if the import takes longer than --budget-ms, or if
+    a heavy package is loaded and --allow-heavy is not set.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        parser.error(f"importing {args.module} failed:\n{result.stderr[-2000:]}")
+
+    entries = parse_importtime(result.stderr)
+    total_ms = sum(self_us for _, self_us, _ in entries) / 1000
+    packages: dict[str, int] = {}
+    for name, self_us, _ in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    heavy = sorted(set(HEAVY_PACKAGES) & set(packages))
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(entries)} modules")
+    print(f"\nTop {args.top} packages (self time):")
+    for package, self_us in sorted(packages.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+    print(f"\nTop {args.top} modules (cumulative time):")
+    for name, _, cumulative_us in sorted(entries, key=lambda e: -e[2])[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print(f"\nHeavy packages loaded: {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if heavy and not args.allow_heavy:
+        print("FAIL: heavy packages are imported eagerly", file=sys.stderr)
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(
+            f"FAIL: {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget",
+            file=sys.stderr,
+        )
+        failed = True
+    if failed:
+        sys.exit(1)
+
 
 def main():
     """Launch the AlphaGenome Viewer server."""
@@ -25,6 +211,114 @@ def main():
         default=None,
         help="Directory for generated plots (default: ./plots)",
     )
+    parser.add_argument(
+        "--annotation-cache-dir",
+        default=None,
+        help="Directory for the GENCODE annotation cache "
+        "(default: ~/.cache/alphagenome-viewer)",
+    )
+    parser.add_argument(
+        "--gtf-path",
+        default=None,
+        help="Local GENCODE GTF feather/Arrow file to use instead of downloading",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser(
+        "score-batch",
+        help="Score variants from a VCF/TSV file without starting the server",
+    )
+    batch.add_argument("input", help="VCF/TSV file (optionally .gz), or - for stdin")
+    batch.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="NDJSON output file; also the checkpoint used to resume a run",
+    )
+    batch.add_argument(
+        "--output-types",
+        nargs="+",
+        default=["RNA_SEQ"],
+        help="Output types to score (default: RNA_SEQ)",
+    )
+    batch.add_argument(
+        "--api-key",
+        default=None,
+        help="AlphaGenome API key (default: $ALPHAGENOME_API_KEY)",
+    )
+    batch.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Variants scored concurrently (default: 4)",
+    )
+    bed = subparsers.add_parser(
+        "predict-bed",
+        help="Predict tracks for every region of a BED file without the server",
+    )
+    bed.add_argument("input", help="BED file (optionally .gz), or - for stdin")
+    bed.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Output file; Parquet if it ends in .parquet, NDJSON otherwise",
+    )
+    bed.add_argument(
+        "--format",
+        choices=["ndjson", "parquet"],
+        default=None,
+        help="Output format (default: from the output file extension)",
+    )
+    bed.add_argument(
+        "--output-types",
+        nargs="+",
+        default=["RNA_SEQ"],
+        help="Output types to predict (default: RNA_SEQ)",
+    )
+    bed.add_argument(
+        "--ontology-terms",
+        nargs="*",
+        default=[],
+        help="Ontology terms to restrict tracks to (default: all)",
+    )
+    bed.add_argument(
+        "--width",
+        type=int,
+        default=None,
+        help="Include each region's values, downsampled to at most this many bins",
+    )
+    bed.add_argument(
+        "--api-key",
+        default=None,
+        help="AlphaGenome API key (default: $ALPHAGENOME_API_KEY)",
+    )
+    bed.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Windows predicted concurrently (default: 4)",
+    )
+    profile = subparsers.add_parser(
+        "profile-imports",
+        help="Report import time of the server app by package and module",
+    )
+    profile.add_argument(
+        "--module", default="app.main", help="Module to import (default: app.main)"
+    )
+    profile.add_argument(
+        "--top", type=int, default=15, help="Rows per table (default: 15)"
+    )
+    profile.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Exit with status 1 if the import takes longer than this",
+    )
+    profile.add_argument(
+        "--allow-heavy",
+        action="store_true",
+        help="Do not fail when SDK, pandas, pyarrow or matplotlib load eagerly",
+    )
     args = parser.parse_args()
 
     # Set PLOTS_DIR: CLI arg > existing env var > default (cwd/plots)
@@ -33,6 +327,21 @@ def main():
     elif "PLOTS_DIR" not in os.environ:
         os.environ["PLOTS_DIR"] = os.path.join(os.getcwd(), "plots")
 
+    if args.annotation_cache_dir:
+        os.environ["ANNOTATION_CACHE_DIR"] = os.path.abspath(args.annotation_cache_dir)
+    if args.gtf_path:
+        os.environ["GTF_PATH"] = os.path.abspath(args.gtf_path)
+
+    if args.command == "score-batch":
+        _score_batch(args, batch)
+        return
+    if args.command == "predict-bed":
+        _predict_bed(args, bed)
+        return
+    if args.command == "profile-imports":
+        _profile_imports(args, profile)
+        return
+
     # Point to bundled frontend if present and not already overridden
     if "FRONTEND_DIST_DIR" not in os.environ:
         bundled_frontend = Path(__file__).parent / "frontend_dist"
@@ -47,6 +356,12 @@ def main():
         print(f"Serving frontend from: {os.environ['FRONTEND_DIST_DIR']}")
     else:
         print("No bundled frontend found - API-only mode")
+
+    # Workers build (under a file lock) and load the shared annotation cache
+    # in the background, so the port is bound without waiting for it
+    from app.config import ANNOTATION_CACHE_DIR
+
+    print(f"Gene annotations: {ANNOTATION_CACHE_DIR}")
     print()
 
     uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
@@ -1,10 +1,178 @@
 """Configuration and constants."""
 
 import os
+import secrets
 
 # Plots directory (override with $PLOTS_DIR for container deployments)
 PLOTS_DIR = os.environ.get("PLOTS_DIR", os.path.join(os.getcwd(), "plots"))
 
+# Plot files are content-addressed; the collector keeps PLOTS_DIR under a byte
+# quota and drops plots unused for PLOTS_TTL seconds
+PLOTS_MAX_BYTES = int(os.environ.get("PLOTS_MAX_BYTES", str(2 * 1024**3)))
+PLOTS_TTL = float(os.environ.get("PLOTS_TTL", str(7 * 24 * 3600)))
+PLOTS_GC_INTERVAL = 300.0  # seconds between collection passes
+PLOT_CACHE_MAX_AGE = 31536000  # Cache-Control max-age for /plots
+PLOT_DPI = 150
+PLOT_STYLE_VERSION = 2  # bump when plot styling changes to invalidate files
+
+# GENCODE annotation store (Arrow IPC, memory-mapped by every worker).
+# $GTF_PATH points at a local GTF feather/Arrow file to avoid the download.
+# The cache file name adds a hash of the source to ANNOTATION_FILENAME.
+ANNOTATION_CACHE_DIR = os.environ.get(
+    "ANNOTATION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "alphagenome-viewer"),
+)
+GTF_PATH = os.environ.get("GTF_PATH", "")
+ANNOTATION_FILENAME = "gencode.v46.mane_select.arrow"
+
+# Track metadata catalog (tracks and ontology terms per output type): fetched
+# from the API once, persisted next to the annotations and refetched when
+# older than ONTOLOGY_CATALOG_TTL seconds
+ONTOLOGY_CATALOG_FILENAME = "output_metadata.human.arrow"
+ONTOLOGY_CATALOG_TTL = float(os.environ.get("ONTOLOGY_CATALOG_TTL", str(7 * 24 * 3600)))
+ONTOLOGY_CATALOG_RETRY = 60.0  # seconds before retrying a failed fetch
+ONTOLOGY_SEARCH_LIMIT = 20
+ONTOLOGY_SEARCH_MAX_LIMIT = 100
+
+# Number of extracted transcript sets kept per resized interval
+TRANSCRIPT_CACHE_SIZE = 256
+
+# Prediction cache budget in bytes (per worker process)
+PREDICTION_CACHE_MAX_BYTES = int(
+    os.environ.get("PREDICTION_CACHE_MAX_BYTES", str(1024**3))
+)
+
+# Per-track statistics: reported percentiles, and the number of evenly spaced
+# bins they are computed over for long tracks
+TRACK_STATS_PERCENTILES = (5.0, 50.0, 95.0)
+TRACK_STATS_PERCENTILE_SAMPLE = 65536
+
+# Zoom pyramid: bins merged by the first summary level (doubling above it)
+PYRAMID_MIN_FACTOR = 4
+
+# Contact maps: bins per side of a served tile, and the largest level (bins
+# per side) and number of tracks drawn into a plot
+CONTACT_TILE_SIZE = 256
+CONTACT_PLOT_MAX_BINS = 256
+CONTACT_PLOT_MAX_TRACKS = 10
+
+# Request path: executor sizes and concurrency limits for heavy endpoints
+SDK_EXECUTOR_WORKERS = int(os.environ.get("SDK_EXECUTOR_WORKERS", "16"))
+PLOT_EXECUTOR_WORKERS = int(os.environ.get("PLOT_EXECUTOR_WORKERS", "1"))
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", "16"))
+MAX_CONCURRENT_REQUESTS_PER_KEY = int(
+    os.environ.get("MAX_CONCURRENT_REQUESTS_PER_KEY", "4")
+)
+MAX_QUEUED_REQUESTS = int(os.environ.get("MAX_QUEUED_REQUESTS", "64"))
+MAX_QUEUED_REQUESTS_PER_KEY = int(os.environ.get("MAX_QUEUED_REQUESTS_PER_KEY", "8"))
+QUEUE_TIMEOUT = 30.0  # seconds a request may wait for a slot
+RETRY_AFTER_SECONDS = 5
+
+# Plot renderer processes (0 renders in-process on the plot executor)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_START_METHOD = os.environ.get("RENDER_START_METHOD", "spawn")
+
+# Tiled predictions for intervals wider than the largest model window:
+# windows overlap by 2 * TILE_MARGIN and the stitched interval is snapped to a
+# TILE_ALIGN grid (a multiple of every 1D output resolution). Besides the
+# width, the stitched float32 arrays of all output types must fit in
+# TILED_MAX_BYTES
+TILED_MAX_WIDTH = int(os.environ.get("TILED_MAX_WIDTH", "10000000"))
+TILED_MAX_BYTES = int(os.environ.get("TILED_MAX_BYTES", str(1024**3)))
+TILE_MARGIN = 65536
+TILE_ALIGN = 2048
+TILE_CONCURRENCY = int(os.environ.get("TILE_CONCURRENCY", "4"))
+
+# Multi-allelic variant predictions: ALT alleles per request and concurrent
+# ALT arms
+VARIANT_MAX_ALLELES = 8
+VARIANT_ALLELE_CONCURRENCY = 4
+
+# Variant effect stats: windows centered on the variant (base pairs, narrowest
+# first) for log2((ALT + pseudocount) / (REF + pseudocount)) of summed signal
+VARIANT_EFFECT_WINDOWS = (101, 501, 2001)
+VARIANT_EFFECT_PSEUDOCOUNT = 1.0
+
+# /metrics latency histogram buckets (seconds), and the request duration
+# above which the per-stage breakdown is logged (0 disables the slow log)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "0"))
+
+# AlphaGenome API calls per API key: an AIMD concurrency window (+1 per
+# round of successful calls, x DECREASE_FACTOR on throttling or transient
+# errors), a cooldown after throttling and jittered exponential retries
+REMOTE_INITIAL_CONCURRENCY = int(os.environ.get("REMOTE_INITIAL_CONCURRENCY", "4"))
+REMOTE_MIN_CONCURRENCY = 1
+REMOTE_MAX_CONCURRENCY = int(os.environ.get("REMOTE_MAX_CONCURRENCY", "16"))
+REMOTE_DECREASE_FACTOR = 0.5
+REMOTE_MAX_RETRIES = int(os.environ.get("REMOTE_MAX_RETRIES", "3"))
+REMOTE_RETRY_BASE = 0.5  # seconds; the backoff cap doubles per attempt
+REMOTE_RETRY_MAX = 20.0
+REMOTE_THROTTLE_COOLDOWN = float(os.environ.get("REMOTE_THROTTLE_COOLDOWN", "5"))
+REMOTE_QUEUE_TIMEOUT = 60.0  # seconds a call may wait for a slot
+REMOTE_STATE_IDLE_TIMEOUT = 900.0  # forget a key's window after this idle time
+
+# Response compression: complete bodies of at least COMPRESSION_MIN_BYTES are
+# brotli- (with the optional package) or gzip-compressed when the client
+# accepts it; bodies above COMPRESSION_THREAD_BYTES compress off the event loop
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = 4  # within 1% of level 6 on JSON at half the time
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_THREAD_BYTES = 1024**2
+
+# Concurrent score_variant calls when scorers exceed the per-request maximum
+SCORE_VARIANT_MAX_WORKERS = 4
+
+# Batch variant scoring (checkpoints let interrupted runs resume)
+BATCH_CHECKPOINT_DIR = os.environ.get(
+    "BATCH_CHECKPOINT_DIR", os.path.join(os.getcwd(), "checkpoints")
+)
+BATCH_CONCURRENCY = 4  # default concurrent variants per batch run
+BATCH_MAX_CONCURRENCY = 16
+BATCH_PROGRESS_EVERY = 25  # emit a progress row every N scored variants
+BATCH_PARSE_CHUNK = 256  # input records parsed per executor call
+
+# Background jobs: any prediction/scoring endpoint can run as a job from a
+# SQLite queue shared by all worker processes; finished jobs are kept for
+# JOBS_TTL seconds
+JOBS_DB_PATH = os.environ.get(
+    "JOBS_DB_PATH",
+    os.path.join(
+        os.environ.get(
+            "XDG_STATE_HOME", os.path.join(os.path.expanduser("~"), ".local", "state")
+        ),
+        "alphagenome-viewer",
+        "jobs.sqlite3",
+    ),
+)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))  # per server process
+JOBS_TTL = float(os.environ.get("JOBS_TTL", str(24 * 3600)))
+JOB_MAX_QUEUED_PER_KEY = int(os.environ.get("JOB_MAX_QUEUED_PER_KEY", "100"))
+JOB_MAX_REQUEST_BYTES = 64 * 1024**2
+JOB_MAX_RESULT_BYTES = int(os.environ.get("JOB_MAX_RESULT_BYTES", str(256 * 1024**2)))
+JOB_MAX_ATTEMPTS = 3  # runs of a job whose worker process died
+JOB_POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+JOB_PROGRESS_INTERVAL = 0.5  # seconds between progress/heartbeat writes
+JOB_LEASE_SECONDS = 30.0  # running jobs without a heartbeat are requeued
+
+# Bulk BED interval predictions: regions per upload and concurrent windows
+BULK_MAX_REGIONS = int(os.environ.get("BULK_MAX_REGIONS", "10000"))
+BULK_CONCURRENCY = 4
+BULK_MAX_CONCURRENCY = 16
+
+# Cached score result sets for cursor pagination
+SCORE_RESULT_TTL = float(os.environ.get("SCORE_RESULT_TTL", "1800"))
+SCORE_RESULT_MAX_ENTRIES = 256
+# Key signing pagination cursors; set it when several workers serve one API,
+# otherwise each process signs with its own random key
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET") or secrets.token_hex(32)
+
+# AlphaGenome client pool: one gRPC channel per API key, reused across requests
+CLIENT_POOL_MAX_SIZE = int(os.environ.get("CLIENT_POOL_MAX_SIZE", "32"))
+CLIENT_POOL_IDLE_TIMEOUT = float(os.environ.get("CLIENT_POOL_IDLE_TIMEOUT", "900"))
+CLIENT_POOL_HEALTH_CHECK_INTERVAL = 30.0  # seconds between channel checks
+CLIENT_POOL_HEALTH_CHECK_TIMEOUT = 5.0  # seconds to wait for a channel
+
 # Sequence length options (in base pairs)
 # Must match AlphaGenome model's supported lengths
 SEQUENCE_LENGTHS = {
@@ -14,6 +182,49 @@ SEQUENCE_LENGTHS = {
     1048576: "1MB",
 }
 
+# GRCh38 chromosome lengths (base pairs)
+CHROMOSOME_LENGTHS = {
+    "chr1": 248956422,
+    "chr2": 242193529,
+    "chr3": 198295559,
+    "chr4": 190214555,
+    "chr5": 181538259,
+    "chr6": 170805979,
+    "chr7": 159345973,
+    "chr8": 145138636,
+    "chr9": 138394717,
+    "chr10": 133797422,
+    "chr11": 135086622,
+    "chr12": 133275309,
+    "chr13": 114364328,
+    "chr14": 107043718,
+    "chr15": 101991189,
+    "chr16": 90338345,
+    "chr17": 83257441,
+    "chr18": 80373285,
+    "chr19": 58617616,
+    "chr20": 64444167,
+    "chr21": 46709983,
+    "chr22": 50818468,
+    "chrX": 156040895,
+    "chrY": 57227415,
+}
+
+# Base pairs per bin of each output type
+OUTPUT_RESOLUTIONS = {
+    "ATAC": 1,
+    "CAGE": 1,
+    "DNASE": 1,
+    "RNA_SEQ": 1,
+    "CHIP_HISTONE": 128,
+    "CHIP_TF": 128,
+    "SPLICE_SITES": 1,
+    "SPLICE_SITE_USAGE": 1,
+    "SPLICE_JUNCTIONS": 1,
+    "CONTACT_MAPS": 2048,
+    "PROCAP": 1,
+}
+
 # Output type descriptions
 OUTPUT_TYPE_DESCRIPTIONS = {
     "ATAC": "ATAC-seq chromatin accessibility",
@@ -1,19 +1,84 @@
 """FastAPI application for AlphaGenome Viewer."""
 
+import importlib
+import logging
 import os
+import threading
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from app.config import PLOTS_DIR
-from app.routers import config, metadata, predictions, variants
+from app.routers import config, jobs, metadata, predictions, variants
+from app.services.client_pool import client_pool
+from app.services.executors import limiter
+from app.services.jobs import job_runner
+from app.services.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.services.ontology_catalog import ontology_catalog
+from app.services.plot_store import PlotFiles, plot_store
+from app.services.prediction_cache import prediction_cache
+from app.services.render_pool import render_pool
+from app.services.result_cache import score_results
+from app.services.scheduler import remote_scheduler
+from app.services.serialization import CompressionMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+# Heavy modules the routers import on first use (the AlphaGenome SDK, pandas,
+# pyarrow); loaded by the warm-up thread once the server is accepting requests
+WARM_UP_MODULES = (
+    "app.services.alphagenome",
+    "app.services.scores",
+    "app.services.batch",
+    "app.services.bulk",
+    "app.services.track_export",
+)
+
+
+_warmed_up = threading.Event()
+
+
+def _warm_up():
+    """Import heavy modules and load gene annotations off the event loop."""
+    modules = list(WARM_UP_MODULES)
+    if not render_pool.workers:
+        modules.append("app.services.visualization")  # plots render in-process
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.exception("Warm-up import of %s failed", name)
+    try:
+        from app.services.alphagenome import AlphaGenomeService
+
+        AlphaGenomeService.warm_up()
+    except Exception:
+        logger.exception("Annotation warm-up failed; will retry on first request")
+    _warmed_up.set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background warm-up without delaying the server from binding."""
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    render_pool.start()
+    plot_store.start()
+    job_runner.start(app)
+    yield
+    await job_runner.stop()
+    plot_store.stop()
+    render_pool.shutdown()
+
 
 app = FastAPI(
     title="AlphaGenome Viewer API",
     version="1.0.1",
     description="API for AlphaGenome genomic predictions",
+    lifespan=lifespan,
 )
 
 # CORS middleware — configurable via $CORS_ORIGINS (comma-separated)
@@ -26,21 +91,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure plots directory exists and mount static files
+# Response compression; added first so it runs inside MetricsMiddleware's trace
+app.add_middleware(CompressionMiddleware)
+# Request latency, in-flight gauges and per-stage traces for /metrics
+app.add_middleware(MetricsMiddleware)
+
+registry.register_stats(
+    "alphagenome_prediction_cache",
+    prediction_cache.stats,
+    counters=("hits", "misses", "coalesced", "evictions"),
+)
+registry.register_stats(
+    "alphagenome_score_results", score_results.stats, counters=("hits", "misses")
+)
+registry.register_stats(
+    "alphagenome_plots",
+    plot_store.stats,
+    counters=("hits", "renders", "coalesced", "evictions"),
+)
+registry.register_stats("alphagenome_client_pool", client_pool.stats)
+registry.register_stats("alphagenome_limiter", limiter.stats)
+registry.register_stats("alphagenome_render_pool", render_pool.stats)
+registry.register_stats(
+    "alphagenome_jobs",
+    job_runner.stats,
+    counters=("submitted", "succeeded", "failed", "cancelled", "requeued"),
+)
+registry.register_stats(
+    "alphagenome_ontology_catalog",
+    ontology_catalog.stats,
+    counters=("fetches", "fetch_errors"),
+)
+registry.register_stats(
+    "alphagenome_remote",
+    remote_scheduler.stats,
+    counters=("calls", "retries", "throttled", "failed", "rejected"),
+)
+
+# Ensure plots directory exists and mount content-addressed plot files
 os.makedirs(PLOTS_DIR, exist_ok=True)
-app.mount("/plots", StaticFiles(directory=PLOTS_DIR), name="plots")
+app.mount("/plots", PlotFiles(directory=PLOTS_DIR), name="plots")
 
 # Include routers
 app.include_router(metadata.router, prefix="/api/metadata", tags=["metadata"])
 app.include_router(predictions.router, prefix="/api/predict", tags=["predictions"])
 app.include_router(variants.router, prefix="/api", tags=["variants"])
 app.include_router(config.router, prefix="/api/config", tags=["config"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+
+# Every prediction and scoring endpoint can also run as a background job
+jobs.allow_routes(predictions.router, "/api/predict")
+jobs.allow_routes(variants.router, "/api")
 
 
 @app.get("/health")
-def health():
-    """Health check endpoint."""
-    return {"status": "ok"}
+async def health():
+    """Health check endpoint; answers before the warm-up has finished."""
+    return {"status": "ok", "warmed_up": _warmed_up.is_set()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this worker process."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
 
 
 @app.exception_handler(Exception)
@@ -11,12 +11,13 @@ class SetApiKeyRequest(BaseModel):
 
 
 @router.post("/api-key")
-def validate_api_key(request: SetApiKeyRequest):
+async def validate_api_key(request: SetApiKeyRequest):
     """Validate an API key against the AlphaGenome API."""
     try:
-        from alphagenome.models import dna_client
+        from app.services.client_pool import client_pool
+        from app.services.executors import run_sdk
 
-        dna_client.create(request.api_key.strip())
+        await run_sdk(client_pool.get, request.api_key.strip())
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid API key: {e}")
 
@@ -0,0 +1,218 @@
+"""Background job endpoints: submit, poll, stream progress, fetch, cancel."""
+
+import asyncio
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+
+from app.config import JOB_MAX_REQUEST_BYTES, JOB_PROGRESS_INTERVAL
+from app.schemas.models import JobInfo, JobListResponse, JobStatus
+from app.services.client_pool import hash_api_key
+from app.services.jobs import (
+    FORWARDED_HEADERS,
+    TERMINAL_STATES,
+    QueueFull,
+    job_runner,
+    job_store,
+)
+
+router = APIRouter()
+
+# POST endpoints that may run as jobs, registered by `allow_routes`
+_targets: set[str] = set()
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def allow_routes(api_router: APIRouter, prefix: str) -> None:
+    """Let every POST endpoint of `api_router` (mounted at `prefix`) run as a job."""
+    for route in api_router.routes:
+        if isinstance(route, APIRoute) and "POST" in route.methods:
+            _targets.add(prefix + route.path)
+
+
+def _timestamp(value: float | None) -> datetime | None:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _job_info(job: dict) -> JobInfo:
+    finished = job["status"] in TERMINAL_STATES and job["result_status"] is not None
+    return JobInfo(
+        job_id=job["id"],
+        endpoint=job["path"] + (f"?{job['query']}" if job["query"] else ""),
+        status=job["status"],
+        priority=job["priority"],
+        attempts=job["attempts"],
+        created_at=_timestamp(job["created_at"]),
+        started_at=_timestamp(job["started_at"]),
+        finished_at=_timestamp(job["finished_at"]),
+        queue_position=job.get("queue_position"),
+        cancel_requested=job["cancel_requested"],
+        progress=job["progress"],
+        result_url=f"/api/jobs/{job['id']}/result" if finished else None,
+        result_status=job["result_status"],
+        result_type=job["result_type"],
+        result_bytes=job["result_bytes"],
+        error=job["error"],
+    )
+
+
+async def _get_job(job_id: str, x_api_key: str) -> dict:
+    job = await asyncio.to_thread(
+        job_store.get, job_id, hash_api_key(x_api_key.strip())
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("", response_model=JobListResponse)
+async def list_jobs(
+    status: JobStatus | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    x_api_key: str = Header(...),
+):
+    """List this API key's jobs, newest first."""
+    jobs = await asyncio.to_thread(
+        job_store.list,
+        hash_api_key(x_api_key.strip()),
+        status.value if status else None,
+        limit,
+    )
+    return JobListResponse(jobs=[_job_info(job) for job in jobs])
+
+
+@router.post("/{endpoint:path}", status_code=202, response_model=JobInfo)
+async def submit_job(
+    endpoint: str,
+    request: Request,
+    response: Response,
+    priority: int = Query(0, ge=-100, le=100),
+    x_api_key: str = Header(...),
+):
+    """Run a prediction or scoring endpoint in the background.
+
+    `POST /api/jobs/predict/interval` takes exactly what
+    `POST /api/predict/interval` takes (JSON body, form upload, query
+    parameters and X-API-Key header) and returns a job immediately. Runners
+    are shared fairly across API keys; among one key's jobs, those with a
+    higher `priority` are started first. The request is validated when the
+    job runs; validation errors become the job's result.
+    """
+    path = "/api/" + endpoint.strip("/")
+    if path not in _targets:
+        raise HTTPException(
+            status_code=404, detail=f"{path} cannot be run as a background job"
+        )
+
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > JOB_MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail="Request body is too large")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > JOB_MAX_REQUEST_BYTES:
+            raise HTTPException(status_code=413, detail="Request body is too large")
+        chunks.append(chunk)
+
+    headers = [
+        (name, value)
+        for name, value in request.headers.items()
+        if name in FORWARDED_HEADERS
+    ]
+    query = urlencode(
+        [(k, v) for k, v in request.query_params.multi_items() if k != "priority"]
+    )
+    owner = hash_api_key(x_api_key.strip())
+    try:
+        job_id = await asyncio.to_thread(
+            job_store.submit,
+            owner,
+            "POST",
+            path,
+            query,
+            headers,
+            b"".join(chunks),
+            priority,
+        )
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    job_runner.notify()
+
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    job = await asyncio.to_thread(job_store.get, job_id, owner)
+    return _job_info(job)
+
+
+@router.get("/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str, x_api_key: str = Header(...)):
+    """Status, queue position and per-stage progress of a job."""
+    return _job_info(await _get_job(job_id, x_api_key))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, x_api_key: str = Header(...)):
+    """Server-sent events: a `job` event whenever status or progress changes.
+
+    The stream ends after the event for a finished, failed or cancelled job.
+    """
+    owner = hash_api_key(x_api_key.strip())
+    job = await _get_job(job_id, x_api_key)
+
+    async def stream():
+        nonlocal job
+        last, idle = None, 0.0
+        while True:
+            payload = _job_info(job).model_dump_json()
+            if payload != last:
+                yield f"event: job\ndata: {payload}\n\n"
+                last, idle = payload, 0.0
+            elif idle >= SSE_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            if job["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(JOB_PROGRESS_INTERVAL)
+            idle += JOB_PROGRESS_INTERVAL
+            job = await asyncio.to_thread(job_store.get, job_id, owner) or job
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, x_api_key: str = Header(...)):
+    """The finished job's response, with its original status and media type."""
+    owner = hash_api_key(x_api_key.strip())
+    result = await asyncio.to_thread(job_store.result, job_id, owner)
+    if result is None:
+        job = await _get_job(job_id, x_api_key)
+        detail = job["error"] or f"Job is {job['status']}"
+        raise HTTPException(status_code=409, detail=detail)
+    status, media_type, body = result
+    return Response(
+        content=body,
+        status_code=status,
+        media_type=media_type or None,
+        headers={"X-Job-Id": job_id},
+    )
+
+
+@router.delete("/{job_id}", response_model=JobInfo)
+async def cancel_job(job_id: str, x_api_key: str = Header(...)):
+    """Cancel a queued or running job; finished jobs are left unchanged."""
+    owner = hash_api_key(x_api_key.strip())
+    status = await asyncio.to_thread(job_store.cancel, job_id, owner)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status == "running":
+        job_runner.cancel(job_id)  # immediate if it runs in this process
+    return _job_info(await _get_job(job_id, x_api_key))
@@ -1,25 +1,112 @@
-"""Metadata endpoints for output types."""
+"""Metadata endpoints for output types and ontology terms."""
 
-from fastapi import APIRouter
+from typing import Optional
 
-from app.config import OUTPUT_TYPE_DESCRIPTIONS
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from app.config import (
+    ONTOLOGY_SEARCH_LIMIT,
+    ONTOLOGY_SEARCH_MAX_LIMIT,
+    OUTPUT_TYPE_DESCRIPTIONS,
+)
 from app.schemas.models import (
+    OntologyTermInfo,
+    OntologyTermsResponse,
     OutputType,
     OutputTypeInfo,
     OutputTypesResponse,
 )
+from app.services.serialization import model_response
 
 router = APIRouter()
 
 
+@router.get("/cache-stats")
+def get_cache_stats():
+    """Get prediction cache and client pool counters."""
+    from app.services.client_pool import client_pool
+    from app.services.executors import limiter
+    from app.services.ontology_catalog import ontology_catalog
+    from app.services.plot_store import plot_store
+    from app.services.prediction_cache import prediction_cache
+    from app.services.render_pool import render_pool
+    from app.services.result_cache import score_results
+    from app.services.scheduler import remote_scheduler
+
+    return {
+        "prediction_cache": prediction_cache.stats(),
+        "score_results": score_results.stats(),
+        "client_pool": client_pool.stats(),
+        "limiter": limiter.stats(),
+        "render_pool": render_pool.stats(),
+        "plots": plot_store.stats(),
+        "remote": remote_scheduler.stats(),
+        "ontology_catalog": ontology_catalog.stats(),
+    }
+
+
 @router.get("/output-types", response_model=OutputTypesResponse)
 def get_output_types():
     """Get available AlphaGenome output types."""
+    from app.services.ontology_catalog import ontology_catalog
+
+    catalog = ontology_catalog.get()
     output_types = [
         OutputTypeInfo(
             name=ot.value,
             description=OUTPUT_TYPE_DESCRIPTIONS.get(ot.value, ot.value),
+            track_count=catalog.track_counts.get(ot.value, 0) if catalog else None,
         )
         for ot in OutputType
     ]
     return OutputTypesResponse(output_types=output_types)
+
+
+@router.get("/ontology-terms", response_model=OntologyTermsResponse)
+async def search_ontology_terms(
+    search: str = Query("", max_length=200),
+    output_type: Optional[OutputType] = None,
+    limit: int = Query(ONTOLOGY_SEARCH_LIMIT, ge=1, le=ONTOLOGY_SEARCH_MAX_LIMIT),
+    x_api_key: Optional[str] = Header(None),
+):
+    """Autocomplete ontology terms by CURIE or biosample name.
+
+    The track catalog is fetched from the API on first use, which needs an
+    API key; afterwards it is served from memory (and from disk after a
+    restart) without one.
+    """
+    from app.services.client_pool import client_pool
+    from app.services.executors import run_sdk
+    from app.services.ontology_catalog import ontology_catalog
+
+    catalog = await run_sdk(ontology_catalog.get)
+    if catalog is None and x_api_key:
+        api_key = x_api_key.strip()
+        try:
+            client = await run_sdk(client_pool.get, api_key)
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+        catalog = await ontology_catalog.refresh(client, api_key)
+    if catalog is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Track catalog is not loaded; retry with an X-API-Key header",
+        )
+
+    terms, total = catalog.search(
+        search, output_type.value if output_type else None, limit
+    )
+    return model_response(
+        OntologyTermsResponse(
+            terms=[
+                OntologyTermInfo(
+                    ontology_curie=t.curie,
+                    biosample_name=t.biosample_name,
+                    biosample_type=t.biosample_type,
+                    track_counts=t.track_counts,
+                )
+                for t in terms
+            ],
+            total=total,
+        )
+    )
@@ -1,23 +1,116 @@
 """Prediction endpoints for genomic intervals."""
 
-from fastapi import APIRouter, Header, HTTPException
+import asyncio
+from contextlib import AsyncExitStack
 
+import numpy as np
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.config import BULK_CONCURRENCY, BULK_MAX_CONCURRENCY
 from app.schemas.models import (
-    IntervalInfo,
+    BulkFormat,
+    ContactMapTileRequest,
     IntervalPredictRequest,
     IntervalPredictResponse,
-    TrackInfo,
-    TrackStats,
-    TranscriptInfo,
+    OutputType,
+    RegionQueryRequest,
+    TrackDataRequest,
+    TrackFormat,
 )
-from app.services.alphagenome import AlphaGenomeService, get_sequence_length_name
-from app.services.visualization import generate_interval_plot
+from app.services.contact_maps import pack_upper
+from app.services.executors import limiter, run_plot, run_sdk
+from app.services.metrics import span
+from app.services.plot_store import plot_filename, plot_store
+from app.services.render_pool import render_pool
+from app.services.scheduler import http_error
+from app.services.serialization import model_response
+from app.services.track_stats import gene_body_mask, summarize_tracks, track_labels
 
+# The AlphaGenome SDK, pandas and pyarrow are imported inside the handlers
+# (and preloaded by the startup warm-up), so importing the app stays fast
 router = APIRouter()
 
 
+def _finite(values) -> list:
+    """Array to a list of floats with NaN mapped to None."""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def _track_infos(track_data, output_type: str, hits=None, cells=None) -> list[dict]:
+    """Build TrackInfo-shaped dicts for every track from one vectorized stats pass.
+
+    For contact maps, `cells` may pass the packed upper triangle from
+    `ContactMapTiles` so it is not gathered again.
+    """
+    with span("track_stats", output_type):
+        return _build_track_infos(track_data, output_type, hits, cells)
+
+
+def _build_track_infos(track_data, output_type: str, hits, cells) -> list[dict]:
+    values = np.asarray(track_data.values)
+    resolution = getattr(track_data, "resolution", None)
+    interval = getattr(track_data, "interval", None)
+    if values.ndim != 2:
+        # Contact maps are symmetric: summarize each upper-triangle cell once
+        values = pack_upper(values) if cells is None else cells
+        resolution = None
+    elif interval is None:
+        resolution = None  # junction rows have no bin coordinates
+
+    body_mask = None
+    if resolution is not None and hits is not None:
+        body_mask = gene_body_mask(
+            len(values), resolution, interval.start, hits.start, hits.end
+        )
+    summary = summarize_tracks(
+        values,
+        resolution=resolution,
+        start=interval.start if interval is not None else 0,
+        body_mask=body_mask,
+    )
+
+    n_tracks = values.shape[1]
+    names, strands, ontology_terms = track_labels(
+        track_data.metadata, n_tracks, output_type
+    )
+    mins, maxs, means = map(_finite, (summary.min, summary.max, summary.mean))
+    percentiles = {k: _finite(v) for k, v in summary.percentiles.items()}
+    argmax = (
+        summary.argmax_position.tolist()
+        if summary.argmax_position is not None
+        else [None] * n_tracks
+    )
+    body = (
+        _finite(summary.gene_body_sum)
+        if summary.gene_body_sum is not None
+        else [None] * n_tracks
+    )
+
+    return [
+        {
+            "output_type": output_type,
+            "track_name": names[i],
+            "strand": strands[i],
+            "ontology_term": ontology_terms[i],
+            "stats": {
+                "min": mins[i],
+                "max": maxs[i],
+                "mean": means[i],
+                "percentiles": {k: v[i] for k, v in percentiles.items()},
+                "argmax_position": argmax[i] if mins[i] is not None else None,
+                "gene_body_sum": body[i],
+            },
+        }
+        for i in range(n_tracks)
+    ]
+
+
 @router.post("/interval", response_model=IntervalPredictResponse)
-def predict_interval(request: IntervalPredictRequest, x_api_key: str = Header(...)):
+async def predict_interval(
+    request: IntervalPredictRequest, x_api_key: str = Header(...)
+):
     """Predict outputs for a genomic interval."""
     # Validate interval
     if request.end <= request.start:
@@ -25,74 +118,484 @@ def predict_interval(request: IntervalPredictRequest, x_api_key: str = Header(..
             status_code=400, detail="End position must be greater than start position"
         )
 
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        response = await _predict_interval(request, api_key)
+    return model_response(response)
+
+
+async def _predict_interval(request: IntervalPredictRequest, api_key: str):
+    from alphagenome.models import dna_client
+
+    from app.services.alphagenome import AlphaGenomeService, get_sequence_length_name
+
     try:
-        service = AlphaGenomeService(x_api_key.strip())
+        service = await run_sdk(AlphaGenomeService, api_key)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
 
     try:
         output_type_names = [ot.value for ot in request.output_types]
-        output, interval, transcripts = service.predict_interval(
+        output, interval, transcripts = await service.predict_interval(
             chromosome=request.chromosome,
             start=request.start,
             end=request.end,
             output_types=output_type_names,
             ontology_terms=request.ontology_terms,
+            tile=request.tile,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
+        raise http_error(e, "Prediction failed")
 
-    # Generate plots for each output type
-    plot_urls = []
-    tracks = []
+    contact_tiles = None
+    if "CONTACT_MAPS" in output_type_names:
+        # 2D maps are tiled once (and cached) for both stats and the plot
+        try:
+            contact_tiles, _ = await service.contact_map_tiles(
+                chromosome=request.chromosome,
+                start=request.start,
+                end=request.end,
+                ontology_terms=request.ontology_terms,
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to tile contact maps: {e}"
+            )
+
+    # Render all output types in parallel while track stats are computed
+    hits = service.transcript_hits(interval)
 
+    async def render_plot(ot: str, filename: str):
+        source = output
+        if ot == "CONTACT_MAPS":
+            # Draw a coarse tile level: bounded cost at any map resolution
+            source = dna_client.Output(
+                contact_maps=await run_plot(contact_tiles.plot_data)
+            )
+        return await render_pool.interval_plot(
+            source, interval, transcripts, ot, filename
+        )
+
+    def render(ot: str):
+        filename = plot_filename("interval", interval, ot, request.ontology_terms)
+        return plot_store.get_or_render(filename, lambda: render_plot(ot, filename))
+
+    plots = asyncio.gather(
+        *(render(ot) for ot in output_type_names), return_exceptions=True
+    )
+    tracks = []
     for ot in output_type_names:
         try:
-            plot_url = generate_interval_plot(output, interval, transcripts, ot)
-            plot_urls.append(plot_url)
-
-            # Extract track info from TrackData
-            track_data = getattr(output, ot.lower())
-            for i, row in track_data.metadata.iterrows():
-                tracks.append(
-                    TrackInfo(
-                        output_type=ot,
-                        track_name=row.get("name", ot),
-                        strand=row.get("strand", "+"),
-                        ontology_term=row.get("ontology_term", ""),
-                        stats=TrackStats(
-                            min=float(track_data.values[:, i].min()),
-                            max=float(track_data.values[:, i].max()),
-                            mean=float(track_data.values[:, i].mean()),
-                        ),
-                    )
+            tracks.extend(
+                await run_plot(
+                    _track_infos,
+                    getattr(output, ot.lower()),
+                    ot,
+                    hits,
+                    contact_tiles.cells if ot == "CONTACT_MAPS" else None,
                 )
+            )
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Failed to generate plot for {ot}: {e}"
+                status_code=500, detail=f"Failed to compute track stats for {ot}: {e}"
             )
 
-    # Build transcript info
-    transcript_list = []
-    if hasattr(transcripts, "itertuples"):
-        for t in transcripts.itertuples():
-            transcript_list.append(
-                TranscriptInfo(
-                    gene_name=t.gene_name if hasattr(t, "gene_name") else "",
-                    gene_id=t.gene_id if hasattr(t, "gene_id") else "",
-                    strand=t.strand if hasattr(t, "strand") else "+",
-                )
+    plot_urls = []
+    for ot, plot_url in zip(output_type_names, await plots):
+        if isinstance(plot_url, Exception):
+            raise HTTPException(
+                status_code=500, detail=f"Failed to generate plot for {ot}: {plot_url}"
+            )
+        plot_urls.append(plot_url)
+
+    # Build transcript info from the interval index arrays
+    transcript_list = [
+        {"gene_name": gene_name, "gene_id": gene_id, "strand": strand}
+        for gene_name, gene_id, strand in zip(
+            hits.gene_name.tolist(), hits.gene_id.tolist(), hits.strand.tolist()
+        )
+    ]
+
+    # Plain dicts with the IntervalPredictResponse shape: the server built
+    # every field, so validating hundreds of nested models is skipped
+    return {
+        "plot_urls": plot_urls,
+        "interval": {
+            "chromosome": interval.chromosome,
+            "start": interval.start,
+            "end": interval.end,
+            "width": interval.width,
+            "sequence_length": get_sequence_length_name(interval.width),
+        },
+        "tracks": tracks,
+        "transcripts": transcript_list,
+    }
+
+
+def _export_tracks(track_data, request: TrackDataRequest) -> bytes:
+    """Select, downsample and encode track values."""
+    from app.services.track_export import (
+        downsample,
+        encode_arrow,
+        encode_raw,
+        select_tracks,
+        track_header,
+    )
+
+    indices = select_tracks(track_data.metadata, request.tracks)
+    values = track_data.values
+    if len(indices) < values.shape[1]:
+        values = values[:, indices]
+    values, factor = downsample(values, request.width, request.downsample.value)
+    header = track_header(
+        track_data,
+        indices,
+        len(values),
+        track_data.resolution * factor,
+        request.dtype.value,
+    )
+    if request.format == TrackFormat.RAW:
+        return encode_raw(header, values)
+    return encode_arrow(header, values)
+
+
+@router.post("/interval/tracks")
+async def get_interval_tracks(request: TrackDataRequest, x_api_key: str = Header(...)):
+    """Stream raw track values for one output type as Arrow IPC or raw binary."""
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.track_export import ARROW_MEDIA_TYPE, RAW_MEDIA_TYPE
+
+    if request.end <= request.start:
+        raise HTTPException(
+            status_code=400, detail="End position must be greater than start position"
+        )
+
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        try:
+            service = await run_sdk(AlphaGenomeService, api_key)
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+
+        ot = request.output_type.value
+        try:
+            output, _, _ = await service.predict_interval(
+                chromosome=request.chromosome,
+                start=request.start,
+                end=request.end,
+                output_types=[ot],
+                ontology_terms=request.ontology_terms,
+                tile=request.tile,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise http_error(e, "Prediction failed")
+
+    track_data = getattr(output, ot.lower())
+    if getattr(track_data, "resolution", None) is None or track_data.values.ndim != 2:
+        raise HTTPException(
+            status_code=400, detail=f"Raw track export does not support {ot}"
+        )
+
+    try:
+        content = await run_plot(_export_tracks, track_data, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = (
+        RAW_MEDIA_TYPE if request.format == TrackFormat.RAW else ARROW_MEDIA_TYPE
+    )
+    return Response(content=content, media_type=media_type)
+
+
+def _query_region(pyramid, track_data, request: RegionQueryRequest) -> bytes:
+    """Summarize the view region per pixel and encode min/max/mean columns."""
+    from app.services.track_export import (
+        encode_arrow,
+        encode_raw,
+        select_tracks,
+        track_header,
+    )
+
+    indices = select_tracks(track_data.metadata, request.tracks)
+    summary = pyramid.query(
+        request.view_start or pyramid.start,
+        request.view_end or pyramid.end,
+        request.width,
+        indices if len(indices) < track_data.values.shape[1] else None,
+    )
+    stats = ["min", "max", "mean"]
+    # (pixels, tracks, stats) -> (pixels, tracks * stats) in (track, stat) order
+    values = np.stack([summary.min, summary.max, summary.mean], axis=-1)
+    values = values.reshape(len(values), -1)
+    header = track_header(
+        track_data,
+        indices,
+        len(values),
+        summary.bin_size,
+        request.dtype.value,
+        start=summary.start,
+        end=summary.end,
+        stats=stats,
+    )
+    if request.format == TrackFormat.RAW:
+        return encode_raw(header, values)
+    return encode_arrow(header, values)
+
+
+@router.post("/interval/region")
+async def query_interval_region(
+    request: RegionQueryRequest, x_api_key: str = Header(...)
+):
+    """Per-pixel min/max/mean of a region, read from the zoom pyramid."""
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.track_export import ARROW_MEDIA_TYPE, RAW_MEDIA_TYPE
+
+    if request.end <= request.start:
+        raise HTTPException(
+            status_code=400, detail="End position must be greater than start position"
+        )
+
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        try:
+            service = await run_sdk(AlphaGenomeService, api_key)
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+
+        ot = request.output_type.value
+        try:
+            output, _, _ = await service.predict_interval(
+                chromosome=request.chromosome,
+                start=request.start,
+                end=request.end,
+                output_types=[ot],
+                ontology_terms=request.ontology_terms,
+                tile=request.tile,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise http_error(e, "Prediction failed")
+
+        track_data = getattr(output, ot.lower())
+        if (
+            getattr(track_data, "resolution", None) is None
+            or track_data.values.ndim != 2
+        ):
+            raise HTTPException(
+                status_code=400, detail=f"Region queries do not support {ot}"
+            )
+        # Prediction is cached now; building the pyramid is CPU work
+        pyramid, track_data = await service.interval_pyramid(
+            chromosome=request.chromosome,
+            start=request.start,
+            end=request.end,
+            output_type=ot,
+            ontology_terms=request.ontology_terms,
+            tile=request.tile,
+        )
+
+    try:
+        content = await run_plot(_query_region, pyramid, track_data, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = (
+        RAW_MEDIA_TYPE if request.format == TrackFormat.RAW else ARROW_MEDIA_TYPE
+    )
+    return Response(content=content, media_type=media_type)
+
+
+def _encode_contact_tiles(tiles, track_data, request: ContactMapTileRequest) -> bytes:
+    """Select a zoom level, tracks and tiles and encode them."""
+    from app.services.track_export import encode_tiles, select_tracks, track_header
+
+    level = len(tiles.levels) - 1 if request.level is None else request.level
+    if level >= len(tiles.levels):
+        raise ValueError(f"Zoom level must be between 0 and {len(tiles.levels) - 1}")
+    indices = select_tracks(track_data.metadata, request.tracks)
+    coords = tiles.tile_range(level, request.view_start, request.view_end)
+    data = tiles.levels[level]
+    header = track_header(
+        track_data,
+        indices,
+        data.n_bins,
+        data.bin_size,
+        request.dtype.value,
+        start=tiles.start,
+        end=tiles.start + data.n_bins * data.bin_size,
+    )
+    header.update(
+        layout="tiles",
+        symmetric=True,
+        level=level,
+        tile_size=tiles.tile_size,
+        levels=[
+            {
+                "level": i,
+                "bin_size": lvl.bin_size,
+                "n_bins": lvl.n_bins,
+                "tiles_per_side": tiles.tiles_per_side(i),
+            }
+            for i, lvl in enumerate(tiles.levels)
+        ],
+        tiles=[{"row": row, "col": col} for row, col in coords],
+    )
+    selected = indices if len(indices) < len(track_data.metadata) else None
+    return encode_tiles(
+        header, [tiles.tile(level, row, col, selected) for row, col in coords]
+    )
+
+
+@router.post("/interval/contact-maps")
+async def get_contact_map_tiles(
+    request: ContactMapTileRequest, x_api_key: str = Header(...)
+):
+    """Upper-triangle contact map tiles of one zoom level, as raw binary.
+
+    Tiles (row <= col) cover the square of the view region along the
+    diagonal; clients mirror them for the lower triangle.
+    """
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.track_export import RAW_MEDIA_TYPE
+
+    if request.end <= request.start:
+        raise HTTPException(
+            status_code=400, detail="End position must be greater than start position"
+        )
+
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        try:
+            service = await run_sdk(AlphaGenomeService, api_key)
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+
+        try:
+            await service.predict_interval(
+                chromosome=request.chromosome,
+                start=request.start,
+                end=request.end,
+                output_types=["CONTACT_MAPS"],
+                ontology_terms=request.ontology_terms,
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise http_error(e, "Prediction failed")
+
+        # Prediction is cached now; tiling it is CPU work
+        tiles, track_data = await service.contact_map_tiles(
+            chromosome=request.chromosome,
+            start=request.start,
+            end=request.end,
+            ontology_terms=request.ontology_terms,
+        )
+
+    try:
+        content = await run_plot(_encode_contact_tiles, tiles, track_data, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type=RAW_MEDIA_TYPE)
+
+
+@router.post("/interval/bed")
+async def predict_bed_regions(
+    file: UploadFile = File(...),
+    output_types: list[OutputType] = Form(...),
+    ontology_terms: list[str] = Form([]),
+    format: BulkFormat = Form(BulkFormat.NDJSON),
+    width: int | None = Form(None, ge=1, le=65536),
+    concurrency: int = Form(BULK_CONCURRENCY, ge=1, le=BULK_MAX_CONCURRENCY),
+    x_api_key: str = Header(...),
+):
+    """Predict every region of a BED upload, streaming per-region stats.
+
+    Regions are merged into the fewest model windows that contain them and
+    each window is predicted once. With `width`, each region's values are
+    included, downsampled to at most `width` bins. `concurrency` is capped at
+    the per-key request limit, since the upload holds a single limiter slot.
+    """
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.batch import open_variant_file, to_ndjson
+    from app.services.bulk import (
+        BED_MEDIA_TYPES,
+        ParquetStream,
+        load_regions,
+        parse_bed,
+        predict_regions_stream,
+    )
+    from app.services.tiling import UNTILEABLE_OUTPUT_TYPES
+
+    output_type_names = [ot.value for ot in output_types]
+    unsupported = sorted(UNTILEABLE_OUTPUT_TYPES.intersection(output_type_names))
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"BED predictions do not support {', '.join(unsupported)}",
+        )
+    if len(ontology_terms) > 5:
+        raise HTTPException(status_code=400, detail="At most 5 ontology terms")
+
+    try:
+        # The upload may be spooled to disk; read and parse it off the event loop
+        regions, errors = await run_sdk(
+            lambda: load_regions(
+                parse_bed(open_variant_file(file.file, file.filename or ""))
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    api_key = x_api_key.strip()
+    concurrency = min(concurrency, limiter.per_key_limit)
+    try:
+        service = await run_sdk(AlphaGenomeService, api_key)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+    try:
+        await service.check_ontology_terms(output_type_names, ontology_terms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Take the per-key slot now so a full queue is reported as 429, not mid-stream.
+    # The generator releases it when it finishes; the background task releases
+    # it if the stream never starts.
+    stack = AsyncExitStack()
+    await stack.enter_async_context(limiter.slot(api_key))
+
+    rows = predict_regions_stream(
+        service,
+        regions,
+        errors,
+        output_type_names,
+        ontology_terms,
+        concurrency,
+        width,
+    )
+
+    async def stream():
+        async with stack:
+            if format == BulkFormat.PARQUET:
+                # One row group per finished window
+                writer, buffered = ParquetStream(with_values=width is not None), []
+                async for row in rows:
+                    buffered.append(row)
+                    if row["type"] in ("progress", "summary"):
+                        chunk, buffered = writer.write(buffered), []
+                        if chunk:
+                            yield chunk
+                yield writer.close()
+            else:
+                async for row in rows:
+                    yield to_ndjson(row)
 
-    return IntervalPredictResponse(
-        plot_urls=plot_urls,
-        interval=IntervalInfo(
-            chromosome=interval.chromosome,
-            start=interval.start,
-            end=interval.end,
-            width=interval.width,
-            sequence_length=get_sequence_length_name(interval.width),
-        ),
-        tracks=tracks,
-        transcripts=transcript_list,
+    return StreamingResponse(
+        stream(),
+        media_type=BED_MEDIA_TYPES[format.value],
+        background=BackgroundTask(stack.aclose),
     )
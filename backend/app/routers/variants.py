@@ -1,148 +1,476 @@
 """Variant effect prediction and scoring endpoints."""
 
-from fastapi import APIRouter, Header, HTTPException
+import asyncio
+import heapq
+import os
+from contextlib import AsyncExitStack
 
+import numpy as np
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.config import (
+    BATCH_CHECKPOINT_DIR,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_CONCURRENCY,
+    VARIANT_MAX_ALLELES,
+)
 from app.schemas.models import (
-    ComparisonInfo,
-    IntervalInfo,
-    PaginationInfo,
+    OutputType,
+    ScoreCursor,
     ScoreVariantRequest,
     ScoreVariantResponse,
-    VariantInfo,
+    SortOrder,
     VariantPredictResponse,
     VariantRequest,
-    VariantScore,
 )
-from app.services.alphagenome import AlphaGenomeService, get_sequence_length_name
-from app.services.visualization import generate_variant_plot
+from app.services.client_pool import hash_api_key
+from app.services.contact_maps import pack_upper
+from app.services.executors import limiter, run_plot, run_sdk
+from app.services.metrics import span
+from app.services.plot_store import plot_filename, plot_store
+from app.services.render_pool import render_pool
+from app.services.result_cache import score_results
+from app.services.scheduler import http_error
+from app.services.serialization import model_response
+from app.services.track_stats import track_labels
+from app.services.variant_effects import compare_tracks, effect_sizes, rank_tracks
 
+# The AlphaGenome SDK and pandas are imported inside the handlers (and
+# preloaded by the startup warm-up), so importing the app stays fast
 router = APIRouter()
 
 
 @router.post("/predict/variant", response_model=VariantPredictResponse)
-def predict_variant(request: VariantRequest, x_api_key: str = Header(...)):
+async def predict_variant(request: VariantRequest, x_api_key: str = Header(...)):
     """Predict variant effects (REF vs ALT comparison)."""
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        response = await _predict_variant(request, api_key)
+    return model_response(response)
+
+
+async def _predict_variant(request: VariantRequest, api_key: str):
+    from app.services.alphagenome import AlphaGenomeService, get_sequence_length_name
+
     try:
-        service = AlphaGenomeService(x_api_key.strip())
+        service = await run_sdk(AlphaGenomeService, api_key)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
 
+    # VCF-style ALT field: "C" or "C,G,T" for several alleles at one position
+    alts = list(dict.fromkeys(a.strip() for a in request.alt.split(",")))
+    if len(alts) > VARIANT_MAX_ALLELES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"alt must list 1 to {VARIANT_MAX_ALLELES} comma-separated alleles",
+        )
+
     try:
         output_type_names = [ot.value for ot in request.output_types]
-        variant_output, variant, interval, transcripts = service.predict_variant(
-            chromosome=request.chromosome,
-            position=request.position,
-            ref=request.ref,
-            alt=request.alt,
-            output_types=output_type_names,
-            ontology_terms=request.ontology_terms,
+        reference, alternates, variants, interval, transcripts = (
+            await service.predict_alleles(
+                chromosome=request.chromosome,
+                position=request.position,
+                ref=request.ref,
+                alts=alts,
+                output_types=output_type_names,
+                ontology_terms=request.ontology_terms,
+            )
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Variant prediction failed: {e}")
+        raise http_error(e, "Variant prediction failed")
 
-    # Generate plots for each output type
-    plot_urls = []
-    comparisons = []
+    # Affected genes from the interval index, in genomic order
+    hits = service.transcript_hits(interval)
+    affected_genes = list(dict.fromkeys(g for g in hits.gene_name.tolist() if g))[:5]
 
+    # One overlay per output type with every allele; all rendered in parallel
+    labels = {"ALT": alts[0]} if len(alts) == 1 else {f"ALT {a}": a for a in alts}
+    variant_id = (
+        f"{request.chromosome}:{request.position}:{request.ref}>{','.join(alts)}"
+    )
+
+    def render(ot: str):
+        filename = plot_filename(
+            "variant", interval, ot, request.ontology_terms, variant=variant_id
+        )
+        return plot_store.get_or_render(
+            filename,
+            lambda: render_pool.allele_plot(
+                reference,
+                {label: alternates[alt] for label, alt in labels.items()},
+                list(variants.values()),
+                transcripts,
+                ot,
+                filename,
+            ),
+        )
+
+    plots = asyncio.gather(
+        *(render(ot) for ot in output_type_names), return_exceptions=True
+    )
+    comparisons = []
     for ot in output_type_names:
+        ranked, total, strongest = [], 0, []
         try:
-            plot_url = generate_variant_plot(
-                variant_output, variant, interval, transcripts, ot
-            )
-            plot_urls.append(plot_url)
-
-            # Extract affected genes from transcripts
-            affected_genes = []
-            if hasattr(transcripts, "itertuples"):
-                for t in transcripts.itertuples():
-                    if hasattr(t, "gene_name") and t.gene_name:
-                        affected_genes.append(t.gene_name)
-            affected_genes = list(set(affected_genes))[:5]  # Limit to 5
-
-            comparisons.append(
-                ComparisonInfo(
-                    output_type=ot,
-                    affected_genes=affected_genes,
-                    summary=f"Comparison of REF ({request.ref}) vs ALT ({request.alt})",
+            for alt in alts:
+                alt_tracks, sizes, total = await run_plot(
+                    _track_effects,
+                    getattr(reference, ot.lower()),
+                    getattr(alternates[alt], ot.lower()),
+                    ot,
+                    alt,
+                    hits,
+                    request.position - 1,
+                    request.rank_by.value,
+                    max(request.top_k, 1),
                 )
-            )
+                ranked.extend(zip(sizes, alt_tracks))
+                strongest.extend(alt_tracks[:1])
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Failed to generate variant plot for {ot}: {e}"
+                status_code=500, detail=f"Failed to compare tracks for {ot}: {e}"
+            )
+        # The top_k of every allele hold the top_k across alleles; ties keep
+        # allele order
+        tracks = [
+            track
+            for _, track in heapq.nlargest(
+                request.top_k, ranked, key=lambda pair: pair[0]
             )
+        ]
+        summary = f"Comparison of REF ({request.ref}) vs ALT ({', '.join(alts)})"
+        comparisons.append(
+            {
+                "output_type": ot,
+                "affected_genes": affected_genes,
+                "summary": "; ".join(
+                    [summary, *(_describe(t, request.chromosome) for t in strongest)]
+                ),
+                "tracks": tracks,
+                "total_tracks": total,
+            }
+        )
 
-    return VariantPredictResponse(
-        plot_urls=plot_urls,
-        variant=VariantInfo(
-            chromosome=request.chromosome,
-            position=request.position,
-            ref=request.ref,
-            alt=request.alt,
-        ),
-        interval=IntervalInfo(
-            chromosome=interval.chromosome,
-            start=interval.start,
-            end=interval.end,
-            width=interval.width,
-            sequence_length=get_sequence_length_name(interval.width),
-        ),
-        comparison=comparisons,
+    plot_urls = []
+    for ot, plot_url in zip(output_type_names, await plots):
+        if isinstance(plot_url, Exception):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to generate variant plot for {ot}: {plot_url}",
+            )
+        plot_urls.append(plot_url)
+
+    # Plain dicts with the VariantPredictResponse shape (see _predict_interval)
+    return {
+        "plot_urls": plot_urls,
+        "variant": {
+            "chromosome": request.chromosome,
+            "position": request.position,
+            "ref": request.ref,
+            "alt": request.alt,
+        },
+        "interval": {
+            "chromosome": interval.chromosome,
+            "start": interval.start,
+            "end": interval.end,
+            "width": interval.width,
+            "sequence_length": get_sequence_length_name(interval.width),
+        },
+        "comparison": comparisons,
+    }
+
+
+def _track_effects(
+    reference,
+    alternate,
+    output_type: str,
+    alt: str,
+    hits,
+    position: int,
+    rank_by: str,
+    top_k: int,
+) -> tuple[list[dict], list[float], int]:
+    """Rank the tracks of one output type by the effect of one ALT allele.
+
+    Returns:
+        Tuple of (TrackEffect-shaped dicts of the `top_k` largest effects,
+        their effect sizes, number of tracks compared)
+    """
+    with span("variant_effects", output_type):
+        return _build_track_effects(
+            reference, alternate, output_type, alt, hits, position, rank_by, top_k
+        )
+
+
+def _build_track_effects(
+    reference, alternate, output_type, alt, hits, position, rank_by, top_k
+):
+    ref = np.asarray(reference.values)
+    alt_values = np.asarray(alternate.values)
+    if ref.shape != alt_values.shape:
+        return [], [], 0  # e.g. different splice junctions in the two arms
+    resolution = getattr(reference, "resolution", None)
+    interval = getattr(reference, "interval", None)
+    if ref.ndim != 2:
+        # Contact maps are symmetric: compare each upper-triangle cell once
+        ref, alt_values = pack_upper(ref), pack_upper(alt_values)
+        resolution = None
+    elif interval is None:
+        resolution = None  # junction rows have no bin coordinates
+
+    effects = compare_tracks(
+        ref,
+        alt_values,
+        resolution=resolution,
+        start=interval.start if interval is not None else 0,
+        position=position,
+        body_starts=hits.start,
+        body_ends=hits.end,
+    )
+    n_tracks = ref.shape[1]
+    top = rank_tracks(effects, rank_by, top_k)
+    sizes = effect_sizes(effects, rank_by)[top].tolist()
+    names, strands, ontology_terms = track_labels(
+        reference.metadata, n_tracks, output_type
+    )
+
+    def finite(values) -> list:
+        return [None if v != v else v for v in values[top].tolist()]
+
+    max_abs = finite(effects.max_abs_diff)
+    positions = (
+        effects.max_abs_diff_position[top].tolist()
+        if effects.max_abs_diff_position is not None
+        else [None] * len(top)
+    )
+    ratios = {k: finite(v) for k, v in effects.log_fold_change.items()}
+    genes = [
+        name or gene_id
+        for name, gene_id in zip(hits.gene_name.tolist(), hits.gene_id.tolist())
+    ]
+    deltas = (
+        [finite(row) for row in effects.gene_delta]
+        if effects.gene_delta is not None
+        else []
+    )
+
+    return (
+        [
+            {
+                "alt": alt,
+                "track_name": names[t],
+                "strand": strands[t],
+                "ontology_term": ontology_terms[t],
+                "max_abs_diff": max_abs[i],
+                "max_abs_diff_position": (
+                    positions[i] if max_abs[i] is not None else None
+                ),
+                "log_fold_change": {k: v[i] for k, v in ratios.items()},
+                "gene_deltas": {gene: row[i] for gene, row in zip(genes, deltas)},
+            }
+            for i, t in enumerate(top.tolist())
+        ],
+        sizes,
+        n_tracks,
+    )
+
+
+def _describe(track: dict, chromosome: str) -> str:
+    """One-line description of a track's effect for the comparison summary."""
+    if track["max_abs_diff"] is None:
+        return f"ALT {track['alt']}: no change"
+    where = (
+        f" at {chromosome}:{track['max_abs_diff_position']}"
+        if track["max_abs_diff_position"] is not None
+        else ""
+    )
+    return (
+        f"ALT {track['alt']}: largest change {track['max_abs_diff']:.3g} "
+        f"in {track['track_name']}{where}"
     )
 
 
 @router.post("/score/variant", response_model=ScoreVariantResponse)
-def score_variant(request: ScoreVariantRequest, x_api_key: str = Header(...)):
+async def score_variant(request: ScoreVariantRequest, x_api_key: str = Header(...)):
     """Score variant effects using recommended scorers."""
+    api_key = x_api_key.strip()
+    async with limiter.slot(api_key):
+        response = await _score_variant(request, api_key)
+    return model_response(response)
+
+
+def _score_view(request: ScoreVariantRequest, result_key: str) -> dict:
+    """Resolve offset, sort and filters from the cursor or the request body."""
+    from app.services.scores import decode_cursor
+
+    if request.cursor is None:
+        return {
+            "key": result_key,
+            "offset": (request.page - 1) * request.page_size,
+            "sort_by": request.sort_by.value if request.sort_by else None,
+            "descending": request.sort_order == SortOrder.DESC,
+            "min_quantile_score": request.min_quantile_score,
+            "max_quantile_score": request.max_quantile_score,
+            "gene": request.gene,
+            "biosample": request.biosample,
+        }
+
     try:
-        service = AlphaGenomeService(x_api_key.strip())
+        view = ScoreCursor.model_validate(decode_cursor(request.cursor))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if view.key != result_key:
+        raise HTTPException(
+            status_code=400, detail="Cursor does not belong to this variant request"
+        )
+    return view.model_dump(mode="json")
+
+
+async def _score_variant(request: ScoreVariantRequest, api_key: str):
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.scores import encode_cursor, filter_and_sort, score_columns
+
+    try:
+        service = await run_sdk(AlphaGenomeService, api_key)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
 
-    try:
-        output_type_names = [ot.value for ot in request.output_types]
-        scores_df = service.score_variant(
+    output_type_names = [ot.value for ot in request.output_types]
+    variant_id = f"{request.chromosome}:{request.position}:{request.ref}>{request.alt}"
+    # Bound to the API key so cursors and cached results are never shared
+    result_key = (
+        f"{hash_api_key(api_key)}|{variant_id}"
+        f"|{','.join(sorted(set(output_type_names)))}"
+    )
+    view = _score_view(request, result_key)
+
+    async def compute_scores():
+        scores_df = await service.score_variant(
             chromosome=request.chromosome,
             position=request.position,
             ref=request.ref,
             alt=request.alt,
             output_types=output_type_names,
         )
+        return await run_sdk(score_columns, scores_df)
+
+    # Full result set is cached server-side; every page is a slice of it
+    try:
+        scores_df = await score_results.aget_or_compute(result_key, compute_scores)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Variant scoring failed: {e}")
-
-    # Convert DataFrame to response
-    total = len(scores_df)
-    start_idx = (request.page - 1) * request.page_size
-    end_idx = start_idx + request.page_size
-
-    scores = []
-    if not scores_df.empty:
-        page_df = scores_df.iloc[start_idx:end_idx]
-        for _, row in page_df.iterrows():
-            scores.append(
-                VariantScore(
-                    gene_name=str(row.get("gene_name", "")),
-                    gene_id=str(row.get("gene_id", "")),
-                    strand=str(row.get("strand", "+")),
-                    ontology_term=str(row.get("ontology_term", "")),
-                    biosample_name=str(row.get("biosample_name", "")),
-                    raw_score=float(row.get("raw_score", 0.0)),
-                    quantile_score=float(row.get("quantile_score", 0.0)),
-                    output_type=str(row.get("output_type", "")),
-                )
-            )
+        raise http_error(e, "Variant scoring failed")
 
-    return ScoreVariantResponse(
-        variant=VariantInfo(
-            chromosome=request.chromosome,
-            position=request.position,
-            ref=request.ref,
-            alt=request.alt,
-        ),
-        scores=scores,
-        pagination=PaginationInfo(
-            total=total,
-            page=request.page,
-            page_size=request.page_size,
-        ),
+    view_df = filter_and_sort(
+        scores_df,
+        sort_by=view["sort_by"],
+        descending=view["descending"],
+        min_quantile_score=view["min_quantile_score"],
+        max_quantile_score=view["max_quantile_score"],
+        gene=view["gene"],
+        biosample=view["biosample"],
+    )
+
+    total = len(view_df)
+    offset = view["offset"]
+    page_df = view_df.iloc[offset : offset + request.page_size]
+    # Rows are already projected onto the VariantScore fields (score_columns)
+    scores = page_df.to_dict("records")
+
+    next_cursor = None
+    if offset + request.page_size < total:
+        next_cursor = encode_cursor({**view, "offset": offset + request.page_size})
+
+    # Plain dicts with the ScoreVariantResponse shape skip model validation
+    return {
+        "variant": {
+            "chromosome": request.chromosome,
+            "position": request.position,
+            "ref": request.ref,
+            "alt": request.alt,
+        },
+        "scores": scores,
+        "pagination": {
+            "total": total,
+            "page": offset // request.page_size + 1,
+            "page_size": request.page_size,
+            "next_cursor": next_cursor,
+        },
+    }
+
+
+@router.post("/score/variants/batch")
+async def score_variants_batch(
+    file: UploadFile = File(...),
+    output_types: list[OutputType] = Form(...),
+    run_id: str | None = Form(None),
+    concurrency: int = Form(BATCH_CONCURRENCY, ge=1, le=BATCH_MAX_CONCURRENCY),
+    x_api_key: str = Header(...),
+):
+    """Score every variant in a VCF/TSV upload, streaming NDJSON rows.
+
+    Passing the same `run_id` again resumes a run: variants already scored in
+    its checkpoint are skipped. `concurrency` is capped at the per-key request
+    limit, since the run holds a single limiter slot.
+    """
+    from app.services.alphagenome import AlphaGenomeService
+    from app.services.batch import (
+        checkpoint_path,
+        open_variant_file,
+        parse_variants,
+        read_checkpoint,
+        score_variants_stream,
+        to_ndjson,
+    )
+
+    api_key = x_api_key.strip()
+    concurrency = min(concurrency, limiter.per_key_limit)
+
+    checkpoint = None
+    done: set[str] = set()
+    if run_id:
+        try:
+            checkpoint = checkpoint_path(api_key, run_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        done = await run_sdk(read_checkpoint, checkpoint)
+
+    try:
+        service = await run_sdk(AlphaGenomeService, api_key)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid API key: {e}")
+
+    output_type_names = [ot.value for ot in output_types]
+    # Parsed lazily while scoring; the upload stays open until the response ends
+    records = parse_variants(open_variant_file(file.file, file.filename or ""))
+
+    # Take the per-key slot now so a full queue is reported as 429, not mid-stream.
+    # The generator releases it when it finishes; the background task releases
+    # it if the stream never starts.
+    stack = AsyncExitStack()
+    await stack.enter_async_context(limiter.slot(api_key))
+
+    async def stream():
+        async with stack:
+            ckpt = None
+            if checkpoint:
+                os.makedirs(BATCH_CHECKPOINT_DIR, exist_ok=True)
+                ckpt = stack.enter_context(open(checkpoint, "a", encoding="utf-8"))
+            async for row in score_variants_stream(
+                service, records, output_type_names, concurrency, done
+            ):
+                line = to_ndjson(row)
+                if ckpt and row["type"] == "result":
+                    ckpt.write(line)
+                    ckpt.flush()
+                yield line
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(stack.aclose),
     )
@@ -1,9 +1,13 @@
 """Pydantic schemas for request/response validation."""
 
+import re
+from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+ALLELE_PATTERN = re.compile(r"^[ACGTN]{1,100}$")
 
 
 class OutputType(str, Enum):
@@ -22,6 +26,68 @@ class OutputType(str, Enum):
     PROCAP = "PROCAP"
 
 
+class ScoreSortField(str, Enum):
+    """Server-side sort keys for variant scores."""
+
+    QUANTILE_SCORE = "quantile_score"
+    ABS_QUANTILE_SCORE = "abs_quantile_score"
+    RAW_SCORE = "raw_score"
+    GENE_NAME = "gene_name"
+    BIOSAMPLE_NAME = "biosample_name"
+
+
+class EffectRankField(str, Enum):
+    """Effect sizes that variant prediction tracks can be ranked by."""
+
+    MAX_ABS_DIFF = "max_abs_diff"
+    ABS_LOG_FOLD_CHANGE = "abs_log_fold_change"
+
+
+class SortOrder(str, Enum):
+    """Sort direction."""
+
+    ASC = "asc"
+    DESC = "desc"
+
+
+class TrackFormat(str, Enum):
+    """Binary encodings for raw track export."""
+
+    ARROW = "arrow"
+    RAW = "raw"
+
+
+class BulkFormat(str, Enum):
+    """Output encodings for bulk BED predictions."""
+
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
+class TrackDtype(str, Enum):
+    """Value types for raw track export."""
+
+    FLOAT16 = "float16"
+    FLOAT32 = "float32"
+
+
+class DownsampleMethod(str, Enum):
+    """How bins are merged when downsampling tracks."""
+
+    MEAN = "mean"
+    MAX = "max"
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 # Request schemas
 
 
@@ -33,6 +99,55 @@ class IntervalPredictRequest(BaseModel):
     end: int = Field(gt=0)
     output_types: list[OutputType]
     ontology_terms: list[str] = Field(max_length=5)
+    tile: bool = False
+
+
+class TrackDataRequest(BaseModel):
+    """Request for raw track values of one output type."""
+
+    chromosome: str = Field(pattern=r"^chr([1-9]|1[0-9]|2[0-2]|X|Y)$")
+    start: int = Field(gt=0)
+    end: int = Field(gt=0)
+    output_type: OutputType
+    ontology_terms: list[str] = Field(max_length=5)
+    tile: bool = False
+    tracks: Optional[list[str]] = Field(default=None, max_length=1000)
+    width: Optional[int] = Field(default=None, ge=1, le=65536)
+    downsample: DownsampleMethod = DownsampleMethod.MEAN
+    format: TrackFormat = TrackFormat.ARROW
+    dtype: TrackDtype = TrackDtype.FLOAT32
+
+
+class RegionQueryRequest(BaseModel):
+    """Request for per-pixel min/max/mean summaries of a predicted region."""
+
+    chromosome: str = Field(pattern=r"^chr([1-9]|1[0-9]|2[0-2]|X|Y)$")
+    start: int = Field(gt=0)
+    end: int = Field(gt=0)
+    output_type: OutputType
+    ontology_terms: list[str] = Field(max_length=5)
+    tile: bool = False
+    view_start: Optional[int] = Field(default=None, gt=0)
+    view_end: Optional[int] = Field(default=None, gt=0)
+    width: int = Field(ge=1, le=65536)
+    tracks: Optional[list[str]] = Field(default=None, max_length=1000)
+    format: TrackFormat = TrackFormat.ARROW
+    dtype: TrackDtype = TrackDtype.FLOAT32
+
+
+class ContactMapTileRequest(BaseModel):
+    """Request for upper-triangle contact map tiles at one zoom level."""
+
+    chromosome: str = Field(pattern=r"^chr([1-9]|1[0-9]|2[0-2]|X|Y)$")
+    start: int = Field(gt=0)
+    end: int = Field(gt=0)
+    ontology_terms: list[str] = Field(max_length=5)
+    # Zoom level, 0 = full resolution (default: the coarsest, a single tile)
+    level: Optional[int] = Field(default=None, ge=0)
+    view_start: Optional[int] = Field(default=None, gt=0)
+    view_end: Optional[int] = Field(default=None, gt=0)
+    tracks: Optional[list[str]] = Field(default=None, max_length=1000)
+    dtype: TrackDtype = TrackDtype.FLOAT32
 
 
 class VariantRequest(BaseModel):
@@ -41,9 +156,25 @@ class VariantRequest(BaseModel):
     chromosome: str = Field(pattern=r"^chr([1-9]|1[0-9]|2[0-2]|X|Y)$")
     position: int = Field(gt=0)
     ref: str = Field(min_length=1, max_length=100)
-    alt: str = Field(min_length=1, max_length=100)
+    # One allele, or several comma-separated alleles at the same position
+    alt: str = Field(min_length=1, max_length=800)
     output_types: list[OutputType]
     ontology_terms: list[str] = Field(max_length=5, default=[])
+    # Ranked tracks returned per output type across all alleles (0 for none)
+    top_k: int = Field(default=20, ge=0, le=100)
+    rank_by: EffectRankField = EffectRankField.MAX_ABS_DIFF
+
+    @field_validator("alt")
+    @classmethod
+    def check_alleles(cls, alt: str) -> str:
+        """Every comma-separated allele must be 1-100 bases of A, C, G, T or N."""
+        for allele in alt.split(","):
+            if not ALLELE_PATTERN.match(allele.strip()):
+                raise ValueError(
+                    f"invalid allele {allele.strip()!r}: alleles must be 1-100 "
+                    "bases of A, C, G, T or N"
+                )
+        return alt
 
 
 class ScoreVariantRequest(BaseModel):
@@ -56,6 +187,28 @@ class ScoreVariantRequest(BaseModel):
     output_types: list[OutputType]
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = None
+    sort_by: Optional[ScoreSortField] = None
+    sort_order: SortOrder = SortOrder.DESC
+    min_quantile_score: Optional[float] = None
+    max_quantile_score: Optional[float] = None
+    gene: Optional[str] = Field(default=None, max_length=100)
+    biosample: Optional[str] = Field(default=None, max_length=100)
+
+
+class ScoreCursor(BaseModel):
+    """Pagination state carried by a variant score cursor."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    key: str
+    offset: int = Field(ge=0, strict=True)
+    sort_by: Optional[ScoreSortField] = None
+    descending: bool = Field(strict=True)
+    min_quantile_score: Optional[float] = None
+    max_quantile_score: Optional[float] = None
+    gene: Optional[str] = Field(default=None, max_length=100)
+    biosample: Optional[str] = Field(default=None, max_length=100)
 
 
 # Response schemas
@@ -66,6 +219,7 @@ class OutputTypeInfo(BaseModel):
 
     name: str
     description: str
+    track_count: Optional[int] = None  # once the track catalog is loaded
 
 
 class OutputTypesResponse(BaseModel):
@@ -74,6 +228,22 @@ class OutputTypesResponse(BaseModel):
     output_types: list[OutputTypeInfo]
 
 
+class OntologyTermInfo(BaseModel):
+    """Ontology term with its number of tracks per output type."""
+
+    ontology_curie: str
+    biosample_name: Optional[str] = None
+    biosample_type: Optional[str] = None
+    track_counts: dict[str, int]
+
+
+class OntologyTermsResponse(BaseModel):
+    """Response for ontology term search."""
+
+    terms: list[OntologyTermInfo]
+    total: int  # matching terms, before the limit
+
+
 class IntervalInfo(BaseModel):
     """Information about a genomic interval."""
 
@@ -85,11 +255,14 @@ class IntervalInfo(BaseModel):
 
 
 class TrackStats(BaseModel):
-    """Statistics for a track."""
+    """Statistics for a track (None when the track has no finite values)."""
 
-    min: float
-    max: float
-    mean: float
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+    percentiles: dict[str, Optional[float]] = Field(default_factory=dict)
+    argmax_position: Optional[int] = None
+    gene_body_sum: Optional[float] = None
 
 
 class TrackInfo(BaseModel):
@@ -128,12 +301,29 @@ class VariantInfo(BaseModel):
     alt: str
 
 
+class TrackEffect(BaseModel):
+    """REF vs ALT effect on one track (None where it is undefined)."""
+
+    alt: str
+    track_name: str
+    strand: str
+    ontology_term: str
+    max_abs_diff: Optional[float]
+    max_abs_diff_position: Optional[int] = None
+    # log2((ALT + 1) / (REF + 1)) of the signal summed per window around the variant
+    log_fold_change: dict[str, Optional[float]] = Field(default_factory=dict)
+    # ALT - REF signal summed over each overlapping gene body, by gene name
+    gene_deltas: dict[str, Optional[float]] = Field(default_factory=dict)
+
+
 class ComparisonInfo(BaseModel):
     """Comparison information for variant prediction."""
 
     output_type: str
     affected_genes: list[str]
     summary: str
+    tracks: list[TrackEffect] = Field(default_factory=list)  # largest effect first
+    total_tracks: int = 0  # tracks compared per allele, before top_k
 
 
 class VariantPredictResponse(BaseModel):
@@ -164,6 +354,7 @@ class PaginationInfo(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class ScoreVariantResponse(BaseModel):
@@ -172,3 +363,47 @@ class ScoreVariantResponse(BaseModel):
     variant: VariantInfo
     scores: list[VariantScore]
     pagination: PaginationInfo
+
+
+class JobStage(BaseModel):
+    """Time spent in one request stage of a job so far."""
+
+    stage: str
+    output_type: str
+    count: int
+    seconds: float
+
+
+class JobProgress(BaseModel):
+    """Per-stage progress of a running or finished job."""
+
+    elapsed_seconds: float
+    active: list[str] = Field(default_factory=list)
+    stages: list[JobStage] = Field(default_factory=list)
+
+
+class JobInfo(BaseModel):
+    """Status of a background job."""
+
+    job_id: str
+    endpoint: str
+    status: JobStatus
+    priority: int
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_position: Optional[int] = None
+    cancel_requested: bool = False
+    progress: Optional[JobProgress] = None
+    result_url: Optional[str] = None
+    result_status: Optional[int] = None
+    result_type: Optional[str] = None
+    result_bytes: Optional[int] = None
+    error: Optional[str] = None
+
+
+class JobListResponse(BaseModel):
+    """Background jobs of an API key, newest first."""
+
+    jobs: list[JobInfo]
@@ -1,17 +1,37 @@
 """AlphaGenome API wrapper service."""
 
+import asyncio
+import threading
+
 import pandas as pd
-from alphagenome.data import gene_annotation, genome
-from alphagenome.data import transcript as transcript_utils
+from alphagenome.data import genome
 from alphagenome.models import dna_client, variant_scorers
 
-from app.config import SEQUENCE_LENGTHS
-
-# GTF URL for gene annotations
-GTF_URL = (
-    "https://storage.googleapis.com/alphagenome/reference/gencode/"
-    "hg38/gencode.v46.annotation.gtf.gz.feather"
+from app.config import (
+    CHROMOSOME_LENGTHS,
+    SCORE_VARIANT_MAX_WORKERS,
+    SEQUENCE_LENGTHS,
+    TILE_CONCURRENCY,
+    TILED_MAX_BYTES,
+    TILED_MAX_WIDTH,
+    VARIANT_ALLELE_CONCURRENCY,
 )
+from app.services.annotations import load_mane_transcripts
+from app.services.client_pool import client_pool
+from app.services.contact_maps import ContactMapTiles
+from app.services.executors import run_plot, run_sdk
+from app.services.metrics import output_type_label, span
+from app.services.ontology_catalog import ontology_catalog
+from app.services.prediction_cache import PredictionKey, prediction_cache
+from app.services.pyramid import TrackPyramid, summary_levels
+from app.services.scheduler import remote_scheduler
+from app.services.tiling import (
+    UNTILEABLE_OUTPUT_TYPES,
+    plan_tiles,
+    stitch,
+    stitched_bytes,
+)
+from app.services.transcript_index import TranscriptHits, TranscriptIndex
 
 
 def get_sequence_length(interval_width: int) -> int:
@@ -24,6 +44,8 @@ def get_sequence_length(interval_width: int) -> int:
 
 def get_sequence_length_name(length: int) -> str:
     """Get human-readable name for sequence length."""
+    if length > max(SEQUENCE_LENGTHS):
+        return f"{length / 1_000_000:.1f}MB tiled"
     return SEQUENCE_LENGTHS.get(length, f"{length}bp")
 
 
@@ -31,38 +53,68 @@ class AlphaGenomeService:
     """Service for interacting with AlphaGenome API."""
 
     _gtf_cache: pd.DataFrame | None = None
-    _transcript_extractor_cache = None
+    _transcript_index_cache: TranscriptIndex | None = None
+    _gtf_lock = threading.Lock()
 
     def __init__(self, api_key: str):
-        """Initialize service with API key."""
-        self.client = dna_client.create(api_key)
+        """Initialize service with a pooled client for the API key."""
+        self.api_key = api_key
+        self.client = client_pool.get(api_key)
         self._load_gtf()
 
     @classmethod
     def _load_gtf(cls):
-        """Load gene annotations (cached at class level)."""
-        if cls._gtf_cache is None:
-            cls._gtf_cache = pd.read_feather(GTF_URL)
-            gtf_transcripts = gene_annotation.filter_protein_coding(cls._gtf_cache)
-            gtf_transcripts = gene_annotation.filter_to_mane_select_transcript(
-                gtf_transcripts
-            )
-            cls._transcript_extractor_cache = transcript_utils.TranscriptExtractor(
-                gtf_transcripts
-            )
+        """Load MANE Select gene annotations (cached at class level)."""
+        if cls._gtf_cache is not None:
+            return
+        with cls._gtf_lock:
+            if cls._gtf_cache is None:
+                with span("load_gtf"):
+                    gtf_transcripts = load_mane_transcripts()
+                    cls._transcript_index_cache = TranscriptIndex(gtf_transcripts)
+                cls._gtf_cache = gtf_transcripts
+
+    @classmethod
+    def warm_up(cls):
+        """Load annotations and the persisted track catalog ahead of requests."""
+        cls._load_gtf()
+        ontology_catalog.get()
+
+    async def check_ontology_terms(
+        self, output_types: list[str], ontology_terms: list[str]
+    ) -> None:
+        """Validate ontology terms against the track metadata catalog.
+
+        The catalog is fetched with this client on first use; while it is
+        unavailable, terms are passed to the API unchecked.
+
+        Raises:
+            UnknownOntologyTerm: If a term is unknown or has no tracks for
+                any of the output types
+        """
+        if not ontology_terms:
+            return
+        catalog = await ontology_catalog.refresh(self.client, self.api_key)
+        if catalog is not None:
+            catalog.validate(ontology_terms, output_types)
 
     @property
-    def transcript_extractor(self):
-        """Get transcript extractor (cached)."""
-        return self._transcript_extractor_cache
+    def transcript_index(self) -> TranscriptIndex:
+        """Get transcript interval index (cached)."""
+        return self._transcript_index_cache
+
+    def transcript_hits(self, interval: genome.Interval) -> TranscriptHits:
+        """Get transcripts overlapping an interval as compact arrays."""
+        return self.transcript_index.hits(interval)
 
-    def predict_interval(
+    async def predict_interval(
         self,
         chromosome: str,
         start: int,
         end: int,
         output_types: list[str],
         ontology_terms: list[str],
+        tile: bool = False,
     ):
         """Make predictions for a genomic interval.
 
@@ -72,29 +124,214 @@ class AlphaGenomeService:
             end: End position
             output_types: List of output type names
             ontology_terms: List of ontology term codes
+            tile: Cover intervals wider than the largest model window with
+                overlapping windows instead of truncating to one window
 
         Returns:
             Tuple of (output, resized_interval, transcripts)
         """
+        if tile and end - start > max(SEQUENCE_LENGTHS):
+            return await self.predict_interval_tiled(
+                chromosome, start, end, output_types, ontology_terms
+            )
+
         interval = genome.Interval(chromosome, start, end)
         seq_length = get_sequence_length(interval.width)
         interval = interval.resize(seq_length)
 
-        requested_outputs = [
-            getattr(dna_client.OutputType, ot) for ot in output_types
-        ]
+        output = await self.predict_window(interval, output_types, ontology_terms)
+        transcripts = await run_sdk(self.transcript_index.extract, interval)
+
+        return output, interval, transcripts
+
+    async def predict_interval_tiled(
+        self,
+        chromosome: str,
+        start: int,
+        end: int,
+        output_types: list[str],
+        ontology_terms: list[str],
+    ):
+        """Predict a wide interval as overlapping windows, fetched concurrently.
+
+        Each window goes through the prediction cache, and the window cores
+        are stitched into one continuous TrackData per output type. The
+        stitched arrays must fit in TILED_MAX_BYTES; their track counts come
+        from the metadata catalog, or from the first window while the catalog
+        is unavailable.
+
+        Returns:
+            Tuple of (output, stitched_interval, transcripts)
+
+        Raises:
+            ValueError: If the interval is too wide, outside the chromosome or
+                over the memory budget, or an output type cannot be stitched
+        """
+        if end - start > TILED_MAX_WIDTH:
+            raise ValueError(f"Tiled intervals are limited to {TILED_MAX_WIDTH:,} bp")
+        untileable = sorted(UNTILEABLE_OUTPUT_TYPES.intersection(output_types))
+        if untileable:
+            raise ValueError(
+                f"Tiled predictions do not support {', '.join(untileable)}"
+            )
+
+        await self.check_ontology_terms(output_types, ontology_terms)
+        plan = plan_tiles(chromosome, start, end, CHROMOSOME_LENGTHS[chromosome])
+        slots = asyncio.Semaphore(TILE_CONCURRENCY)
+
+        async def predict(window: genome.Interval) -> dna_client.Output:
+            async with slots:
+                return await self.predict_window(window, output_types, ontology_terms)
+
+        def check_budget(tracks: dict[str, int]) -> None:
+            size = stitched_bytes(plan, tracks)
+            if size > TILED_MAX_BYTES:
+                raise ValueError(
+                    f"Tiled prediction of {plan.interval.width:,} bp would need "
+                    f"{size / 1024**2:,.0f} MB of track values (limit "
+                    f"{TILED_MAX_BYTES / 1024**2:,.0f} MB); use fewer output "
+                    "types, add ontology terms or request a narrower interval"
+                )
+
+        catalog = await ontology_catalog.refresh(self.client, self.api_key)
+        if catalog is not None:
+            check_budget(
+                {ot: catalog.track_count(ot, ontology_terms) for ot in output_types}
+            )
+            tiles = await asyncio.gather(*(predict(w) for w in plan.windows))
+        else:
+            first = await predict(plan.windows[0])
+            check_budget(
+                {ot: getattr(first, ot.lower()).num_tracks for ot in output_types}
+            )
+            tiles = [first] + list(
+                await asyncio.gather(*(predict(w) for w in plan.windows[1:]))
+            )
+
+        def stitch_all() -> dna_client.Output:
+            return dna_client.Output(
+                **{
+                    ot.lower(): stitch(plan, [getattr(t, ot.lower()) for t in tiles])
+                    for ot in output_types
+                }
+            )
 
-        output = self.client.predict_interval(
-            interval=interval,
-            requested_outputs=requested_outputs,
-            ontology_terms=ontology_terms,
+        output = await run_sdk(stitch_all)
+        transcripts = await run_sdk(self.transcript_index.extract, plan.interval)
+
+        return output, plan.interval, transcripts
+
+    async def predict_window(
+        self,
+        interval: genome.Interval,
+        output_types: list[str],
+        ontology_terms: list[str],
+    ) -> dna_client.Output:
+        """Predict one model-sized window through the prediction cache."""
+        await self.check_ontology_terms(output_types, ontology_terms)
+        ontology = tuple(sorted(set(ontology_terms)))
+        keys = {
+            ot: PredictionKey("interval", str(interval), "", ot, ontology)
+            for ot in output_types
+        }
+
+        async def fetch(missing: list[PredictionKey]) -> dict:
+            label = output_type_label(k.output_type for k in missing)
+            with span("predict_interval", label):
+                output = await remote_scheduler.call(
+                    self.api_key,
+                    "predict_interval",
+                    self.client.predict_interval,
+                    interval=interval,
+                    requested_outputs=[
+                        getattr(dna_client.OutputType, k.output_type) for k in missing
+                    ],
+                    ontology_terms=list(ontology),
+                )
+            return {k: getattr(output, k.output_type.lower()) for k in missing}
+
+        tracks = await prediction_cache.aget_or_fetch(list(keys.values()), fetch)
+        return dna_client.Output(
+            **{ot.lower(): tracks[key] for ot, key in keys.items()}
         )
 
-        transcripts = self.transcript_extractor.extract(interval)
+    async def interval_pyramid(
+        self,
+        chromosome: str,
+        start: int,
+        end: int,
+        output_type: str,
+        ontology_terms: list[str],
+        tile: bool = False,
+    ):
+        """Get the zoom pyramid for one output type of an interval prediction.
 
-        return output, interval, transcripts
+        The summary levels are built once from the cached prediction and
+        cached alongside it; the base level is the prediction itself, so it
+        is not stored (or charged to the cache) twice.
+
+        Returns:
+            Tuple of (TrackPyramid, track_data)
+        """
+        output, interval, _ = await self.predict_interval(
+            chromosome, start, end, [output_type], ontology_terms, tile
+        )
+        track_data = getattr(output, output_type.lower())
+        summaries = await run_plot(
+            self._derived,
+            "pyramid",
+            interval,
+            output_type,
+            ontology_terms,
+            summary_levels,
+            track_data,
+        )
+        return TrackPyramid.from_summaries(track_data, summaries), track_data
+
+    async def contact_map_tiles(
+        self,
+        chromosome: str,
+        start: int,
+        end: int,
+        ontology_terms: list[str],
+    ):
+        """Get the upper-triangle zoom tiles of an interval's contact maps.
+
+        Built once from the cached prediction and cached alongside it, like
+        the zoom pyramid of 1D tracks.
+
+        Returns:
+            Tuple of (ContactMapTiles, track_data)
+        """
+        output, interval, _ = await self.predict_interval(
+            chromosome, start, end, ["CONTACT_MAPS"], ontology_terms
+        )
+        track_data = output.contact_maps
+        tiles = await run_plot(
+            self._derived,
+            "contact_tiles",
+            interval,
+            "CONTACT_MAPS",
+            ontology_terms,
+            ContactMapTiles.build,
+            track_data,
+        )
+        return tiles, track_data
+
+    @staticmethod
+    def _derived(kind, interval, output_type, ontology_terms, build, track_data):
+        """Structure built from a prediction, cached under its own key."""
+        key = PredictionKey(
+            kind, str(interval), "", output_type, tuple(sorted(set(ontology_terms)))
+        )
+
+        def fetch(missing: list[PredictionKey]) -> dict:
+            with span(f"build_{kind}", output_type):
+                return {key: build(track_data)}
+
+        return prediction_cache.get_or_fetch([key], fetch)[key]
 
-    def predict_variant(
+    async def predict_variant(
         self,
         chromosome: str,
         position: int,
@@ -116,32 +353,118 @@ class AlphaGenomeService:
         Returns:
             Tuple of (variant_output, variant, interval, transcripts)
         """
-        variant = genome.Variant(
-            chromosome=chromosome,
-            position=position,
-            reference_bases=ref,
-            alternate_bases=alt,
+        reference, alternates, variants, interval, transcripts = (
+            await self.predict_alleles(
+                chromosome, position, ref, [alt], output_types, ontology_terms
+            )
+        )
+        variant_output = dna_client.VariantOutput(
+            reference=reference, alternate=alternates[alt]
         )
+        return variant_output, variants[alt], interval, transcripts
 
-        # Use smallest sequence length for single-position variants
-        interval = variant.reference_interval.resize(get_sequence_length(1))
+    async def predict_alleles(
+        self,
+        chromosome: str,
+        position: int,
+        ref: str,
+        alts: list[str],
+        output_types: list[str],
+        ontology_terms: list[str],
+    ):
+        """Make predictions for several ALT alleles at one position.
 
-        requested_outputs = [
-            getattr(dna_client.OutputType, ot) for ot in output_types
-        ]
+        ALT arms are fetched concurrently and cached per allele. The REF arm
+        is cached once, under the same key as an interval prediction of the
+        window, and shared by every allele.
+
+        Args:
+            chromosome: Chromosome (e.g., "chr22")
+            position: Variant position
+            ref: Reference allele
+            alts: Alternate alleles
+            output_types: List of output type names
+            ontology_terms: List of ontology term codes
+
+        Returns:
+            Tuple of (reference_output, {alt: alternate_output},
+            {alt: variant}, interval, transcripts)
+        """
+        await self.check_ontology_terms(output_types, ontology_terms)
+        variants = {
+            alt: genome.Variant(
+                chromosome=chromosome,
+                position=position,
+                reference_bases=ref,
+                alternate_bases=alt,
+            )
+            for alt in alts
+        }
 
-        variant_output = self.client.predict_variant(
-            interval=interval,
-            variant=variant,
-            requested_outputs=requested_outputs,
-            ontology_terms=ontology_terms,
+        # Use smallest sequence length for single-position variants
+        first = next(iter(variants.values()))
+        interval = first.reference_interval.resize(get_sequence_length(1))
+
+        ontology = tuple(sorted(set(ontology_terms)))
+        ref_keys = {
+            ot: PredictionKey("interval", str(interval), "", ot, ontology)
+            for ot in output_types
+        }
+
+        slots = asyncio.Semaphore(VARIANT_ALLELE_CONCURRENCY)
+
+        async def predict_alt(variant: genome.Variant) -> dna_client.Output:
+            keys = {
+                ot: PredictionKey("variant", str(interval), str(variant), ot, ontology)
+                for ot in output_types
+            }
+
+            async def fetch(missing: list[PredictionKey]) -> dict:
+                # The SDK always returns both arms; keep REF for every allele
+                label = output_type_label(k.output_type for k in missing)
+                async with slots:
+                    with span("predict_variant", label):
+                        variant_output = await remote_scheduler.call(
+                            self.api_key,
+                            "predict_variant",
+                            self.client.predict_variant,
+                            interval=interval,
+                            variant=variant,
+                            requested_outputs=[
+                                getattr(dna_client.OutputType, k.output_type)
+                                for k in missing
+                            ],
+                            ontology_terms=list(ontology),
+                        )
+                for k in missing:
+                    prediction_cache.setdefault(
+                        ref_keys[k.output_type],
+                        getattr(variant_output.reference, k.output_type.lower()),
+                    )
+                return {
+                    k: getattr(variant_output.alternate, k.output_type.lower())
+                    for k in missing
+                }
+
+            arms = await prediction_cache.aget_or_fetch(list(keys.values()), fetch)
+            return dna_client.Output(
+                **{ot.lower(): arms[key] for ot, key in keys.items()}
+            )
+
+        alternates = dict(
+            zip(
+                variants,
+                await asyncio.gather(*(predict_alt(v) for v in variants.values())),
+            )
         )
 
-        transcripts = self.transcript_extractor.extract(interval)
+        # Seeded by the ALT fetches above; only predicted remotely if evicted
+        reference = await self.predict_window(interval, output_types, ontology_terms)
+        transcripts = await run_sdk(self.transcript_index.extract, interval)
 
-        return variant_output, variant, interval, transcripts
+        return reference, alternates, variants, interval, transcripts
 
-    def score_variant(
+    async def score_variant(
         self,
         chromosome: str,
         position: int,
@@ -170,18 +493,42 @@ class AlphaGenomeService:
 
         interval = variant.reference_interval.resize(dna_client.SEQUENCE_LENGTH_1MB)
 
-        all_scores = []
-        for ot in output_types:
-            scorer = variant_scorers.RECOMMENDED_VARIANT_SCORERS[ot]
-            scores = self.client.score_variant(
-                interval=interval,
-                variant=variant,
-                variant_scorers=[scorer],
-            )
-            tidy = variant_scorers.tidy_scores(scores, match_gene_strand=True)
-            tidy["output_type"] = ot
-            all_scores.append(tidy)
+        scorers = [
+            variant_scorers.RECOMMENDED_VARIANT_SCORERS[ot]
+            for ot in dict.fromkeys(output_types)
+        ]
+        if not scorers:
+            return pd.DataFrame()
+
+        # Submit every scorer in as few remote calls as the API allows
+        batch_size = dna_client.MAX_VARIANT_SCORERS_PER_REQUEST
+        batches = [
+            scorers[i : i + batch_size] for i in range(0, len(scorers), batch_size)
+        ]
+
+        label = output_type_label(dict.fromkeys(output_types))
+
+        slots = asyncio.Semaphore(SCORE_VARIANT_MAX_WORKERS)
+
+        async def score(batch):
+            async with slots:
+                with span("score_variant", label):
+                    return await remote_scheduler.call(
+                        self.api_key,
+                        "score_variant",
+                        self.client.score_variant,
+                        interval=interval,
+                        variant=variant,
+                        variant_scorers=batch,
+                    )
+
+        results = await asyncio.gather(*(score(batch) for batch in batches))
+        scores = [adata for result in results for adata in result]
+
+        # One tidy pass over all scorers; output_type comes from each scorer
+        def tidy_all() -> pd.DataFrame:
+            with span("tidy_scores", label):
+                tidy = variant_scorers.tidy_scores(scores, match_gene_strand=True)
+            return tidy if tidy is not None else pd.DataFrame()
 
-        if all_scores:
-            return pd.concat(all_scores, ignore_index=True)
-        return pd.DataFrame()
+        return await run_sdk(tidy_all)
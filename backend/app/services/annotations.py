@@ -0,0 +1,134 @@
+"""On-disk GENCODE annotation store.
+
+The GENCODE GTF is fetched once (or read from a local path), filtered to
+protein-coding MANE Select transcripts and written as an uncompressed Arrow
+IPC file named after the source, so a different source gets its own file.
+Every worker process memory-maps that file, so the annotation pages live in
+the OS page cache once and are shared instead of being copied into each
+process.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+from alphagenome.data import gene_annotation
+
+from app.config import ANNOTATION_CACHE_DIR, ANNOTATION_FILENAME, GTF_PATH
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# GTF URL for gene annotations
+GTF_URL = (
+    "https://storage.googleapis.com/alphagenome/reference/gencode/"
+    "hg38/gencode.v46.annotation.gtf.gz.feather"
+)
+
+
+def annotation_source() -> str:
+    """The GTF the annotations are built from: $GTF_PATH, else GTF_URL."""
+    return GTF_PATH or GTF_URL
+
+
+def annotation_cache_path(source: str | None = None) -> str:
+    """Path of the memory-mappable annotation file built from `source`.
+
+    The file name carries a hash of the source's identity (absolute path,
+    size and modification time of a local file, else the URL), so pointing
+    $GTF_PATH elsewhere or replacing the file builds a new cache instead of
+    reusing a stale one.
+    """
+    source = source or annotation_source()
+    identity = source
+    if os.path.exists(source):
+        st = os.stat(source)
+        identity = f"{os.path.abspath(source)}:{st.st_size}:{st.st_mtime_ns}"
+    digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+    stem, ext = os.path.splitext(ANNOTATION_FILENAME)
+    return os.path.join(ANNOTATION_CACHE_DIR, f"{stem}.{digest}{ext}")
+
+
+@contextmanager
+def _build_lock(path: str):
+    """Hold an exclusive file lock so concurrent workers build the cache once."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_source(source: str) -> pd.DataFrame:
+    """Read a GTF table from a feather/Arrow file path or URL."""
+    if source.endswith((".arrow", ".ipc")):
+        with pa.memory_map(source) as f:
+            return pa.ipc.open_file(f).read_pandas()
+    return pd.read_feather(source)
+
+
+def build_annotation_cache(source: str | None = None, force: bool = False) -> str:
+    """Fetch, filter and persist the annotation table.
+
+    Args:
+        source: GTF feather/Arrow path or URL (default: $GTF_PATH, then GTF_URL)
+        force: Rebuild even if the cache file for `source` already exists
+
+    Returns:
+        Path to the Arrow IPC annotation file
+    """
+    source = source or annotation_source()
+    path = annotation_cache_path(source)
+    os.makedirs(ANNOTATION_CACHE_DIR, exist_ok=True)
+
+    with _build_lock(path):
+        if os.path.exists(path) and not force:
+            return path
+
+        gtf = _read_source(source)
+        gtf = gene_annotation.filter_protein_coding(gtf)
+        gtf = gene_annotation.filter_to_mane_select_transcript(gtf)
+        table = pa.Table.from_pandas(gtf, preserve_index=False)
+
+        # Write uncompressed (compressed buffers cannot be memory-mapped) and
+        # swap into place atomically so readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=ANNOTATION_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return path
+
+
+def _arrow_string_types(arrow_type: pa.DataType):
+    """Keep string columns Arrow-backed so they stay on the mapped pages."""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def load_mane_transcripts() -> pd.DataFrame:
+    """Load protein-coding MANE Select GTF entries from the memory-mapped store."""
+    path = annotation_cache_path()
+    if not os.path.exists(path):
+        build_annotation_cache()
+
+    with pa.memory_map(path) as f:
+        table = pa.ipc.open_file(f).read_all()
+    return table.to_pandas(types_mapper=_arrow_string_types, split_blocks=True)
@@ -0,0 +1,217 @@
+"""Batch variant scoring from VCF/TSV input with NDJSON output."""
+
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+from dataclasses import dataclass
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from app.config import BATCH_CHECKPOINT_DIR, BATCH_PARSE_CHUNK, BATCH_PROGRESS_EVERY
+from app.schemas.models import ALLELE_PATTERN
+from app.services.client_pool import hash_api_key
+from app.services.executors import run_sdk
+from app.services.scores import score_records
+
+CHROMOSOME_PATTERN = re.compile(r"^chr([1-9]|1[0-9]|2[0-2]|X|Y)$")
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+@dataclass(frozen=True)
+class VariantRecord:
+    """A single parsed REF/ALT variant."""
+
+    chromosome: str
+    position: int
+    ref: str
+    alt: str
+
+    @property
+    def variant_id(self) -> str:
+        return f"{self.chromosome}:{self.position}:{self.ref}>{self.alt}"
+
+
+@dataclass(frozen=True)
+class ParseError:
+    """An input line that could not be parsed."""
+
+    line_number: int
+    line: str
+    error: str
+
+
+def parse_variants(lines: Iterable[str]) -> Iterator[VariantRecord | ParseError]:
+    """Parse variants from VCF or TSV lines.
+
+    VCF input uses the CHROM, POS, REF and ALT columns; multi-allelic ALT
+    fields yield one record per allele. TSV input needs chromosome, position,
+    ref and alt as the first four columns (an optional header row is skipped).
+    Chromosomes without a "chr" prefix are normalized.
+    """
+    is_vcf = False
+    for line_number, raw in enumerate(lines, start=1):
+        line = raw.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if line.startswith("#"):
+            is_vcf = is_vcf or line.startswith(("##fileformat=VCF", "#CHROM"))
+            continue
+
+        fields = line.split("\t") if "\t" in line else line.split()
+        columns = (0, 1, 3, 4) if is_vcf else (0, 1, 2, 3)
+        if len(fields) <= max(columns):
+            yield ParseError(
+                line_number, line, "expected chromosome, position, ref, alt"
+            )
+            continue
+
+        chromosome, position, ref, alts = (fields[i].strip() for i in columns)
+        if not is_vcf and not position.isdigit() and line_number == 1:
+            continue  # header row
+        if not chromosome.startswith("chr"):
+            chromosome = f"chr{chromosome}"
+
+        if not CHROMOSOME_PATTERN.match(chromosome):
+            yield ParseError(line_number, line, f"unsupported chromosome {chromosome}")
+            continue
+        if not position.isdigit() or int(position) <= 0:
+            yield ParseError(line_number, line, f"invalid position {position}")
+            continue
+
+        for alt in alts.split(","):
+            if not (
+                ALLELE_PATTERN.match(ref.upper()) and ALLELE_PATTERN.match(alt.upper())
+            ):
+                yield ParseError(line_number, line, f"invalid alleles {ref}>{alt}")
+                continue
+            yield VariantRecord(chromosome, int(position), ref.upper(), alt.upper())
+
+
+def open_variant_file(fileobj, filename: str = "") -> io.TextIOBase:
+    """Wrap a binary file object (optionally gzip-compressed) as text lines."""
+    if filename.endswith(".gz"):
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return io.TextIOWrapper(fileobj, encoding="utf-8", errors="replace")
+
+
+def checkpoint_path(api_key: str, run_id: str) -> str:
+    """Server-side checkpoint file for a batch run, namespaced by API key."""
+    if not RUN_ID_PATTERN.match(run_id):
+        raise ValueError("run_id may only contain letters, digits, '.', '_' and '-'")
+    return os.path.join(
+        BATCH_CHECKPOINT_DIR, f"{hash_api_key(api_key)[:16]}_{run_id}.ndjson"
+    )
+
+
+def read_checkpoint(path: str) -> set[str]:
+    """Variant IDs already scored successfully in a previous run."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from an interrupted write
+            if row.get("type") == "result":
+                done.add(row["variant_id"])
+    return done
+
+
+def to_ndjson(row: dict) -> str:
+    """Serialize one output row as an NDJSON line."""
+    return json.dumps(row, separators=(",", ":"), allow_nan=False) + "\n"
+
+
+async def iter_chunked(
+    records: Iterable, chunk_size: int = BATCH_PARSE_CHUNK
+) -> AsyncIterator:
+    """Iterate a blocking iterable, pulling `chunk_size` items per executor call."""
+    iterator = iter(records)
+    while chunk := await run_sdk(list, islice(iterator, chunk_size)):
+        for record in chunk:
+            yield record
+
+
+async def score_variants_stream(
+    service,
+    records: Iterable[VariantRecord | ParseError],
+    output_types: list[str],
+    concurrency: int,
+    done: set[str] | None = None,
+    progress_every: int = BATCH_PROGRESS_EVERY,
+) -> AsyncIterator[dict]:
+    """Score variants with bounded concurrency, yielding rows as they finish.
+
+    `records` (e.g. a `parse_variants` generator over an upload) is read off
+    the event loop in chunks of BATCH_PARSE_CHUNK, only as fast as scoring
+    slots free up, so a large input is never held in memory. Yields dicts
+    with a "type" of "result" (one per scored variant, with its score rows),
+    "error", "progress" (every `progress_every` variants) and a final
+    "summary". Variants in `done` are skipped as they are read.
+    """
+    seen = set(done or ())
+    counts = {"completed": 0, "failed": 0, "skipped": 0, "invalid": 0}
+    pending: set[asyncio.Task] = set()
+
+    async def score_one(record: VariantRecord) -> dict:
+        try:
+            df = await service.score_variant(
+                chromosome=record.chromosome,
+                position=record.position,
+                ref=record.ref,
+                alt=record.alt,
+                output_types=output_types,
+            )
+        except Exception as e:
+            return {"type": "error", "variant_id": record.variant_id, "error": str(e)}
+        return {
+            "type": "result",
+            "variant_id": record.variant_id,
+            "scores": score_records(df),
+        }
+
+    def progress() -> dict:
+        return {"type": "progress", **counts, "in_flight": len(pending)}
+
+    async def drain(return_when) -> AsyncIterator[dict]:
+        finished, _ = await asyncio.wait(pending, return_when=return_when)
+        for task in finished:
+            pending.discard(task)
+            row = task.result()
+            counts["completed" if row["type"] == "result" else "failed"] += 1
+            yield row
+            if (counts["completed"] + counts["failed"]) % progress_every == 0:
+                yield progress()
+
+    try:
+        async for record in iter_chunked(records):
+            if isinstance(record, ParseError):
+                counts["invalid"] += 1
+                yield {
+                    "type": "error",
+                    "line_number": record.line_number,
+                    "error": record.error,
+                }
+                continue
+            if record.variant_id in seen:
+                counts["skipped"] += 1
+                continue
+            while len(pending) >= concurrency:
+                async for row in drain(asyncio.FIRST_COMPLETED):
+                    yield row
+            pending.add(asyncio.create_task(score_one(record)))
+            seen.add(record.variant_id)  # skip duplicates within the input
+
+        while pending:
+            async for row in drain(asyncio.ALL_COMPLETED):
+                yield row
+    finally:
+        for task in pending:
+            task.cancel()
+
+    yield {"type": "summary", **counts}
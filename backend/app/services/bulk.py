@@ -0,0 +1,399 @@
+"""Bulk interval prediction from BED regions, one prediction per model window."""
+
+import asyncio
+import io
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from alphagenome.data import genome
+
+from app.config import BULK_MAX_REGIONS, SEQUENCE_LENGTHS, TRACK_STATS_PERCENTILES
+from app.services.alphagenome import get_sequence_length
+from app.services.batch import CHROMOSOME_PATTERN, ParseError
+from app.services.executors import run_plot
+from app.services.track_export import downsample
+from app.services.track_stats import summarize_tracks
+
+BED_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@dataclass(frozen=True)
+class BedRegion:
+    """A half-open [start, end) region from a BED file."""
+
+    index: int  # position in the input, among valid regions
+    chromosome: str
+    start: int
+    end: int
+    name: str
+
+
+@dataclass(frozen=True)
+class RegionWindow:
+    """One model window and the regions it fully contains."""
+
+    interval: genome.Interval
+    regions: list[BedRegion]
+
+
+def parse_bed(lines: Iterable[str]) -> Iterator[BedRegion | ParseError]:
+    """Parse BED3+ lines; the optional fourth column is the region name.
+
+    Header, "track" and "browser" lines are skipped. Chromosomes without a
+    "chr" prefix are normalized. Unnamed regions are named chrom:start-end.
+    """
+    index = 0
+    for line_number, raw in enumerate(lines, start=1):
+        line = raw.rstrip("\r\n")
+        if not line.strip() or line.startswith(("#", "track", "browser")):
+            continue
+
+        fields = line.split("\t") if "\t" in line else line.split()
+        if len(fields) < 3:
+            yield ParseError(line_number, line, "expected chromosome, start, end")
+            continue
+
+        chromosome, start, end = (f.strip() for f in fields[:3])
+        if not chromosome.startswith("chr"):
+            chromosome = f"chr{chromosome}"
+        if not CHROMOSOME_PATTERN.match(chromosome):
+            yield ParseError(line_number, line, f"unsupported chromosome {chromosome}")
+            continue
+        if not (start.isdigit() and end.isdigit()) or int(end) <= int(start):
+            yield ParseError(line_number, line, f"invalid region {start}-{end}")
+            continue
+
+        start, end = int(start), int(end)
+        name = fields[3].strip() if len(fields) > 3 and fields[3].strip() else ""
+        yield BedRegion(
+            index, chromosome, start, end, name or f"{chromosome}:{start}-{end}"
+        )
+        index += 1
+
+
+def plan_windows(
+    regions: Iterable[BedRegion], max_width: int = max(SEQUENCE_LENGTHS)
+) -> list[RegionWindow]:
+    """Group regions into as few model windows as possible.
+
+    Per chromosome, a window is anchored at the leftmost unassigned region
+    and takes every unassigned region that ends within `max_width` of it;
+    no window containing that region can hold more of the remaining ones, so
+    this gives the minimum number of full-size windows. Each window is then
+    shrunk to the smallest supported sequence length covering its regions,
+    centered on them the same way single-interval requests are, so repeated
+    regions share cache entries with /api/predict/interval.
+
+    Regions wider than `max_width` must be filtered out by the caller.
+    """
+    by_chromosome: dict[str, list[BedRegion]] = {}
+    for region in regions:
+        by_chromosome.setdefault(region.chromosome, []).append(region)
+
+    windows = []
+    for chromosome in sorted(by_chromosome):
+        remaining = sorted(by_chromosome[chromosome], key=lambda r: (r.start, r.end))
+        while remaining:
+            limit = remaining[0].start + max_width
+            members = [r for r in remaining if r.end <= limit]
+            remaining = [r for r in remaining if r.end > limit]
+            lo = members[0].start
+            hi = max(r.end for r in members)
+            interval = genome.Interval(chromosome, lo, hi).resize(
+                get_sequence_length(hi - lo)
+            )
+            windows.append(RegionWindow(interval, members))
+    return windows
+
+
+def region_rows(
+    window: RegionWindow,
+    track_data,
+    output_type: str,
+    width: int | None = None,
+) -> list[dict]:
+    """Slice each region out of a window's TrackData and summarize it.
+
+    Returns one "result" row per region, with per-track statistics and, when
+    `width` is set, the region's values downsampled to at most `width` bins.
+    """
+    values = np.asarray(track_data.values)
+    resolution = track_data.resolution
+    origin = window.interval.start
+    metadata = track_data.metadata
+
+    def column(name):
+        if name in metadata.columns:
+            return metadata[name].fillna("").astype(str).tolist()
+        return [""] * values.shape[1]
+
+    names, strands = column("name"), column("strand")
+    ontology_terms = column("ontology_curie")
+
+    rows = []
+    for region in window.regions:
+        lo = (region.start - origin) // resolution
+        hi = -(-(region.end - origin) // resolution)
+        sliced = values[lo:hi]
+        summary = summarize_tracks(
+            sliced, resolution=resolution, start=origin + lo * resolution
+        )
+        stats = {
+            "min": summary.min,
+            "max": summary.max,
+            "mean": summary.mean,
+            **summary.percentiles,
+        }
+        stats = {k: _finite(v) for k, v in stats.items()}
+        argmax = summary.argmax_position.tolist()
+        reduced = downsample(sliced, width)[0] if width else None
+
+        tracks = []
+        for i in range(values.shape[1]):
+            track = {
+                "track_name": names[i],
+                "strand": strands[i],
+                "ontology_term": ontology_terms[i],
+                **{k: v[i] for k, v in stats.items()},
+                "argmax_position": argmax[i] if stats["min"][i] is not None else None,
+            }
+            if reduced is not None:
+                track["values"] = _finite(reduced[:, i])
+            tracks.append(track)
+
+        rows.append(
+            {
+                "type": "result",
+                "region_index": region.index,
+                "name": region.name,
+                "chromosome": region.chromosome,
+                "start": region.start,
+                "end": region.end,
+                "window": str(window.interval),
+                "output_type": output_type,
+                "resolution": resolution,
+                "tracks": tracks,
+            }
+        )
+    return rows
+
+
+def _finite(values: np.ndarray) -> list:
+    return [None if v != v else v for v in values.tolist()]
+
+
+def load_regions(
+    records: Iterable[BedRegion | ParseError],
+    max_regions: int = BULK_MAX_REGIONS,
+    max_width: int = max(SEQUENCE_LENGTHS),
+) -> tuple[list[BedRegion], list[dict]]:
+    """Split parsed BED records into predictable regions and error rows.
+
+    Raises:
+        ValueError: If the input has more than `max_regions` regions
+    """
+    regions, errors = [], []
+    for record in records:
+        if isinstance(record, ParseError):
+            errors.append(
+                {
+                    "type": "error",
+                    "line_number": record.line_number,
+                    "error": record.error,
+                }
+            )
+        elif record.end - record.start > max_width:
+            errors.append(
+                {
+                    "type": "error",
+                    "region_index": record.index,
+                    "name": record.name,
+                    "error": f"region is wider than {max_width:,} bp; "
+                    "predict it as a tiled interval instead",
+                }
+            )
+        else:
+            regions.append(record)
+            if len(regions) > max_regions:
+                raise ValueError(f"BED input is limited to {max_regions:,} regions")
+    return regions, errors
+
+
+async def predict_regions_stream(
+    service,
+    regions: list[BedRegion],
+    errors: list[dict],
+    output_types: list[str],
+    ontology_terms: list[str],
+    concurrency: int,
+    width: int | None = None,
+) -> AsyncIterator[dict]:
+    """Predict every BED region, one remote call per merged window.
+
+    Yields a "plan" row (regions, windows and bases predicted), the input
+    `errors`, then "result" rows per (region, output type) as windows finish,
+    "error" rows for regions of failed windows, a "progress" row per window
+    and a final "summary".
+    """
+    windows = plan_windows(regions)
+    counts = {
+        "regions": len(regions),
+        "windows": len(windows),
+        "invalid": len(errors),
+        "completed": 0,
+        "failed": 0,
+    }
+    yield {
+        "type": "plan",
+        "regions": len(regions),
+        "windows": len(windows),
+        "bases_predicted": sum(w.interval.width for w in windows),
+        "bases_requested": sum(r.end - r.start for r in regions),
+    }
+    for row in errors:
+        yield row
+
+    async def predict(window: RegionWindow) -> list[dict]:
+        try:
+            output = await service.predict_window(
+                window.interval, output_types, ontology_terms
+            )
+            rows = []
+            for ot in output_types:
+                rows.extend(
+                    await run_plot(
+                        region_rows, window, getattr(output, ot.lower()), ot, width
+                    )
+                )
+            return rows
+        except Exception as e:
+            return [
+                {
+                    "type": "error",
+                    "region_index": region.index,
+                    "name": region.name,
+                    "window": str(window.interval),
+                    "error": str(e),
+                }
+                for region in window.regions
+            ]
+
+    pending: set[asyncio.Task] = set()
+    queue = iter(windows)
+    try:
+        while True:
+            for window in queue:
+                pending.add(asyncio.create_task(predict(window)))
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                break
+            finished, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                rows = task.result()
+                failed = any(row["type"] == "error" for row in rows)
+                counts["failed" if failed else "completed"] += 1
+                for row in rows:
+                    yield row
+                yield {
+                    "type": "progress",
+                    "windows_done": counts["completed"] + counts["failed"],
+                    "windows": len(windows),
+                }
+    finally:
+        for task in pending:
+            task.cancel()
+
+    yield {"type": "summary", **counts}
+
+
+def parquet_schema(with_values: bool = False) -> pa.Schema:
+    """Flat one-row-per-track schema for bulk results."""
+    fields = [
+        pa.field("region_index", pa.int64()),
+        pa.field("name", pa.string()),
+        pa.field("chromosome", pa.string()),
+        pa.field("start", pa.int64()),
+        pa.field("end", pa.int64()),
+        pa.field("window", pa.string()),
+        pa.field("output_type", pa.string()),
+        pa.field("resolution", pa.int32()),
+        pa.field("track_name", pa.string()),
+        pa.field("strand", pa.string()),
+        pa.field("ontology_term", pa.string()),
+        pa.field("min", pa.float32()),
+        pa.field("max", pa.float32()),
+        pa.field("mean", pa.float32()),
+        *[pa.field(f"p{q:g}", pa.float32()) for q in TRACK_STATS_PERCENTILES],
+        pa.field("argmax_position", pa.int64()),
+    ]
+    if with_values:
+        fields.append(pa.field("values", pa.list_(pa.float32())))
+    fields.append(pa.field("error", pa.string()))
+    return pa.schema(fields)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out its buffer while keeping the offset.
+
+    Parquet records absolute column chunk offsets, so `tell` must keep
+    counting after the buffered bytes have been taken.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ParquetStream:
+    """Incrementally encode bulk rows as Parquet, one row group per write.
+
+    `write` returns the bytes produced so far, so a response can stream each
+    window's row group as soon as it is ready; `close` returns the footer.
+    """
+
+    def __init__(self, with_values: bool = False):
+        self.schema = parquet_schema(with_values)
+        self._sink = _Sink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="zstd")
+
+    def write(self, rows: list[dict]) -> bytes:
+        """Encode "result" and "error" rows; other row types are ignored."""
+        records = []
+        for row in rows:
+            if row["type"] == "result":
+                region = {k: row.get(k) for k in self.schema.names[:8]}
+                records.extend({**region, **track} for track in row["tracks"])
+            elif row["type"] == "error":
+                records.append({k: row.get(k) for k in self.schema.names})
+        if records:
+            self._writer.write_table(pa.Table.from_pylist(records, schema=self.schema))
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
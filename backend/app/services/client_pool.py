@@ -0,0 +1,180 @@
+"""Pool of reusable AlphaGenome clients keyed by API key."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.config import (
+    CLIENT_POOL_HEALTH_CHECK_INTERVAL,
+    CLIENT_POOL_HEALTH_CHECK_TIMEOUT,
+    CLIENT_POOL_IDLE_TIMEOUT,
+    CLIENT_POOL_MAX_SIZE,
+)
+from app.services.metrics import span
+
+if TYPE_CHECKING:
+    import grpc
+    from alphagenome.models import dna_client
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key so raw keys are never kept as dictionary keys."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _PoolEntry:
+    client: "dna_client.DnaClient"
+    created_at: float
+    last_used: float
+    last_checked: float
+
+
+class ClientPool:
+    """Bounded LRU pool of `DnaClient` instances.
+
+    Each API key maps to a single client (and therefore a single gRPC channel)
+    that is shared by every request made with that key. Entries are evicted
+    when they have been idle for longer than `idle_timeout` seconds or when
+    the pool grows beyond `max_size`. Evicted channels are not closed
+    explicitly: requests that still hold the client keep working and the
+    channel is released once the last reference is dropped.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CLIENT_POOL_MAX_SIZE,
+        idle_timeout: float = CLIENT_POOL_IDLE_TIMEOUT,
+        health_check_interval: float = CLIENT_POOL_HEALTH_CHECK_INTERVAL,
+        health_check_timeout: float = CLIENT_POOL_HEALTH_CHECK_TIMEOUT,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._entries: OrderedDict[str, _PoolEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def get(self, api_key: str) -> "dna_client.DnaClient":
+        """Return a healthy client for `api_key`, creating one if needed."""
+        key = hash_api_key(api_key)
+
+        with self._lock:
+            self._evict_idle()
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Serialize creation per key so concurrent first requests share a channel
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+
+            if entry is not None and self._is_healthy(entry):
+                with self._lock:
+                    entry.last_used = time.monotonic()
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    else:
+                        self._insert(key, entry)
+                return entry.client
+
+            # The SDK (and gRPC) load on first use, not at server start
+            from alphagenome.models import dna_client
+
+            try:
+                with span("client_create"):
+                    client = dna_client.create(api_key)
+            except Exception:
+                with self._lock:
+                    self._entries.pop(key, None)
+                    self._key_locks.pop(key, None)
+                raise
+            now = time.monotonic()
+            with self._lock:
+                self._insert(
+                    key,
+                    _PoolEntry(
+                        client=client, created_at=now, last_used=now, last_checked=now
+                    ),
+                )
+            return client
+
+    def discard(self, api_key: str) -> None:
+        """Drop the pooled client for `api_key` (e.g. after an auth failure)."""
+        key = hash_api_key(api_key)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._key_locks.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every pooled client."""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+
+    def stats(self) -> dict:
+        """Return pool size and configuration."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "idle_timeout": self.idle_timeout,
+            }
+
+    def _insert(self, key: str, entry: _PoolEntry) -> None:
+        """Insert an entry and enforce the LRU bound (caller holds the lock)."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._drop_key_lock(evicted_key)
+
+    def _evict_idle(self) -> None:
+        """Remove entries idle for longer than the timeout (caller holds the lock)."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in [k for k, e in self._entries.items() if e.last_used < cutoff]:
+            del self._entries[key]
+            self._drop_key_lock(key)
+
+    def _drop_key_lock(self, key: str) -> None:
+        """Drop a key's creation lock unless it is held (caller holds the lock)."""
+        key_lock = self._key_locks.get(key)
+        if key_lock is not None and not key_lock.locked():
+            del self._key_locks[key]
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        """Check the channel is still usable, at most once per check interval."""
+        now = time.monotonic()
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        import grpc
+
+        channel = _client_channel(entry.client)
+        if channel is not None:
+            try:
+                grpc.channel_ready_future(channel).result(
+                    timeout=self.health_check_timeout
+                )
+            except grpc.FutureTimeoutError:
+                return False
+        entry.last_checked = now
+        return True
+
+
+def _client_channel(client) -> "grpc.Channel | None":
+    """The gRPC channel of a `DnaClient`, if it can be found.
+
+    The SDK has no public accessor for the channel, so this reads its private
+    attribute. Clients without it are treated as healthy; a broken channel
+    then surfaces as an error of the next call instead.
+    """
+    import grpc
+
+    channel = getattr(client, "_channel", None)
+    return channel if isinstance(channel, grpc.Channel) else None
+
+
+client_pool = ClientPool()
@@ -0,0 +1,195 @@
+"""Upper-triangle zoom tiles for 2D contact map predictions."""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import (
+    CONTACT_PLOT_MAX_BINS,
+    CONTACT_PLOT_MAX_TRACKS,
+    CONTACT_TILE_SIZE,
+)
+
+
+def _offsets(n_bins: int, rows: np.ndarray) -> np.ndarray:
+    """Packed index of the diagonal cell of each row."""
+    return rows * n_bins - rows * (rows - 1) // 2
+
+
+def pack_upper(matrix: np.ndarray) -> np.ndarray:
+    """Upper triangle (diagonal included) of (bins, bins, tracks), row-major.
+
+    Returns:
+        Array of shape (bins * (bins + 1) / 2, tracks)
+    """
+    rows, cols = np.triu_indices(len(matrix))
+    return np.asarray(matrix[rows, cols], dtype=np.float32)
+
+
+def coarsen(matrix: np.ndarray, factor: int = 2) -> np.ndarray:
+    """NaN-ignoring mean over `factor` x `factor` blocks of (bins, bins, tracks)."""
+    n_bins, _, n_tracks = matrix.shape
+    pad = -n_bins % factor
+    if pad:
+        matrix = np.pad(
+            matrix.astype(np.float32, copy=False),
+            ((0, pad), (0, pad), (0, 0)),
+            constant_values=np.nan,
+        )
+    n = len(matrix) // factor
+    blocks = matrix.astype(np.float32, copy=False).reshape(
+        n, factor, n, factor, n_tracks
+    )
+    finite = ~np.isnan(blocks)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(finite, blocks, 0.0).sum(axis=(1, 3)) / finite.sum(axis=(1, 3))
+    return mean.astype(np.float32)
+
+
+@dataclass(frozen=True)
+class ContactLevel:
+    """One zoom level of a symmetric contact map, stored as its upper triangle."""
+
+    bin_size: int  # base pairs per bin on both axes
+    n_bins: int
+    cells: np.ndarray  # (n_bins * (n_bins + 1) / 2, tracks)
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.nbytes
+
+    def block(
+        self, rows: slice, cols: slice, tracks: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Dense (rows, cols, tracks) block; lower-triangle cells are mirrored."""
+        r = np.arange(self.n_bins)[rows][:, np.newaxis]
+        c = np.arange(self.n_bins)[cols][np.newaxis, :]
+        lo, hi = np.minimum(r, c), np.maximum(r, c)
+        index = _offsets(self.n_bins, lo) + (hi - lo)
+        if tracks is None:
+            return self.cells[index]
+        return self.cells[index[..., np.newaxis], tracks]
+
+
+class ContactMapTiles:
+    """Zoom levels of a contact map, cut into square tiles for serving.
+
+    Contact maps are symmetric, so every level keeps only its upper
+    triangle: about half the cells of the dense (bins, bins, tracks) matrix.
+    Level 0 is the prediction's resolution and every further level halves
+    the bins per side, up to the first level that fits in a single tile.
+    Tiles are `tile_size` bins per side and addressed by (row, col) with
+    row <= col. Plots are drawn from a coarse level, so rendering costs the
+    same however fine the prediction is.
+    """
+
+    def __init__(
+        self,
+        chromosome: str,
+        start: int,
+        levels: list[ContactLevel],
+        metadata,
+        tile_size: int = CONTACT_TILE_SIZE,
+    ):
+        self.chromosome = chromosome
+        self.start = start
+        self.levels = levels
+        self.metadata = metadata
+        self.tile_size = tile_size
+        self.end = start + levels[0].n_bins * levels[0].bin_size
+
+    @classmethod
+    def build(cls, track_data, tile_size: int = CONTACT_TILE_SIZE):
+        """Build all levels for a (bins, bins, tracks) TrackData."""
+        matrix = np.asarray(track_data.values)
+        if matrix.ndim != 3 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("Contact maps must have shape (bins, bins, tracks)")
+        bin_size = track_data.resolution
+        levels = [ContactLevel(bin_size, len(matrix), pack_upper(matrix))]
+        while levels[-1].n_bins > tile_size:
+            matrix = coarsen(matrix)
+            bin_size *= 2
+            levels.append(ContactLevel(bin_size, len(matrix), pack_upper(matrix)))
+        return cls(
+            track_data.interval.chromosome,
+            track_data.interval.start,
+            levels,
+            track_data.metadata,
+            tile_size,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels)
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Full-resolution upper-triangle cells, as (cells, tracks)."""
+        return self.levels[0].cells
+
+    def tiles_per_side(self, level: int) -> int:
+        return -(-self.levels[level].n_bins // self.tile_size)
+
+    def level_for(self, max_bins: int) -> int:
+        """Finest level with at most `max_bins` bins per side."""
+        return next(
+            (i for i, level in enumerate(self.levels) if level.n_bins <= max_bins),
+            len(self.levels) - 1,
+        )
+
+    def tile_range(
+        self, level: int, view_start: int | None = None, view_end: int | None = None
+    ) -> list[tuple[int, int]]:
+        """(row, col) of the upper-triangle tiles covering [view_start, view_end).
+
+        Raises:
+            ValueError: If the view does not overlap the prediction
+        """
+        start = max(view_start or self.start, self.start)
+        end = min(view_end or self.end, self.end)
+        if end <= start:
+            raise ValueError("Region does not overlap the predicted interval")
+        span = self.levels[level].bin_size * self.tile_size
+        first = (start - self.start) // span
+        last = -(-(end - self.start) // span)
+        return [(r, c) for r in range(first, last) for c in range(r, last)]
+
+    def tile(
+        self, level: int, row: int, col: int, tracks: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Dense (rows, cols, tracks) values of one tile (edge tiles are smaller)."""
+        size = self.tile_size
+        return self.levels[level].block(
+            slice(row * size, (row + 1) * size),
+            slice(col * size, (col + 1) * size),
+            tracks,
+        )
+
+    def track_data(self, level: int, tracks: np.ndarray | None = None):
+        """A whole level as a dense (bins, bins, tracks) TrackData."""
+        from alphagenome.data import genome, track_data
+
+        data = self.levels[level]
+        values = data.block(slice(None), slice(None), tracks)
+        metadata = self.metadata
+        if tracks is not None:
+            metadata = metadata.iloc[tracks].reset_index(drop=True)
+        return track_data.TrackData(
+            values=values,
+            metadata=metadata,
+            resolution=data.bin_size,
+            interval=genome.Interval(
+                self.chromosome, self.start, self.start + data.n_bins * data.bin_size
+            ),
+        )
+
+    def plot_data(
+        self,
+        max_bins: int = CONTACT_PLOT_MAX_BINS,
+        max_tracks: int = CONTACT_PLOT_MAX_TRACKS,
+    ):
+        """TrackData to draw: the finest level within `max_bins`, first tracks."""
+        tracks = None
+        if len(self.metadata) > max_tracks:
+            tracks = np.arange(max_tracks)
+        return self.track_data(self.level_for(max_bins), tracks)
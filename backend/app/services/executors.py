@@ -0,0 +1,139 @@
+"""Dedicated executors and concurrency limits for the async request path."""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from app.config import (
+    MAX_CONCURRENT_REQUESTS,
+    MAX_CONCURRENT_REQUESTS_PER_KEY,
+    MAX_QUEUED_REQUESTS,
+    MAX_QUEUED_REQUESTS_PER_KEY,
+    PLOT_EXECUTOR_WORKERS,
+    QUEUE_TIMEOUT,
+    RETRY_AFTER_SECONDS,
+    SDK_EXECUTOR_WORKERS,
+)
+from app.services.client_pool import hash_api_key
+from app.services.metrics import in_context
+
+# Blocking AlphaGenome SDK calls (gRPC round trips, annotation lookups)
+sdk_executor = ThreadPoolExecutor(
+    max_workers=SDK_EXECUTOR_WORKERS, thread_name_prefix="alphagenome-sdk"
+)
+
+# Plotting and array work; pyplot is not thread-safe, so this defaults to 1
+plot_executor = ThreadPoolExecutor(
+    max_workers=PLOT_EXECUTOR_WORKERS, thread_name_prefix="alphagenome-plot"
+)
+
+
+async def run_sdk(fn, *args, **kwargs):
+    """Run a blocking SDK call on the SDK executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        sdk_executor, functools.partial(in_context(fn), *args, **kwargs)
+    )
+
+
+async def run_plot(fn, *args, **kwargs):
+    """Run plotting/CPU work on the plot executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        plot_executor, functools.partial(in_context(fn), *args, **kwargs)
+    )
+
+
+class _Gate:
+    """A semaphore with a bounded number of waiters."""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.active == 0 and self.waiting == 0
+
+
+def _too_many_requests(scope: str) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many concurrent requests for this {scope}, retry later",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+class ConcurrencyLimiter:
+    """Per-API-key and global concurrency limits for heavy endpoints.
+
+    A request first takes a slot for its API key, then a global slot. When a
+    gate is full and its wait queue is also full (or the wait exceeds
+    `QUEUE_TIMEOUT`), the request is rejected with 429 and a Retry-After header
+    so one heavy user cannot occupy every worker.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = MAX_CONCURRENT_REQUESTS,
+        global_queue: int = MAX_QUEUED_REQUESTS,
+        per_key_limit: int = MAX_CONCURRENT_REQUESTS_PER_KEY,
+        per_key_queue: int = MAX_QUEUED_REQUESTS_PER_KEY,
+    ):
+        self.per_key_limit = per_key_limit
+        self.per_key_queue = per_key_queue
+        self._global = _Gate(global_limit, global_queue)
+        self._keys: dict[str, _Gate] = {}
+
+    @asynccontextmanager
+    async def slot(self, api_key: str):
+        """Hold a per-key and a global slot for the duration of the block."""
+        key = hash_api_key(api_key)
+        gate = self._keys.get(key)
+        if gate is None:
+            gate = self._keys[key] = _Gate(self.per_key_limit, self.per_key_queue)
+        try:
+            async with self._enter(gate, "API key"):
+                async with self._enter(self._global, "server"):
+                    yield
+        finally:
+            if gate.idle and self._keys.get(key) is gate:
+                del self._keys[key]
+
+    @asynccontextmanager
+    async def _enter(self, gate: _Gate, scope: str):
+        if not gate.semaphore.locked():
+            # Free slot: acquire() returns without yielding to the event loop
+            await gate.semaphore.acquire()
+        elif gate.waiting >= gate.max_queue:
+            raise _too_many_requests(scope)
+        else:
+            gate.waiting += 1
+            try:
+                await asyncio.wait_for(gate.semaphore.acquire(), timeout=QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise _too_many_requests(scope)
+            finally:
+                gate.waiting -= 1
+        gate.active += 1
+        try:
+            yield
+        finally:
+            gate.active -= 1
+            gate.semaphore.release()
+
+    def stats(self) -> dict:
+        """Return current active/queued counts."""
+        return {
+            "active": self._global.active,
+            "queued": self._global.waiting,
+            "api_keys": len(self._keys),
+        }
+
+
+limiter = ConcurrencyLimiter()
@@ -0,0 +1,637 @@
+"""Background jobs: prediction and scoring requests run from a SQLite queue.
+
+A job is a stored HTTP request (method, path, query, body and the headers
+the endpoint needs) for one of the prediction or scoring endpoints. Runners
+in every server process claim queued jobs fairly across API keys (by
+priority within a key), replay them through the ASGI app in-process and
+store the response. Because the queue is a SQLite file, jobs survive
+restarts, any worker process can report on any job, and a job whose process
+died is requeued once its lease expires.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import time
+from contextlib import closing
+
+from app.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_MAX_QUEUED_PER_KEY,
+    JOB_MAX_RESULT_BYTES,
+    JOB_POLL_INTERVAL,
+    JOB_PROGRESS_INTERVAL,
+    JOB_WORKERS,
+    JOBS_DB_PATH,
+    JOBS_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# Request headers stored with a job; everything else is dropped (the API key
+# is purged again once the job finishes)
+FORWARDED_HEADERS = ("accept", "content-type", "x-api-key")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    query TEXT NOT NULL DEFAULT '',
+    headers TEXT,
+    body BLOB,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    progress TEXT,
+    result_status INTEGER,
+    result_type TEXT,
+    result BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created_at);
+CREATE INDEX IF NOT EXISTS jobs_owner_status ON jobs (owner, status, started_at);
+"""
+
+# Columns returned by `get`/`list`: everything except the request and result
+_INFO_COLUMNS = (
+    "id, owner, method, path, query, priority, status, attempts, "
+    "cancel_requested, created_at, started_at, finished_at, progress, "
+    "result_status, result_type, length(result) AS result_bytes, error"
+)
+
+
+class QueueFull(Exception):
+    """The API key already has the maximum number of unfinished jobs."""
+
+
+class JobStore:
+    """SQLite-backed job queue shared by every server process.
+
+    Each call opens its own short-lived connection, so methods are safe to
+    call from any thread; writes are serialized by SQLite's file lock.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # Queued jobs hold API keys: keep the database private
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            os.close(fd)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def submit(
+        self,
+        owner: str,
+        method: str,
+        path: str,
+        query: str,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        priority: int = 0,
+    ) -> str:
+        """Queue a request and return the new job ID.
+
+        Raises:
+            QueueFull: If `owner` already has too many unfinished jobs
+        """
+        job_id = secrets.token_urlsafe(12)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (pending,) = conn.execute(
+                    "SELECT count(*) FROM jobs WHERE owner = ? "
+                    "AND status IN ('queued', 'running')",
+                    (owner,),
+                ).fetchone()
+                if pending >= JOB_MAX_QUEUED_PER_KEY:
+                    raise QueueFull(
+                        f"At most {JOB_MAX_QUEUED_PER_KEY} unfinished jobs per API key"
+                    )
+                conn.execute(
+                    "INSERT INTO jobs (id, owner, method, path, query, headers, body, "
+                    "priority, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?)",
+                    (
+                        job_id,
+                        owner,
+                        method,
+                        path,
+                        query,
+                        json.dumps(headers),
+                        body,
+                        priority,
+                        time.time(),
+                    ),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get(self, job_id: str, owner: str | None = None) -> dict | None:
+        """Job status without its request or result, or None if unknown."""
+        query = f"SELECT {_INFO_COLUMNS} FROM jobs WHERE id = ?"
+        params: tuple = (job_id,)
+        if owner is not None:
+            query += " AND owner = ?"
+            params += (owner,)
+        with closing(self._connect()) as conn:
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            job = _decode(row)
+            if job["status"] == "queued":
+                # The owner's jobs that will be claimed before this one
+                (job["queue_position"],) = conn.execute(
+                    "SELECT count(*) FROM jobs WHERE owner = ? AND status = 'queued' "
+                    "AND (priority > ? OR (priority = ? AND created_at < ?))",
+                    (row["owner"], job["priority"], job["priority"], row["created_at"]),
+                ).fetchone()
+        return job
+
+    def list(self, owner: str, status: str | None = None, limit: int = 50) -> list:
+        """An owner's jobs, newest first."""
+        query = f"SELECT {_INFO_COLUMNS} FROM jobs WHERE owner = ?"
+        params: tuple = (owner,)
+        if status is not None:
+            query += " AND status = ?"
+            params += (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params + (limit,)).fetchall()
+        return [_decode(row) for row in rows]
+
+    def result(self, job_id: str, owner: str) -> tuple[int, str, bytes] | None:
+        """Stored response (status, media type, body) of a finished job."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT result_status, result_type, result FROM jobs "
+                "WHERE id = ? AND owner = ? AND result_status IS NOT NULL",
+                (job_id, owner),
+            ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def cancel(self, job_id: str, owner: str) -> str | None:
+        """Cancel a queued job now, or ask the runner of a running job to stop.
+
+        Returns the job's status afterwards, or None if it does not exist.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, "
+                "headers = NULL, body = NULL "
+                "WHERE id = ? AND owner = ? AND status = 'queued'",
+                (time.time(), job_id, owner),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (job_id, owner),
+            )
+            row = conn.execute(
+                "SELECT status FROM jobs WHERE id = ? AND owner = ?", (job_id, owner)
+            ).fetchone()
+        return row["status"] if row is not None else None
+
+    def claim(self) -> dict | None:
+        """Atomically take the next runnable job, sharing runners across owners.
+
+        The owner with the fewest running jobs goes first, ties going to the
+        owner whose last job started longest ago (round-robin). Priority only
+        orders an owner's own jobs, so one API key cannot starve the others.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, "
+                "heartbeat_at = ?, attempts = attempts + 1, progress = NULL "
+                "WHERE id = ("
+                "WITH ready AS (SELECT id, owner, priority, created_at FROM jobs "
+                "WHERE status = 'queued' AND not_before <= ?), "
+                "owners AS (SELECT owner, "
+                "(SELECT count(*) FROM jobs r WHERE r.owner = o.owner "
+                "AND r.status = 'running') AS running, "
+                "(SELECT coalesce(max(started_at), 0) FROM jobs s "
+                "WHERE s.owner = o.owner) AS last_started "
+                "FROM (SELECT DISTINCT owner FROM ready) o) "
+                "SELECT ready.id FROM ready JOIN owners USING (owner) "
+                "ORDER BY owners.running, owners.last_started, "
+                "ready.priority DESC, ready.created_at LIMIT 1) "
+                "RETURNING id, method, path, query, headers, body",
+                (now, now, now),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["headers"] = json.loads(job["headers"])
+        return job
+
+    def heartbeat(self, job_id: str, progress: dict) -> str | None:
+        """Record progress and extend the lease.
+
+        Returns "cancel" if cancellation was requested, "lost" if the job is
+        no longer running (its lease expired and it was requeued), else None.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?, progress = ? "
+                "WHERE id = ? AND status = 'running' RETURNING cancel_requested",
+                (time.time(), json.dumps(progress), job_id),
+            ).fetchone()
+        if row is None:
+            return "lost"
+        return "cancel" if row["cancel_requested"] else None
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        progress: dict | None = None,
+        result: tuple[int, str, bytes] | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Store the outcome and drop the stored request (and its API key)."""
+        result_status, result_type, body = result or (None, None, None)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, progress = ?, "
+                "result_status = ?, result_type = ?, result = ?, error = ?, "
+                "headers = NULL, body = NULL WHERE id = ? AND status = 'running'",
+                (
+                    status,
+                    time.time(),
+                    json.dumps(progress) if progress is not None else None,
+                    result_status,
+                    result_type,
+                    body,
+                    error,
+                    job_id,
+                ),
+            )
+
+    def requeue(self, job_id: str, delay: float = 0.0) -> None:
+        """Put a running job back in the queue, e.g. after a 429 or shutdown."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, "
+                "not_before = ?, heartbeat_at = NULL WHERE id = ? "
+                "AND status = 'running'",
+                (time.time() + delay, job_id),
+            )
+
+    def sweep(self) -> None:
+        """Requeue jobs whose runner vanished and delete expired jobs."""
+        now = time.time()
+        stale = now - JOB_LEASE_SECONDS
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = 'Worker stopped responding', headers = NULL, body = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, stale, JOB_MAX_ATTEMPTS),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', heartbeat_at = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (stale,),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (now - JOBS_TTL,),
+            )
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per status."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT status, count(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+
+def _decode(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def progress_snapshot(trace, started: float) -> dict:
+    """Per-stage progress of a running request from its metrics trace."""
+    stages: dict[tuple[str, str], list] = {}
+    active = []
+    if trace is not None:
+        for stage, output_type, seconds in list(trace.stages):
+            entry = stages.setdefault((stage, output_type), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        active = [
+            f"{stage}[{output_type}]" if output_type else stage
+            for stage, output_type in list(trace.active)
+        ]
+    return {
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "active": active,
+        "stages": [
+            {
+                "stage": stage,
+                "output_type": output_type,
+                "count": count,
+                "seconds": round(seconds, 3),
+            }
+            for (stage, output_type), (count, seconds) in stages.items()
+        ],
+    }
+
+
+def _error_detail(status: int, media_type: str, body: bytes) -> str:
+    """The `detail` of an error response, or a generic message."""
+    if media_type.startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict):
+            detail = payload.get("detail") or payload.get("error")
+            if detail is not None:
+                return detail if isinstance(detail, str) else json.dumps(detail)
+    return f"Request failed with status {status}"
+
+
+class _ResultTooLarge(Exception):
+    pass
+
+
+class JobRunner:
+    """Worker tasks that claim jobs and replay them through the ASGI app.
+
+    A replayed request goes through the same middleware, limits and caches as
+    a direct one; its metrics trace provides per-stage progress. A request
+    rejected with 429 (the API key's concurrency limit or AlphaGenome quota) is
+    requeued after its Retry-After delay. Streaming responses (BED and batch
+    endpoints) are collected in full.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._app = None
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+        self._lost: set[str] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._counts: dict[str, int] = {}  # queue size per status, per sweep
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.requeued = 0
+
+    def start(self, app) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks or not self.workers:
+            return
+        self._app = app
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweeper(), name="job-sweeper"))
+
+    async def stop(self) -> None:
+        """Stop the workers; their running jobs go back to the queue."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Wake an idle worker after a submission in this process."""
+        self.submitted += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, job_id: str) -> None:
+        """Stop a job running in this process right away."""
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelled.add(job_id)
+            task.cancel()
+
+    def stats(self) -> dict:
+        """Per-process counters and the shared queue's size per status.
+
+        Queue sizes are as of the last sweep, so a metrics scrape never
+        queries SQLite on the event loop.
+        """
+        counts = self._counts
+        return {
+            "workers": self.workers,
+            "running_here": len(self._running),
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "requeued": self.requeued,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim)
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[job["id"]] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Shutdown: let the job come back after a restart
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await asyncio.to_thread(self.store.requeue, job["id"])
+                raise
+            except Exception:
+                logger.exception("Job %s crashed", job["id"])
+            finally:
+                self._running.pop(job["id"], None)
+                self._cancelled.discard(job["id"])
+                self._lost.discard(job["id"])
+
+    async def _sweeper(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.sweep)
+                self._counts = await asyncio.to_thread(self.store.counts)
+            except Exception:
+                logger.exception("Job sweep failed")
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["id"]
+        started = time.monotonic()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": job["method"],
+            "scheme": "http",
+            "path": job["path"],
+            "raw_path": job["path"].encode("utf-8"),
+            "root_path": "",
+            "query_string": job["query"].encode("latin-1"),
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in job["headers"]
+            ]
+            + [(b"content-length", str(len(job["body"] or b"")).encode())],
+            "client": ("job", 0),
+            "server": None,
+            "extensions": {},
+        }
+        response = {"status": None, "type": "", "headers": {}, "body": []}
+        size = 0
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {
+                    "type": "http.request",
+                    "body": job["body"] or b"",
+                    "more_body": False,
+                }
+            # Never disconnect: streaming responses run to completion
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                headers = {
+                    k.decode("latin-1").lower(): v.decode("latin-1")
+                    for k, v in message.get("headers", [])
+                }
+                response.update(
+                    status=message["status"],
+                    type=headers.get("content-type", ""),
+                    headers=headers,
+                )
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > JOB_MAX_RESULT_BYTES:
+                    raise _ResultTooLarge(
+                        f"Result exceeds {JOB_MAX_RESULT_BYTES:,} bytes"
+                    )
+                response["body"].append(chunk)
+
+        async def monitor(task: asyncio.Task):
+            while True:
+                await asyncio.sleep(JOB_PROGRESS_INTERVAL)
+                snapshot = progress_snapshot(scope.get("trace"), started)
+                state = await asyncio.to_thread(self.store.heartbeat, job_id, snapshot)
+                if state is not None:
+                    (self._cancelled if state == "cancel" else self._lost).add(job_id)
+                    task.cancel()
+                    return
+
+        request = asyncio.create_task(self._app(scope, receive, send))
+        watcher = asyncio.create_task(monitor(request))
+        error = None
+        try:
+            await request
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled and job_id not in self._lost:
+                raise
+        except _ResultTooLarge as e:
+            error = str(e)
+        except Exception as e:
+            # Unhandled errors are re-raised after the 500 response is sent
+            if response["status"] is None:
+                error = f"{type(e).__name__}: {e}"
+        finally:
+            watcher.cancel()
+            if not request.done():
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+
+        if job_id in self._lost:
+            logger.warning("Job %s lost its lease and was requeued", job_id)
+            return
+        progress = progress_snapshot(scope.get("trace"), started)
+        status = response["status"]
+        if job_id in self._cancelled:
+            self.cancelled += 1
+            await asyncio.to_thread(self.store.finish, job_id, "cancelled", progress)
+            return
+        if status == 429 and error is None:
+            self.requeued += 1
+            try:
+                delay = float(response["headers"].get("retry-after", 1))
+            except ValueError:
+                delay = 1.0
+            await asyncio.to_thread(self.store.requeue, job_id, delay)
+            return
+
+        result = None
+        if error is None:
+            body = b"".join(response["body"])
+            result = (status, response["type"], body)
+            if not 200 <= status < 300:
+                error = _error_detail(status, response["type"], body)
+        if error is None:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        await asyncio.to_thread(
+            self.store.finish,
+            job_id,
+            "succeeded" if error is None else "failed",
+            progress,
+            result,
+            error,
+        )
+
+
+job_store = JobStore()
+job_runner = JobRunner(job_store)
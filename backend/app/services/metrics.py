@@ -0,0 +1,385 @@
+"""In-process Prometheus metrics, per-request stage spans and a slow-request log."""
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from app.config import METRICS_BUCKETS, SLOW_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Labelled metric family; label values are passed as keyword arguments."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list[str]:
+        labels = _format_labels(self.labelnames, key)
+        return [f"{self.name}{labels} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = METRICS_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def totals(self) -> dict[tuple, tuple[float, int]]:
+        """Sum and count of observations per label tuple."""
+        with self._lock:
+            return {key: (state[1], state[2]) for key, state in self._values.items()}
+
+    def _samples(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Metric families plus collectors that read component stats at scrape time."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[tuple[str, object, frozenset[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats, counters=()) -> None:
+        """Export every numeric entry of `stats()` as `{prefix}_{key}`.
+
+        Keys in `counters` are cumulative and exported as `_total` counters;
+        the rest are gauges.
+        """
+        self._collectors.append((prefix, stats, frozenset(counters)))
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric and collector."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats, counters in self._collectors:
+            try:
+                values = stats()
+            except Exception:
+                logger.exception("Metrics collector %s failed", prefix)
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                elif not isinstance(value, (int, float)):
+                    continue
+                kind = "counter" if key in counters else "gauge"
+                name = f"{prefix}_{key}" + ("_total" if kind == "counter" else "")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(
+    Histogram(
+        "alphagenome_http_request_duration_seconds",
+        "HTTP request latency, until the last body byte is sent",
+        ("method", "endpoint", "status"),
+    )
+)
+
+
+class _InFlight(_Metric):
+    """Gauge of requests being handled, labelled from their scopes at scrape time.
+
+    The route (and so the endpoint label) is only known once routing has
+    run inside the application, so requests are grouped when rendered.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help, ("method", "endpoint"))
+        self._scopes: dict[int, dict] = {}
+
+    def add(self, scope) -> None:
+        with self._lock:
+            self._scopes[id(scope)] = scope
+
+    def remove(self, scope) -> None:
+        with self._lock:
+            self._scopes.pop(id(scope), None)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            scopes = list(self._scopes.values())
+        counts: dict[tuple, int] = {}
+        for scope in scopes:
+            key = (scope["method"], _endpoint(scope))
+            counts[key] = counts.get(key, 0) + 1
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, count in sorted(counts.items()):
+            lines.extend(self._samples(key, count))
+        return lines
+
+
+REQUESTS_IN_FLIGHT = registry.register(
+    _InFlight(
+        "alphagenome_http_requests_in_flight", "HTTP requests currently being handled"
+    )
+)
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "alphagenome_stage_duration_seconds",
+        "Latency of individual request stages",
+        ("stage", "endpoint", "output_type"),
+    )
+)
+
+
+@dataclass
+class RequestTrace:
+    """Stage timings collected while handling one request."""
+
+    scope: dict | None = None
+    stages: list[tuple[str, str, float]] = field(default_factory=list)
+    active: list[tuple[str, str]] = field(default_factory=list)  # open spans
+
+    @property
+    def endpoint(self) -> str:
+        return _endpoint(self.scope) if self.scope is not None else ""
+
+
+_trace: contextvars.ContextVar[RequestTrace | None] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+def record(stage: str, seconds: float, output_type: str = "") -> None:
+    """Observe one stage timing and add it to the current request's trace."""
+    trace = _trace.get()
+    STAGE_SECONDS.observe(
+        seconds,
+        stage=stage,
+        endpoint=trace.endpoint if trace else "",
+        output_type=output_type,
+    )
+    if trace is not None:
+        trace.stages.append((stage, output_type, seconds))
+
+
+@contextmanager
+def span(stage: str, output_type: str = ""):
+    """Time a block as one stage of the current request."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.active.append((stage, output_type))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, output_type)
+        if trace is not None:
+            trace.active.remove((stage, output_type))
+
+
+@contextmanager
+def collect_stages():
+    """Collect the spans of a block into a list, e.g. inside a worker process."""
+    trace = RequestTrace()
+    token = _trace.set(trace)
+    try:
+        yield trace.stages
+    finally:
+        _trace.reset(token)
+
+
+def output_type_label(output_types) -> str:
+    """Output type label for a call covering one or several output types."""
+    output_types = list(output_types)
+    return output_types[0] if len(output_types) == 1 else "multiple"
+
+
+def in_context(fn):
+    """Wrap `fn` to run in a copy of the caller's context on another thread.
+
+    Thread pools do not propagate contextvars, so spans recorded by `fn`
+    would otherwise miss the request trace.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _endpoint(scope) -> str:
+    """Route label for a request (bounded cardinality).
+
+    Routes without path parameters are labelled with the request path,
+    parameterized routes with their template and mounted apps with their
+    mount point. Requests that have not been routed (yet) are "unmatched".
+    """
+    route = scope.get("route")
+    if route is None:
+        # Mounted apps (e.g. /plots) only leave their mount point as root_path
+        if "endpoint" in scope and scope.get("root_path"):
+            return scope["root_path"]
+        return "unmatched"
+    if scope.get("path_params"):
+        return getattr(route, "path", "") or "unmatched"
+    return scope["path"]
+
+
+def _breakdown(stages: list[tuple[str, str, float]]) -> str:
+    totals: dict[tuple[str, str], list] = {}
+    for stage, output_type, seconds in stages:
+        entry = totals.setdefault((stage, output_type), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+    parts = []
+    for (stage, output_type), (count, seconds) in totals.items():
+        name = f"{stage}[{output_type}]" if output_type else stage
+        parts.append(f"{name}={seconds:.3f}s" + (f" (x{count})" if count > 1 else ""))
+    return ", ".join(parts) or "no stages recorded"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, in-flight requests and traces.
+
+    Requests slower than `slow_seconds` (0 disables) are logged with their
+    per-stage breakdown.
+    """
+
+    def __init__(self, app, slow_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope)
+        scope["trace"] = trace  # read by whoever awaits the request (e.g. jobs)
+        token = _trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.add(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.remove(scope)
+            REQUEST_SECONDS.observe(
+                elapsed,
+                method=scope["method"],
+                endpoint=_endpoint(scope),
+                status=str(status),
+            )
+            _trace.reset(token)
+            if self.slow_seconds and elapsed >= self.slow_seconds:
+                logger.warning(
+                    "Slow request %s %s (%d) took %.3fs: %s",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    elapsed,
+                    _breakdown(trace.stages),
+                )
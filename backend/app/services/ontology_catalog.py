@@ -0,0 +1,363 @@
+"""Searchable catalog of AlphaGenome tracks and their ontology terms.
+
+The model's output metadata (every track of every output type, with its
+ontology CURIE and biosample) is fetched once per process, or read from an
+Arrow file that any worker persisted before, and indexed by ontology term
+for autocomplete and for validating `ontology_terms` before a remote call.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from app.config import (
+    ANNOTATION_CACHE_DIR,
+    ONTOLOGY_CATALOG_FILENAME,
+    ONTOLOGY_CATALOG_RETRY,
+    ONTOLOGY_CATALOG_TTL,
+    ONTOLOGY_SEARCH_LIMIT,
+    OUTPUT_TYPE_DESCRIPTIONS,
+)
+from app.services.metrics import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRACK_COLUMNS = ("name", "strand", "ontology_curie", "biosample_name", "biosample_type")
+
+# Match ranks: exact CURIE or biosample name, prefix of either, prefix of a
+# word of the name, substring anywhere
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+_WORDS = re.compile(r"[^0-9a-z]+")
+
+
+class UnknownOntologyTerm(ValueError):
+    """An ontology term has no tracks for the requested output types."""
+
+
+@dataclass(frozen=True)
+class OntologyTerm:
+    """One ontology term and its tracks per output type."""
+
+    curie: str
+    biosample_name: str | None
+    biosample_type: str | None
+    track_counts: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tracks(self) -> int:
+        return sum(self.track_counts.values())
+
+
+def metadata_table(output_metadata) -> "pd.DataFrame":
+    """Flatten an SDK `OutputMetadata` into one row per (output type, track)."""
+    import pandas as pd
+    from alphagenome.models import dna_client
+
+    frames = []
+    for name in OUTPUT_TYPE_DESCRIPTIONS:
+        metadata = output_metadata.get(getattr(dna_client.OutputType, name))
+        if metadata is None or not len(metadata):
+            continue
+        frame = metadata.reindex(columns=list(TRACK_COLUMNS))
+        frame.insert(0, "output_type", name)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["output_type", *TRACK_COLUMNS], dtype=object)
+    table = pd.concat(frames, ignore_index=True).astype(object)
+    return table.where(table.notna(), None).astype(
+        {c: "string" for c in ("output_type", *TRACK_COLUMNS)}
+    )
+
+
+class OntologyCatalog:
+    """Tracks per ontology term and output type, indexed for prefix search.
+
+    The index is a sorted list of lowercase keys (the CURIE, its local ID,
+    the biosample name and each word of it) searched by bisection; queries
+    with no prefix match fall back to a substring scan over the terms.
+    """
+
+    def __init__(self, tracks: "pd.DataFrame", fetched_at: float):
+        self.fetched_at = fetched_at
+        self.track_counts = {
+            ot: int(n) for ot, n in tracks["output_type"].value_counts().items()
+        }
+        annotated = tracks.dropna(subset=["ontology_curie"])
+        self.annotated_types = frozenset(annotated["output_type"].unique())
+        counts = (
+            annotated.groupby(["ontology_curie", "output_type"])
+            .size()
+            .unstack(fill_value=0)
+        )
+        biosamples = annotated.groupby("ontology_curie")[
+            ["biosample_name", "biosample_type"]
+        ].first()
+        biosamples = biosamples.astype(object).where(biosamples.notna(), None)
+        counts = counts.loc[biosamples.index]
+
+        self.terms: list[OntologyTerm] = [
+            OntologyTerm(
+                curie=str(curie),
+                biosample_name=None if name is None else str(name),
+                biosample_type=None if kind is None else str(kind),
+                track_counts={str(ot): int(n) for ot, n in row.items() if n},
+            )
+            for curie, name, kind, row in zip(
+                biosamples.index,
+                biosamples["biosample_name"],
+                biosamples["biosample_type"],
+                counts.to_dict("records"),
+            )
+        ]
+        self._by_curie = {term.curie: term for term in self.terms}
+
+        keys = []
+        for i, term in enumerate(self.terms):
+            curie = term.curie.lower()
+            name = (term.biosample_name or "").lower()
+            keys.append((curie, i, True))
+            keys.append((curie.rpartition(":")[2], i, True))
+            if name:
+                keys.append((name, i, True))
+                keys.extend((word, i, False) for word in _WORDS.split(name) if word)
+        keys.sort()
+        self._keys = [k for k, _, _ in keys]
+        self._key_terms = [(i, whole) for _, i, whole in keys]
+        self._haystack = [
+            f"{t.curie} {t.biosample_name or ''}".lower() for t in self.terms
+        ]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, curie: str) -> OntologyTerm | None:
+        return self._by_curie.get(curie)
+
+    def search(
+        self,
+        query: str,
+        output_type: str | None = None,
+        limit: int = ONTOLOGY_SEARCH_LIMIT,
+    ) -> tuple[list[OntologyTerm], int]:
+        """Terms matching `query` by CURIE or biosample name, best first.
+
+        Exact matches rank first, then prefixes of the CURIE or name,
+        prefixes of a word of the name, and substrings; ties go to the term
+        with more tracks. An empty query lists terms by track count.
+
+        Returns:
+            Tuple of (up to `limit` terms, total number of matches)
+        """
+        q = query.strip().lower()
+        ranks: dict[int, int] = {}
+        if q:
+            for k in range(bisect_left(self._keys, q), len(self._keys)):
+                key = self._keys[k]
+                if not key.startswith(q):
+                    break
+                i, whole = self._key_terms[k]
+                rank = (EXACT if key == q else PREFIX) if whole else WORD_PREFIX
+                ranks[i] = min(rank, ranks.get(i, SUBSTRING))
+            for i, text in enumerate(self._haystack):
+                if i not in ranks and q in text:
+                    ranks[i] = SUBSTRING
+        else:
+            ranks = dict.fromkeys(range(len(self.terms)), SUBSTRING)
+
+        def tracks(term: OntologyTerm) -> int:
+            return term.track_counts.get(output_type, 0) if output_type else term.tracks
+
+        matches = [
+            (rank, -tracks(self.terms[i]), self.terms[i].curie, i)
+            for i, rank in ranks.items()
+            if tracks(self.terms[i])
+        ]
+        matches.sort()
+        return [self.terms[i] for *_, i in matches[:limit]], len(matches)
+
+    def track_count(self, output_type: str, ontology_terms: list[str]) -> int:
+        """Tracks a prediction of `output_type` returns for `ontology_terms`.
+
+        Output types without ontology-annotated tracks are not filtered.
+        """
+        if not ontology_terms or output_type not in self.annotated_types:
+            return self.track_counts.get(output_type, 0)
+        terms = (self._by_curie.get(curie) for curie in set(ontology_terms))
+        return sum(t.track_counts.get(output_type, 0) for t in terms if t is not None)
+
+    def validate(self, ontology_terms: list[str], output_types: list[str]) -> None:
+        """Check that every term has tracks for at least one output type.
+
+        Output types without ontology-annotated tracks are not filtered by
+        term, so they do not count.
+
+        Raises:
+            UnknownOntologyTerm: If a term is unknown or has no tracks for
+                any of the requested output types
+        """
+        filtered = [ot for ot in output_types if ot in self.annotated_types]
+        for curie in ontology_terms:
+            term = self._by_curie.get(curie)
+            if term is None:
+                suggestions, _ = self.search(curie, limit=3)
+                hint = (
+                    f"; did you mean {', '.join(t.curie for t in suggestions)}?"
+                    if suggestions
+                    else ""
+                )
+                raise UnknownOntologyTerm(f"Unknown ontology term: {curie}{hint}")
+            if filtered and not any(term.track_counts.get(ot) for ot in filtered):
+                raise UnknownOntologyTerm(
+                    f"Ontology term {curie} ({term.biosample_name}) has no "
+                    f"{', '.join(filtered)} tracks"
+                )
+
+
+def catalog_path() -> str:
+    """Path of the persisted track metadata table."""
+    return os.path.join(ANNOTATION_CACHE_DIR, ONTOLOGY_CATALOG_FILENAME)
+
+
+def _write_table(path: str, tracks: "pd.DataFrame") -> None:
+    """Write the table as Arrow IPC, swapped into place atomically."""
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(tracks, preserve_index=False)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CatalogStore:
+    """The process-wide catalog: loaded from disk or fetched once, then shared.
+
+    Fetches go through the remote scheduler with the caller's API key and
+    are coalesced; a failed fetch is retried after `retry` seconds, and
+    until then callers get the stale catalog, or None.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float = ONTOLOGY_CATALOG_TTL,
+        retry: float = ONTOLOGY_CATALOG_RETRY,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.retry = retry
+        self._catalog: OntologyCatalog | None = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._fetching: Future | None = None
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _fresh(self, catalog: OntologyCatalog | None) -> bool:
+        return catalog is not None and time.time() - catalog.fetched_at < self.ttl
+
+    def get(self) -> OntologyCatalog | None:
+        """Current catalog from memory or the persisted table; never fetches."""
+        catalog = self._catalog
+        if self._fresh(catalog):
+            return catalog
+        with self._lock:
+            if not self._fresh(self._catalog):
+                self._load()
+            return self._catalog
+
+    async def refresh(self, client, api_key: str) -> OntologyCatalog | None:
+        """Current catalog, fetched with `client` when missing or expired."""
+        from app.services.executors import run_sdk
+
+        catalog = await run_sdk(self.get)
+        if self._fresh(catalog) or time.monotonic() < self._retry_at:
+            return catalog
+        if self._fetching is not None:
+            return await asyncio.wrap_future(self._fetching)
+
+        self._fetching = future = Future()
+        try:
+            catalog = await self._fetch(client, api_key)
+        except Exception as e:
+            self.fetch_errors += 1
+            self._retry_at = time.monotonic() + self.retry
+            logger.warning("Fetching the track metadata catalog failed: %s", e)
+            catalog = self._catalog
+        finally:
+            self._fetching = None
+            future.set_result(self._catalog)
+        return catalog
+
+    def _load(self) -> None:
+        """Load the persisted table if it is newer than the current catalog."""
+        path = self.path or catalog_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if self._catalog is not None and self._catalog.fetched_at >= mtime:
+            return
+        import pyarrow as pa
+
+        with span("load_catalog"):
+            with pa.memory_map(path) as f:
+                tracks = pa.ipc.open_file(f).read_pandas()
+            self._catalog = OntologyCatalog(tracks, mtime)
+
+    async def _fetch(self, client, api_key: str) -> OntologyCatalog:
+        from app.services.executors import run_sdk
+        from app.services.scheduler import remote_scheduler
+
+        with span("output_metadata"):
+            output_metadata = await remote_scheduler.call(
+                api_key, "output_metadata", client.output_metadata
+            )
+        return await run_sdk(self._store, output_metadata)
+
+    def _store(self, output_metadata) -> OntologyCatalog:
+        """Index and persist fetched output metadata."""
+        tracks = metadata_table(output_metadata)
+        self.fetches += 1
+        path = self.path or catalog_path()
+        try:
+            _write_table(path, tracks)
+        except OSError as e:
+            logger.warning("Could not persist the track metadata catalog: %s", e)
+        self._catalog = OntologyCatalog(tracks, time.time())
+        return self._catalog
+
+    def stats(self) -> dict:
+        """Return catalog size, age and fetch counters."""
+        catalog = self._catalog
+        return {
+            "loaded": catalog is not None,
+            "age_seconds": time.time() - catalog.fetched_at if catalog else 0.0,
+            "tracks": sum(catalog.track_counts.values()) if catalog else 0,
+            "terms": len(catalog) if catalog else 0,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+        }
+
+
+ontology_catalog = CatalogStore()
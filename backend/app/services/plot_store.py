@@ -0,0 +1,236 @@
+"""Content-addressed plot files with a byte quota, TTL and LRU collection."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+from app.config import (
+    PLOT_CACHE_MAX_AGE,
+    PLOT_DPI,
+    PLOT_STYLE_VERSION,
+    PLOTS_DIR,
+    PLOTS_GC_INTERVAL,
+    PLOTS_MAX_BYTES,
+    PLOTS_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Files used within this many seconds are never collected, so a URL that was
+# just handed to a client stays valid
+MIN_AGE = 60.0
+
+# Last-use timestamps are refreshed at most this often per file
+TOUCH_INTERVAL = 60.0
+
+
+def plot_filename(
+    kind: str,
+    interval,
+    output_type: str,
+    ontology_terms: list[str] | None = None,
+    variant=None,
+) -> str:
+    """Deterministic file name for a plot: a hash of everything it depends on."""
+    # Plots are rendered after a prediction, so the annotation module is loaded
+    from app.services.annotations import annotation_cache_path
+
+    payload = json.dumps(
+        {
+            "kind": kind,
+            "interval": str(interval),
+            "variant": str(variant) if variant is not None else None,
+            "output_type": output_type,
+            "ontology_terms": sorted(ontology_terms or []),
+            "annotations": os.path.basename(annotation_cache_path()),
+            "dpi": PLOT_DPI,
+            "style": PLOT_STYLE_VERSION,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    suffix = f"variant_{output_type.lower()}" if variant else output_type.lower()
+    return f"{digest}_{suffix}.png"
+
+
+def _touch(path: str, st: os.stat_result, now: float) -> None:
+    """Record a use of `path` by bumping its mtime (the LRU clock)."""
+    if now - st.st_mtime > TOUCH_INTERVAL:
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+
+class PlotStore:
+    """Plot directory where identical requests share one rendered file.
+
+    `get_or_render` returns an existing file without rendering and coalesces
+    concurrent renders of the same file. A background collector deletes files
+    unused for longer than `ttl`, then the least recently used files until
+    the directory fits in `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str = PLOTS_DIR,
+        max_bytes: int = PLOTS_MAX_BYTES,
+        ttl: float = PLOTS_TTL,
+        interval: float = PLOTS_GC_INTERVAL,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.interval = interval
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.hits = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    async def get_or_render(self, filename: str, render) -> str:
+        """Return the URL for `filename`, awaiting `render()` only if missing."""
+        path = os.path.join(self.directory, filename)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            pass
+        else:
+            self.hits += 1
+            _touch(path, st, time.time())
+            return f"/plots/{filename}"
+
+        future = self._inflight.get(filename)
+        if future is None:
+            self.renders += 1
+            future = asyncio.ensure_future(render())
+            self._inflight[filename] = future
+            future.add_done_callback(lambda _: self._inflight.pop(filename, None))
+        else:
+            self.coalesced += 1
+        await asyncio.shield(future)
+        return f"/plots/{filename}"
+
+    def collect(self) -> int:
+        """Run one collection pass; returns the number of files deleted."""
+        now = time.time()
+        evictions = self.evictions
+        files, total = [], 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if not entry.is_file():
+                continue
+            if now - st.st_mtime < MIN_AGE:
+                total += st.st_size
+                continue
+            if entry.name.endswith(".tmp") or now - st.st_mtime > self.ttl:
+                self._delete(entry.path)  # expired, or left by a crashed render
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+        # Least recently used first
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if self._delete(path):
+                total -= size
+        self.bytes = total
+        return self.evictions - evictions
+
+    def start(self) -> None:
+        """Start the background collector thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="plot-collector", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background collector thread."""
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        """Return hit/render counters and the directory size at the last pass."""
+        return {
+            "hits": self.hits,
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.collect()
+            except Exception:
+                logger.exception("Plot collection failed")
+            if self._stop.wait(self.interval):
+                return
+
+    def _delete(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        self.evictions += 1
+        return True
+
+
+class PlotFiles(StaticFiles):
+    """Static files for content-addressed plots.
+
+    Plot files never change once written, so they get a strong ETag derived
+    from the content hash in their name and an immutable Cache-Control.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        name = os.path.basename(full_path)
+        digest = name.split("_", 1)[0]
+        if len(digest) != 32:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        _touch(full_path, stat_result, time.time())
+        headers = {
+            "etag": f'"{digest}"',
+            "cache-control": f"public, max-age={PLOT_CACHE_MAX_AGE}, immutable",
+        }
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, headers=headers
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return Response(status_code=304, headers=headers)
+        return response
+
+
+plot_store = PlotStore()
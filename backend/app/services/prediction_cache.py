@@ -0,0 +1,220 @@
+"""In-memory prediction cache with request coalescing."""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+
+from app.config import PREDICTION_CACHE_MAX_BYTES
+
+
+class PredictionKey(NamedTuple):
+    """Cache key for one output type of one prediction."""
+
+    kind: str  # "interval", "variant" (ALT arm only) or "pyramid"
+    interval: str  # resized genome.Interval, e.g. "chr19:40950000-40966384:."
+    variant: str  # e.g. "chr22:36201698:A>C", empty for interval predictions
+    output_type: str
+    ontology_terms: tuple[str, ...]
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Approximate memory held by a TrackData/JunctionData (or tuple of them).
+
+    Objects that report their own size (e.g. a PyramidLevel) via an integer
+    `nbytes` attribute are trusted.
+    """
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(v) for v in value)
+    if isinstance(getattr(value, "nbytes", None), int):
+        return value.nbytes
+    total = 0
+    for attr in ("values", "junctions"):
+        array = getattr(value, attr, None)
+        total += getattr(array, "nbytes", 0)
+    metadata = getattr(value, "metadata", None)
+    if metadata is not None and hasattr(metadata, "memory_usage"):
+        total += int(metadata.memory_usage(index=True, deep=True).sum())
+    return total
+
+
+class PredictionCache:
+    """LRU cache bounded by bytes, with single-flight loading.
+
+    Values are cached per output type, so a request for RNA_SEQ+DNASE reuses a
+    cached RNA_SEQ result and only fetches DNASE. Keys that are already being
+    fetched by another request are awaited rather than fetched again.
+    """
+
+    def __init__(self, max_bytes: int = PREDICTION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return a cached value (refreshing its LRU position) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert a value and evict least recently used entries over budget."""
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            self._put(key, value, nbytes)
+
+    def setdefault(self, key: Hashable, value: Any) -> Any:
+        """Insert `value` unless `key` is cached or loading; return the cached value."""
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+            if key not in self._inflight:
+                self._put(key, value, nbytes)
+            return value
+
+    def get_or_fetch(
+        self,
+        keys: list[Hashable],
+        fetch: Callable[[list[Hashable]], dict[Hashable, Any]],
+    ) -> dict[Hashable, Any]:
+        """Resolve `keys`, calling `fetch` once for those nobody else is loading.
+
+        Args:
+            keys: Keys needed by this request
+            fetch: Called with the missing keys; returns a value per key
+
+        Returns:
+            Dict mapping every key to its value
+
+        Raises:
+            LookupError: If `fetch` returned no value for one of the keys
+        """
+        results, owned, waiting = self._reserve(keys)
+        if owned:
+            try:
+                fetched = fetch(owned)
+            except BaseException as e:
+                self._fail(owned, e)
+                raise
+            results.update(self._complete(owned, fetched))
+        for key, future in waiting.items():
+            results[key] = future.result()
+        return results
+
+    async def aget_or_fetch(
+        self,
+        keys: list[Hashable],
+        fetch: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+    ) -> dict[Hashable, Any]:
+        """Like `get_or_fetch` with a coroutine `fetch`, waiting without a thread.
+
+        Loads started by `get_or_fetch` and `aget_or_fetch` coalesce with
+        each other.
+        """
+        results, owned, waiting = self._reserve(keys)
+        if owned:
+            try:
+                fetched = await fetch(owned)
+            except BaseException as e:
+                self._fail(owned, e)
+                raise
+            results.update(self._complete(owned, fetched))
+        for key, future in waiting.items():
+            results[key] = await asyncio.wrap_future(future)
+        return results
+
+    def _reserve(self, keys: list[Hashable]):
+        """Split keys into cached values, keys to fetch and loads to wait for."""
+        results: dict[Hashable, Any] = {}
+        owned: list[Hashable] = []
+        waiting: dict[Hashable, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    results[key] = entry[0]
+                    self.hits += 1
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                    self.coalesced += 1
+                else:
+                    self._inflight[key] = Future()
+                    owned.append(key)
+                    self.misses += 1
+        return results, owned, waiting
+
+    def _fail(self, owned: list[Hashable], error: BaseException) -> None:
+        with self._lock:
+            for key in owned:
+                self._inflight.pop(key).set_exception(error)
+
+    def _complete(self, owned: list[Hashable], fetched: dict) -> dict:
+        results = {}
+        missing = [key for key in owned if fetched.get(key) is None]
+        # Keys the fetch did not return fail, for this caller and its waiters
+        error = LookupError(
+            "No value fetched for "
+            + ", ".join(str(getattr(key, "output_type", key)) for key in missing)
+        )
+        with self._lock:
+            for key in owned:
+                future = self._inflight.pop(key)
+                if key in missing:
+                    future.set_exception(error)
+                    continue
+                value = fetched[key]
+                self._put(key, value, estimate_nbytes(value))
+                future.set_result(value)
+                results[key] = value
+        if missing:
+            raise error
+        return results
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        """Insert under the lock; values larger than the budget are not kept."""
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self._bytes -= evicted_bytes
+            self.evictions += 1
+
+
+prediction_cache = PredictionCache()
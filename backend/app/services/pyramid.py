@@ -0,0 +1,200 @@
+"""Multi-resolution min/max/mean summaries for zoomable region queries."""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import PYRAMID_MIN_FACTOR
+
+
+@dataclass(frozen=True)
+class PyramidLevel:
+    """Summaries of a track matrix at one bin size."""
+
+    bin_size: int  # base pairs per bin
+    min: np.ndarray  # (bins, tracks)
+    max: np.ndarray
+    mean: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        if self.min is self.max:  # base level: one shared array
+            return self.min.nbytes
+        return self.min.nbytes + self.max.nbytes + self.mean.nbytes
+
+
+@dataclass(frozen=True)
+class RegionSummary:
+    """Per-pixel summaries of a genomic region, as (pixels, tracks) arrays."""
+
+    start: int
+    end: int
+    bin_size: float  # base pairs per output column
+    level_bin_size: int  # bin size of the pyramid level that was read
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+
+
+def _block_summary(values: np.ndarray, factor: int):
+    """NaN-ignoring min/max/mean over consecutive groups of `factor` bins."""
+    n_bins, n_tracks = values.shape
+    pad = -n_bins % factor
+    if pad:
+        values = np.concatenate(
+            [values, np.full((pad, n_tracks), np.nan, dtype=values.dtype)]
+        )
+    blocks = values.astype(np.float32, copy=False).reshape(-1, factor, n_tracks)
+    finite = ~np.isnan(blocks)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(finite, blocks, 0.0).sum(axis=1) / finite.sum(axis=1)
+    return (
+        np.fmin.reduce(blocks, axis=1),
+        np.fmax.reduce(blocks, axis=1),
+        mean.astype(np.float32),
+    )
+
+
+def _halve(level: PyramidLevel) -> PyramidLevel:
+    """Next level up: merge pairs of bins."""
+
+    def pairs(array):
+        if len(array) % 2:
+            array = np.concatenate([array, np.full_like(array[:1], np.nan)])
+        return array[0::2], array[1::2]
+
+    (min_a, min_b), (max_a, max_b) = pairs(level.min), pairs(level.max)
+    mean_a, mean_b = pairs(level.mean)
+    mean = np.where(
+        np.isnan(mean_a),
+        mean_b,
+        np.where(np.isnan(mean_b), mean_a, (mean_a + mean_b) * 0.5),
+    )
+    return PyramidLevel(
+        level.bin_size * 2, np.fmin(min_a, min_b), np.fmax(max_a, max_b), mean
+    )
+
+
+def summary_levels(
+    track_data, min_factor: int = PYRAMID_MIN_FACTOR
+) -> tuple[PyramidLevel, ...]:
+    """The levels above the base of a (bins, tracks) TrackData's pyramid."""
+    values = np.asarray(track_data.values)
+    if len(values) <= 1:
+        return ()
+    resolution = track_data.resolution
+    levels = [
+        PyramidLevel(resolution * min_factor, *_block_summary(values, min_factor))
+    ]
+    while len(levels[-1].min) > 1:
+        levels.append(_halve(levels[-1]))
+    return tuple(levels)
+
+
+class TrackPyramid:
+    """bigWig-style zoom levels over one TrackData.
+
+    Level 0 is the prediction itself; the first summary level merges
+    `min_factor` bins and every further level doubles the bin size, down to a
+    single bin. The summary levels can be cached on their own
+    (`summary_levels`) and put back on top of the prediction with
+    `from_summaries`, so a cache never holds the prediction twice. Summary
+    levels together hold about 2/min_factor of the base matrix per statistic.
+    A region query reads the coarsest level that still has at least one bin
+    per pixel, so it touches at most ~2 bins per pixel regardless of how many
+    bases the region spans.
+    """
+
+    def __init__(self, chromosome: str, start: int, levels: list[PyramidLevel]):
+        self.chromosome = chromosome
+        self.start = start
+        self.levels = levels
+        self.end = start + len(levels[0].min) * levels[0].bin_size
+
+    @classmethod
+    def build(cls, track_data, min_factor: int = PYRAMID_MIN_FACTOR):
+        """Build all levels for a (bins, tracks) TrackData."""
+        return cls.from_summaries(track_data, summary_levels(track_data, min_factor))
+
+    @classmethod
+    def from_summaries(cls, track_data, summaries: tuple[PyramidLevel, ...]):
+        """Pyramid over a TrackData from its precomputed `summary_levels`."""
+        values = np.asarray(track_data.values)
+        base = PyramidLevel(track_data.resolution, values, values, values)
+        return cls(
+            track_data.interval.chromosome,
+            track_data.interval.start,
+            [base, *summaries],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels)
+
+    def query(
+        self, start: int, end: int, width: int, tracks: np.ndarray | None = None
+    ) -> RegionSummary:
+        """Summarize [start, end) into at most `width` columns.
+
+        When the region has fewer base bins than `width`, the base bins are
+        returned as they are (so the result may be narrower than `width`).
+
+        Raises:
+            ValueError: If the region does not overlap the prediction
+        """
+        start, end = max(start, self.start), min(end, self.end)
+        if end <= start:
+            raise ValueError("Region does not overlap the predicted interval")
+        bases_per_pixel = (end - start) / width
+
+        base = self.levels[0]
+        if bases_per_pixel <= base.bin_size:
+            lo = (start - self.start) // base.bin_size
+            hi = -(-(end - self.start) // base.bin_size)
+            values = base.min[lo:hi]
+            if tracks is not None:
+                values = values[:, tracks]
+            values = values.astype(np.float32, copy=False)
+            return RegionSummary(
+                self.start + lo * base.bin_size,
+                self.start + hi * base.bin_size,
+                base.bin_size,
+                base.bin_size,
+                values,
+                values,
+                values,
+            )
+
+        level = next(
+            level
+            for level in reversed(self.levels)
+            if level.bin_size <= bases_per_pixel
+        )
+        # Level-bin index of every pixel's left edge; strictly increasing
+        # because each pixel spans at least one level bin
+        edges = start + np.arange(width) * bases_per_pixel
+        starts = ((edges - self.start) // level.bin_size).astype(np.intp)
+        hi = -(-(end - self.start) // level.bin_size)
+        lo = starts[0]
+
+        offsets = starts - lo
+
+        def window(array):
+            array = array[lo:hi]
+            return array[:, tracks] if tracks is not None else array
+
+        means = window(level.mean)
+        finite = ~np.isnan(means)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(
+                np.where(finite, means, 0.0), offsets, axis=0
+            ) / np.add.reduceat(finite, offsets, axis=0)
+        return RegionSummary(
+            start,
+            end,
+            bases_per_pixel,
+            level.bin_size,
+            np.fmin.reduceat(window(level.min), offsets, axis=0),
+            np.fmax.reduceat(window(level.max), offsets, axis=0),
+            mean.astype(np.float32),
+        )
@@ -0,0 +1,336 @@
+"""Out-of-process plot rendering with track arrays passed via shared memory."""
+
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from app.config import RENDER_START_METHOD, RENDER_WORKERS
+from app.services.executors import run_plot
+from app.services.metrics import collect_stages, record, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedArray:
+    """Handle to an array copied into a named shared memory block."""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedData:
+    """A TrackData/JunctionData whose array fields live in shared memory."""
+
+    cls: type
+    fields: dict
+    arrays: dict[str, SharedArray]
+
+
+def share(obj, blocks: list[shared_memory.SharedMemory]) -> SharedData:
+    """Copy the array fields of a data container into shared memory.
+
+    Created blocks are appended to `blocks`; the caller unlinks them once the
+    render that uses them has finished.
+    """
+    fields, arrays = {}, {}
+    for field in dataclasses.fields(obj):
+        value = getattr(obj, field.name)
+        if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+            fields[field.name] = value
+            continue
+        block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+        arrays[field.name] = SharedArray(block.name, value.shape, value.dtype.str)
+    return SharedData(type(obj), fields, arrays)
+
+
+def _attach(data: SharedData, opened: list[shared_memory.SharedMemory]):
+    """Rebuild a data container over shared memory without copying."""
+    arrays = {}
+    for name, handle in data.arrays.items():
+        block = _open_block(handle.name)
+        opened.append(block)
+        arrays[name] = np.ndarray(handle.shape, handle.dtype, buffer=block.buf)
+    return data.cls(**data.fields, **arrays)
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block created by the parent, which alone may unlink it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # Before 3.13 attaching registers the block with this process's
+        # resource tracker, which would unlink it when the worker exits
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _release(blocks: list[shared_memory.SharedMemory], unlink: bool = False):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass  # a view is still alive; the mapping goes with the process
+        if unlink:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _init_worker():
+    """Import matplotlib and the AlphaGenome plotting stack once per process."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from alphagenome.visualization import plot_components  # noqa: F401
+
+    from app.services import visualization  # noqa: F401
+
+    # Build the font cache and Agg canvas before the first real request
+    fig = plt.figure(figsize=(1, 1))
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def _ping() -> bool:
+    return True
+
+
+def _render_interval(
+    track, interval, transcripts, output_type: str, filename: str | None
+) -> tuple[str, list]:
+    from app.services.visualization import generate_interval_plot
+
+    opened = []
+    try:
+        output = types.SimpleNamespace(**{output_type.lower(): _attach(track, opened)})
+        with collect_stages() as stages:
+            path = generate_interval_plot(
+                output, interval, transcripts, output_type, filename
+            )
+        return path, stages
+    finally:
+        output = None
+        _release(opened)
+
+
+def _render_alleles(
+    ref_track,
+    alt_tracks: dict,
+    variants,
+    transcripts,
+    output_type: str,
+    filename: str | None,
+) -> tuple[str, list]:
+    from app.services.visualization import generate_allele_plot
+
+    opened = []
+    try:
+        key = output_type.lower()
+        reference = types.SimpleNamespace(**{key: _attach(ref_track, opened)})
+        alternates = {
+            label: types.SimpleNamespace(**{key: _attach(track, opened)})
+            for label, track in alt_tracks.items()
+        }
+        with collect_stages() as stages:
+            path = generate_allele_plot(
+                reference, alternates, variants, transcripts, output_type, filename
+            )
+        return path, stages
+    finally:
+        reference = alternates = None
+        _release(opened)
+
+
+class RenderPool:
+    """Pool of pre-warmed renderer processes.
+
+    Each plot is rendered in its own process, so output types of one request
+    render in parallel without sharing pyplot state or the server's GIL.
+    Track arrays are handed over through shared memory; only metadata,
+    intervals and transcripts are pickled. With `workers=0` plots are rendered
+    in-process on the plot executor instead.
+    """
+
+    def __init__(
+        self, workers: int = RENDER_WORKERS, start_method: str = RENDER_START_METHOD
+    ):
+        self.workers = workers
+        self.start_method = start_method
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Spawn and warm every worker in the background."""
+        executor = self._get_executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(_ping)
+
+    def shutdown(self) -> None:
+        """Stop all renderer processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def interval_plot(
+        self,
+        output,
+        interval,
+        transcripts,
+        output_type: str,
+        filename: str | None = None,
+    ):
+        """Render an interval plot and return its URL path."""
+        with span("render", output_type):
+            return await self._interval_plot(
+                output, interval, transcripts, output_type, filename
+            )
+
+    async def _interval_plot(
+        self, output, interval, transcripts, output_type, filename
+    ):
+        if not self.workers:
+            from app.services.visualization import generate_interval_plot
+
+            return await run_plot(
+                generate_interval_plot,
+                output,
+                interval,
+                transcripts,
+                output_type,
+                filename,
+            )
+
+        blocks = []
+        try:
+            track = share(getattr(output, output_type.lower()), blocks)
+        except BaseException:
+            _release(blocks, unlink=True)
+            raise
+        return await self._submit(
+            blocks,
+            _render_interval,
+            track,
+            interval,
+            transcripts,
+            output_type,
+            filename,
+        )
+
+    async def allele_plot(
+        self,
+        reference,
+        alternates: dict,
+        variants: list,
+        transcripts,
+        output_type: str,
+        filename: str | None = None,
+    ):
+        """Render REF and every ALT allele overlaid; return the URL path."""
+        with span("render", output_type):
+            return await self._allele_plot(
+                reference, alternates, variants, transcripts, output_type, filename
+            )
+
+    async def _allele_plot(
+        self, reference, alternates, variants, transcripts, output_type, filename
+    ):
+        if not self.workers:
+            from app.services.visualization import generate_allele_plot
+
+            return await run_plot(
+                generate_allele_plot,
+                reference,
+                alternates,
+                variants,
+                transcripts,
+                output_type,
+                filename,
+            )
+
+        blocks = []
+        try:
+            key = output_type.lower()
+            ref_track = share(getattr(reference, key), blocks)
+            alt_tracks = {
+                label: share(getattr(alternate, key), blocks)
+                for label, alternate in alternates.items()
+            }
+        except BaseException:
+            _release(blocks, unlink=True)
+            raise
+        return await self._submit(
+            blocks,
+            _render_alleles,
+            ref_track,
+            alt_tracks,
+            variants,
+            transcripts,
+            output_type,
+            filename,
+        )
+
+    async def _submit(self, blocks, fn, *args):
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                self._reset()
+                future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            _release(blocks, unlink=True)
+            raise
+
+        # Unlink once the worker is done, even if the request is cancelled
+        future.add_done_callback(lambda _: _release(blocks, unlink=True))
+        try:
+            path, stages = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._reset()
+            raise
+        # Stage timings measured in the worker process
+        for stage, output_type, seconds in stages:
+            record(stage, seconds, output_type)
+        return path
+
+    def _get_executor(self) -> ProcessPoolExecutor | None:
+        if not self.workers:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _reset(self) -> None:
+        logger.warning("Render pool broken (worker died); restarting")
+        self.shutdown()
+
+    def stats(self) -> dict:
+        """Return pool size and state."""
+        return {"workers": self.workers, "running": self._executor is not None}
+
+
+render_pool = RenderPool()
@@ -0,0 +1,117 @@
+"""Server-side TTL cache for computed result sets (e.g. tidy variant scores)."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.config import SCORE_RESULT_MAX_ENTRIES, SCORE_RESULT_TTL
+
+
+class ResultCache:
+    """Bounded LRU with per-entry TTL and single-flight computation.
+
+    Used to keep a full score DataFrame around while a client pages through
+    it, so each page is a slice of a cached result instead of a new remote
+    scoring run.
+    """
+
+    def __init__(
+        self, ttl: float = SCORE_RESULT_TTL, max_entries: int = SCORE_RESULT_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return a live cached value or None."""
+        with self._lock:
+            return self._get(key)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, computing it at most once at a time."""
+        value, future = self._reserve(key)
+        if value is not None:
+            return value
+        if future is not None:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            self._fail(key, e)
+            raise
+        return self._complete(key, value)
+
+    async def aget_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Like `get_or_compute` with a coroutine `compute`."""
+        value, future = self._reserve(key)
+        if value is not None:
+            return value
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._fail(key, e)
+            raise
+        return self._complete(key, value)
+
+    def _reserve(self, key: Hashable) -> tuple[Any | None, Future | None]:
+        """Cached value, or the load to wait for.
+
+        (None, None) means the caller owns the load.
+        """
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value, None
+            future = self._inflight.get(key)
+            if future is None:
+                self._inflight[key] = Future()
+                self.misses += 1
+            return None, future
+
+    def _fail(self, key: Hashable, error: BaseException) -> None:
+        with self._lock:
+            self._inflight.pop(key).set_exception(error)
+
+    def _complete(self, key: Hashable, value: Any) -> Any:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key).set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def _get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+
+score_results = ResultCache()
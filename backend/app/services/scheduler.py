@@ -0,0 +1,319 @@
+"""Adaptive per-API-key scheduling and retries for AlphaGenome API calls."""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+
+from app.config import (
+    REMOTE_DECREASE_FACTOR,
+    REMOTE_INITIAL_CONCURRENCY,
+    REMOTE_MAX_CONCURRENCY,
+    REMOTE_MAX_RETRIES,
+    REMOTE_MIN_CONCURRENCY,
+    REMOTE_QUEUE_TIMEOUT,
+    REMOTE_RETRY_BASE,
+    REMOTE_RETRY_MAX,
+    REMOTE_STATE_IDLE_TIMEOUT,
+    REMOTE_THROTTLE_COOLDOWN,
+)
+from app.services.client_pool import hash_api_key
+from app.services.executors import run_sdk
+from app.services.metrics import Counter, record, registry
+
+logger = logging.getLogger(__name__)
+
+# gRPC status codes: the server is out of quota, or the call may succeed later
+THROTTLE_CODES = frozenset({"RESOURCE_EXHAUSTED"})
+TRANSIENT_CODES = frozenset({"UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED"})
+
+# Weight of the latest call in the per-key error rate and latency averages
+_EWMA_ALPHA = 0.1
+
+REMOTE_EVENTS = registry.register(
+    Counter(
+        "alphagenome_remote_events_total",
+        "AlphaGenome API calls by operation and outcome",
+        ("operation", "outcome"),
+    )
+)
+
+
+class RemoteThrottled(Exception):
+    """The API key is throttled or its call queue is full; retry later."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify(exc: BaseException) -> str:
+    """Outcome of a failed call: "throttled", "transient" or "failed"."""
+    code = getattr(exc, "code", None)
+    if callable(code):
+        try:
+            name = getattr(code(), "name", "")
+        except Exception:
+            name = ""
+        if name in THROTTLE_CODES:
+            return "throttled"
+        if name in TRANSIENT_CODES:
+            return "transient"
+        return "failed"
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return "transient"
+    return "failed"
+
+
+def http_error(exc: Exception, message: str) -> HTTPException:
+    """HTTP error for a failed remote call: 429 when throttled, else 500."""
+    if isinstance(exc, RemoteThrottled):
+        return HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+    return HTTPException(status_code=500, detail=f"{message}: {exc}")
+
+
+@dataclass
+class _KeyState:
+    limit: float
+    in_flight: int = 0
+    queued: int = 0
+    error_rate: float = 0.0
+    latency: float = 1.0  # seconds, average of successful calls
+    cooldown_until: float = 0.0
+    decreased_at: float = 0.0
+    decrease_after: float = 0.0
+    last_used: float = 0.0
+    throttled: int = 0
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+class RemoteScheduler:
+    """AIMD concurrency windows and retries for AlphaGenome calls per API key.
+
+    Every key may have up to `limit` calls in flight; more wait on the event
+    loop for up to `queue_timeout` seconds, and only a call that got a slot
+    is handed to the SDK executor, so waiting calls hold no threads. Each
+    successful call that filled the window grows the limit by 1/limit
+    (about one more slot per round of calls) and each throttled or
+    transient failure multiplies it by `decrease_factor`, at most once per
+    average call latency so one burst of failures counts once. Calls started
+    before the last decrease do not grow the window again.
+
+    A throttled key also cools down: no new calls start for
+    `throttle_cooldown` seconds, so batch traffic stops draining the quota.
+    Throttled and transient failures of idempotent calls are retried with
+    full-jitter exponential backoff. Calls that cannot start before their
+    deadline fail with `RemoteThrottled`. All state is only touched from the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        initial: int = REMOTE_INITIAL_CONCURRENCY,
+        minimum: int = REMOTE_MIN_CONCURRENCY,
+        maximum: int = REMOTE_MAX_CONCURRENCY,
+        decrease_factor: float = REMOTE_DECREASE_FACTOR,
+        max_retries: int = REMOTE_MAX_RETRIES,
+        retry_base: float = REMOTE_RETRY_BASE,
+        retry_max: float = REMOTE_RETRY_MAX,
+        throttle_cooldown: float = REMOTE_THROTTLE_COOLDOWN,
+        queue_timeout: float = REMOTE_QUEUE_TIMEOUT,
+        idle_timeout: float = REMOTE_STATE_IDLE_TIMEOUT,
+    ):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.throttle_cooldown = throttle_cooldown
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self._keys: dict[str, _KeyState] = {}
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def call(
+        self, api_key: str, operation: str, fn, *args, idempotent=True, **kwargs
+    ):
+        """Run `fn(*args, **kwargs)` on the SDK executor within the key's window.
+
+        Raises:
+            RemoteThrottled: If no slot frees up in time, the key is cooling
+                down past the deadline, or throttling outlasts the retries
+        """
+        key = hash_api_key(api_key)
+        attempt = 0
+        while True:
+            state, full = await self._acquire(key)
+            start = time.monotonic()
+            task = asyncio.ensure_future(run_sdk(fn, *args, **kwargs))
+            try:
+                result = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # The executor thread keeps running: hold the slot until it ends
+                task.add_done_callback(
+                    lambda _: self._release(state, "cancelled", start, full)
+                )
+                raise
+            except Exception as e:
+                outcome = classify(e)
+                self._release(state, outcome, start, full)
+                REMOTE_EVENTS.inc(operation=operation, outcome=outcome)
+                if outcome == "failed":
+                    raise
+                if not idempotent or attempt >= self.max_retries:
+                    if outcome == "throttled":
+                        raise RemoteThrottled(
+                            f"AlphaGenome API quota exceeded for this API key: {e}",
+                            self.throttle_cooldown,
+                        ) from e
+                    raise
+                delay = random.uniform(
+                    0, min(self.retry_max, self.retry_base * 2**attempt)
+                )
+                logger.warning(
+                    "%s %s (attempt %d), retrying in %.2fs: %s",
+                    operation,
+                    outcome,
+                    attempt + 1,
+                    delay,
+                    e,
+                )
+                self.retries += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._release(state, "ok", start, full)
+            REMOTE_EVENTS.inc(operation=operation, outcome="ok")
+            return result
+
+    async def _acquire(self, key: str) -> tuple[_KeyState, bool]:
+        """Wait for a slot in the key's window and take it.
+
+        Returns:
+            Tuple of (key state, whether the call filled the window)
+        """
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        self._evict_idle(start)
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _KeyState(limit=float(self.initial))
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            cooling = state.cooldown_until - now
+            if cooling <= 0 and state.in_flight < max(1, int(state.limit)):
+                break
+            if now >= deadline or now + cooling > deadline:
+                self.rejected += 1
+                if cooling > 0:
+                    raise RemoteThrottled(
+                        "AlphaGenome API quota exceeded for this API key, "
+                        "retry later",
+                        cooling,
+                    )
+                raise RemoteThrottled(
+                    "Too many AlphaGenome API calls queued for this "
+                    "API key, retry later",
+                    state.latency,
+                )
+            # Woken by the next release, or when the cooldown or deadline ends
+            waiter = loop.create_future()
+            state.waiters.append(waiter)
+            state.queued += 1
+            try:
+                await asyncio.wait_for(
+                    waiter,
+                    min(deadline - now, cooling) if cooling > 0 else deadline - now,
+                )
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                state.queued -= 1
+                if waiter in state.waiters:
+                    state.waiters.remove(waiter)
+        state.in_flight += 1
+        state.last_used = now
+        full = state.in_flight >= int(state.limit)
+        self.calls += 1
+        waited = now - start
+        if waited > 0.001:
+            record("remote_wait", waited)
+        return state, full
+
+    def _release(
+        self, state: _KeyState, outcome: str, started: float, full: bool
+    ) -> None:
+        """Free the slot, adapt the window to the call's outcome, wake waiters."""
+        now = time.monotonic()
+        seconds = now - started
+        state.in_flight -= 1
+        state.last_used = now
+        congested = outcome in ("throttled", "transient")
+        if outcome != "cancelled":
+            state.error_rate += _EWMA_ALPHA * (congested - state.error_rate)
+        if outcome == "ok":
+            state.latency += _EWMA_ALPHA * (seconds - state.latency)
+            if full and started >= state.decreased_at:
+                state.limit = min(self.maximum, state.limit + 1 / state.limit)
+        elif congested:
+            if now >= state.decrease_after:
+                state.limit = max(self.minimum, state.limit * self.decrease_factor)
+                state.decreased_at = now
+                state.decrease_after = now + state.latency
+            if outcome == "throttled":
+                state.throttled += 1
+                self.throttled += 1
+                state.cooldown_until = max(
+                    state.cooldown_until, now + self.throttle_cooldown
+                )
+        elif outcome == "failed":
+            self.failed += 1
+        waiters, state.waiters = state.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _evict_idle(self, now: float) -> None:
+        """Forget keys without calls for `idle_timeout` seconds."""
+        cutoff = now - self.idle_timeout
+        for key in [
+            k
+            for k, s in self._keys.items()
+            if s.in_flight == 0 and s.queued == 0 and s.last_used < cutoff
+        ]:
+            del self._keys[key]
+
+    def stats(self) -> dict:
+        """Return in-flight and queued calls, window sizes and event counters."""
+        now = time.monotonic()
+        states = list(self._keys.values())
+        return {
+            "api_keys": len(states),
+            "in_flight": sum(s.in_flight for s in states),
+            "queued": sum(s.queued for s in states),
+            "concurrency_limit": sum(int(s.limit) for s in states),
+            "cooling_down": sum(s.cooldown_until > now for s in states),
+            "max_error_rate": max((s.error_rate for s in states), default=0.0),
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+remote_scheduler = RemoteScheduler()
@@ -0,0 +1,131 @@
+"""Helpers for tidy variant score DataFrames."""
+
+import base64
+import hashlib
+import hmac
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.config import CURSOR_SECRET
+
+# VariantScore field -> (candidate tidy_scores columns, default)
+SCORE_FIELDS = {
+    "gene_name": (("gene_name",), ""),
+    "gene_id": (("gene_id",), ""),
+    "strand": (("strand", "track_strand"), "+"),
+    "ontology_term": (("ontology_term", "ontology_curie"), ""),
+    "biosample_name": (("biosample_name",), ""),
+    "raw_score": (("raw_score",), 0.0),
+    "quantile_score": (("quantile_score",), 0.0),
+    "output_type": (("output_type",), ""),
+}
+
+
+def score_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Project a tidy scores DataFrame onto the `VariantScore` fields."""
+    columns = {}
+    for field, (sources, default) in SCORE_FIELDS.items():
+        source = next((c for c in sources if c in df.columns), None)
+        if source is None:
+            columns[field] = np.full(len(df), default, dtype=type(default))
+        elif isinstance(default, float):
+            columns[field] = (
+                pd.to_numeric(df[source], errors="coerce")
+                .fillna(default)
+                .to_numpy(np.float64)
+            )
+        else:
+            columns[field] = df[source].fillna(default).astype(str).to_numpy()
+    return pd.DataFrame(columns, index=df.index)
+
+
+def score_records(df: pd.DataFrame) -> list[dict]:
+    """Convert a tidy scores DataFrame to `VariantScore`-shaped dicts."""
+    if df.empty:
+        return []
+    return score_columns(df).to_dict("records")
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(
+        CURSOR_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def encode_cursor(state: dict) -> str:
+    """Encode a pagination state as an opaque, signed URL-safe cursor."""
+    payload = json.dumps(state, separators=(",", ":"), sort_keys=True)
+    payload = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by `encode_cursor` and check its signature.
+
+    Raises:
+        ValueError: If the cursor is malformed or was not signed by this server
+    """
+    payload, _, signature = cursor.partition(".")
+    try:
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("Invalid cursor")
+        state = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def filter_and_sort(
+    df: pd.DataFrame,
+    sort_by: str | None = None,
+    descending: bool = True,
+    min_quantile_score: float | None = None,
+    max_quantile_score: float | None = None,
+    gene: str | None = None,
+    biosample: str | None = None,
+) -> pd.DataFrame:
+    """Apply server-side filters and ordering to projected score columns.
+
+    Args:
+        df: Output of `score_columns`
+        sort_by: A score field, or "abs_quantile_score" for |quantile_score|
+        descending: Sort direction
+        min_quantile_score: Keep rows with quantile_score >= this value
+        max_quantile_score: Keep rows with quantile_score <= this value
+        gene: Case-insensitive gene name or gene ID (version optional)
+        biosample: Case-insensitive substring of the biosample name, or an
+            exact ontology term
+
+    Returns:
+        Filtered, sorted DataFrame
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if min_quantile_score is not None:
+        mask &= df["quantile_score"].to_numpy() >= min_quantile_score
+    if max_quantile_score is not None:
+        mask &= df["quantile_score"].to_numpy() <= max_quantile_score
+    if gene:
+        gene = gene.lower()
+        gene_ids = df["gene_id"].str.lower().str.split(".", n=1).str[0]
+        mask &= (
+            (df["gene_name"].str.lower() == gene) | (gene_ids == gene.split(".")[0])
+        ).to_numpy()
+    if biosample:
+        mask &= (
+            df["biosample_name"].str.contains(biosample, case=False, regex=False)
+            | (df["ontology_term"].str.lower() == biosample.lower())
+        ).to_numpy()
+    view = df[mask] if not mask.all() else df
+
+    if sort_by == "abs_quantile_score":
+        view = view.sort_values(
+            "quantile_score", ascending=not descending, kind="stable", key=abs
+        )
+    elif sort_by:
+        view = view.sort_values(sort_by, ascending=not descending, kind="stable")
+    return view
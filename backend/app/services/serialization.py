@@ -0,0 +1,235 @@
+"""Response encoding: JSON or MessagePack bodies and gzip/brotli compression.
+
+Hot endpoints build their response as plain dicts with the shape of the
+route's `response_model`; those are encoded directly (orjson when installed)
+instead of validating thousands of nested models the server just built.
+MessagePack (with the optional `msgpack` package) is served to clients that
+prefer `application/msgpack` in their Accept header.
+"""
+
+import asyncio
+import contextvars
+import gzip
+
+import pydantic_core
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_THREAD_BYTES,
+)
+from app.services.metrics import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Content types worth compressing (binary track and tile exports are mostly
+# float data that gzip barely shrinks)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+_accept: contextvars.ContextVar[str] = contextvars.ContextVar("accept", default="")
+
+
+def _preferences(header: str) -> dict[str, float]:
+    """Parse an Accept or Accept-Encoding header into {value: q}."""
+    preferences = {}
+    for part in header.split(","):
+        value, *params = (p.strip() for p in part.split(";"))
+        if not value:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        preferences[value.lower()] = q
+    return preferences
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Whether the Accept header prefers MessagePack over JSON."""
+    if msgpack is None or "msgpack" not in accept:
+        return False
+    preferences = _preferences(accept)
+    msgpack_q = max(preferences.get(t, 0.0) for t in MSGPACK_MEDIA_TYPES)
+    json_q = max(
+        preferences.get(t, 0.0) for t in (JSON_MEDIA_TYPE, "application/*", "*/*")
+    )
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def model_response(content: BaseModel | dict) -> Response:
+    """Encode a response model, or a dict of the same shape, in one pass.
+
+    Returning a Response skips FastAPI's response_model re-validation; the
+    route's `response_model` still documents the schema. NaN becomes null.
+    """
+    with span("serialize"):
+        if wants_msgpack(_accept.get()):
+            if isinstance(content, BaseModel):
+                content = content.model_dump(mode="json")
+            body, media_type = msgpack.packb(content), MSGPACK_MEDIA_TYPE
+        elif isinstance(content, BaseModel):
+            body, media_type = content.model_dump_json(), JSON_MEDIA_TYPE
+        elif orjson is not None:
+            body = orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+            media_type = JSON_MEDIA_TYPE
+        else:
+            body = pydantic_core.to_json(content, inf_nan_mode="null")
+            media_type = JSON_MEDIA_TYPE
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def _compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large responses with brotli or gzip.
+
+    Only complete bodies of at least `minimum_size` bytes with a compressible
+    content type are compressed; streamed responses (NDJSON, server-sent
+    events, files) pass through untouched so they still stream. The
+    request's Accept header is recorded for `model_response`.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        thread_bytes: int = COMPRESSION_THREAD_BYTES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_bytes = thread_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            k.decode("latin-1"): v.decode("latin-1")
+            for k, v in scope["headers"]
+            if k in (b"accept", b"accept-encoding")
+        }
+        token = _accept.set(headers.get("accept", ""))
+        try:
+            encoding = self._encoding(headers.get("accept-encoding", ""))
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, self._sender(send, encoding))
+        finally:
+            _accept.reset(token)
+
+    @staticmethod
+    def _encoding(accept_encoding: str) -> str | None:
+        """Best supported content coding the client accepts."""
+        if not accept_encoding:
+            return None
+        preferences = _preferences(accept_encoding)
+        wildcard = preferences.get("*", 0.0)
+        for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+            if preferences.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def _sender(self, send, encoding: str):
+        start = None  # held back until the first body shows whether to compress
+
+        async def sender(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(
+                response_start, body
+            ):
+                await send(response_start)
+                await send(message)
+                return
+
+            with span("compress"):
+                if len(body) >= self.thread_bytes:
+                    body = await asyncio.to_thread(
+                        _compress, body, encoding, self.gzip_level, self.brotli_quality
+                    )
+                else:
+                    body = _compress(
+                        body, encoding, self.gzip_level, self.brotli_quality
+                    )
+            headers = [
+                (k, v)
+                for k, v in response_start.get("headers", [])
+                if k not in (b"content-length", b"vary")
+            ]
+            vary = [
+                v.decode("latin-1")
+                for k, v in response_start.get("headers", [])
+                if k == b"vary"
+            ]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"vary", ", ".join(vary + ["Accept-Encoding"]).encode("latin-1")),
+            ]
+            await send({**response_start, "headers": headers})
+            await send({**message, "body": body})
+
+        return sender
+
+    def _compressible(self, start: dict, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for k, v in start.get("headers", []):
+            if k == b"content-encoding":
+                return False
+            if k == b"content-type":
+                content_type = v
+        content_type = content_type.decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,113 @@
+"""Split wide intervals into overlapping model windows and stitch the results."""
+
+from dataclasses import dataclass
+
+import numpy as np
+from alphagenome.data import genome, track_data
+
+from app.config import OUTPUT_RESOLUTIONS, SEQUENCE_LENGTHS, TILE_ALIGN, TILE_MARGIN
+
+# Outputs that are not a single (bins, tracks) matrix cannot be concatenated
+UNTILEABLE_OUTPUT_TYPES = frozenset({"CONTACT_MAPS", "SPLICE_JUNCTIONS"})
+
+
+@dataclass(frozen=True)
+class TilePlan:
+    """Model windows covering a wide interval.
+
+    Window i contributes the `step` bases starting at
+    interval.start + i * step (its core) to the stitched track; the core
+    starts `offsets[i]` bases into the window. Away from the chromosome ends
+    every offset is `margin`, so every stitched base was predicted with at
+    least `margin` bp of context on both sides (within the window); near an
+    end the window is shifted inwards and its offset changes.
+    """
+
+    interval: genome.Interval
+    windows: list[genome.Interval]
+    window_size: int
+    margin: int
+    offsets: list[int]
+
+    @property
+    def step(self) -> int:
+        return self.window_size - 2 * self.margin
+
+
+def plan_tiles(
+    chromosome: str,
+    start: int,
+    end: int,
+    chromosome_length: int,
+    window_size: int = max(SEQUENCE_LENGTHS),
+    margin: int = TILE_MARGIN,
+    align: int = TILE_ALIGN,
+) -> TilePlan:
+    """Plan overlapping windows for [start, end) inside [0, chromosome_length).
+
+    The stitched interval is [start, end) snapped outwards to multiples of
+    `align`, so it is a whole number of bins at every resolution and nearby
+    requests share windows. It is cut at the last multiple of `align` within
+    the chromosome, and no window extends past either end of the chromosome.
+
+    Raises:
+        ValueError: If the interval is not within the chromosome
+    """
+    limit = chromosome_length // align * align
+    if not 0 <= start < end <= chromosome_length or limit < window_size:
+        raise ValueError(
+            f"Interval {chromosome}:{start}-{end} is outside {chromosome} "
+            f"(length {chromosome_length:,} bp)"
+        )
+    step = window_size - 2 * margin
+    first = start // align * align
+    last = min(-(-end // align) * align, limit)
+    windows, offsets = [], []
+    for core in range(first, last, step):
+        window_start = min(max(core - margin, 0), limit - window_size)
+        windows.append(
+            genome.Interval(chromosome, window_start, window_start + window_size)
+        )
+        offsets.append(core - window_start)
+    return TilePlan(
+        genome.Interval(chromosome, first, last), windows, window_size, margin, offsets
+    )
+
+
+def stitched_bytes(plan: TilePlan, tracks: dict[str, int]) -> int:
+    """Size of the stitched float32 arrays, given tracks per output type."""
+    return sum(
+        plan.interval.width // OUTPUT_RESOLUTIONS[ot] * n * 4
+        for ot, n in tracks.items()
+    )
+
+
+def stitch(plan: TilePlan, tiles: list) -> track_data.TrackData:
+    """Concatenate the core of each window's TrackData into one track.
+
+    Raises:
+        ValueError: If the tiles are not 1D TrackData at a common resolution
+    """
+    first = tiles[0]
+    if not isinstance(first, track_data.TrackData) or first.values.ndim != 2:
+        raise ValueError("Tiled predictions only support 1D track outputs")
+    resolution = first.resolution
+    step = plan.step // resolution
+    remaining = plan.interval.width // resolution
+
+    parts = []
+    for tile, offset in zip(tiles, plan.offsets):
+        if tile.resolution != resolution or tile.values.shape[1] != first.num_tracks:
+            raise ValueError("Tiles disagree on resolution or track layout")
+        take = min(step, remaining)
+        offset //= resolution
+        parts.append(tile.values[offset : offset + take])
+        remaining -= take
+
+    return track_data.TrackData(
+        values=np.concatenate(parts),
+        metadata=first.metadata,
+        resolution=resolution,
+        interval=plan.interval,
+        uns=first.uns,
+    )
@@ -0,0 +1,195 @@
+"""Binary export of raw track values for client-side rendering."""
+
+import io
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Raw format: b"AGTK", uint32 header length, JSON header, zero padding to an
+# 8-byte boundary, then little-endian values in track-major order
+RAW_MAGIC = b"AGTK"
+# Contact map tiles: same framing with b"AGCM"; each tile's values follow in
+# header order, track-major (tracks, rows, cols), padded to 8 bytes
+CONTACT_MAGIC = b"AGCM"
+RAW_MEDIA_TYPE = "application/octet-stream"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def select_tracks(metadata: pd.DataFrame, tracks: list[str] | None) -> np.ndarray:
+    """Indices of the requested tracks, matched by name or "name:strand".
+
+    Raises:
+        ValueError: If a requested track does not exist
+    """
+    if not tracks:
+        return np.arange(len(metadata))
+    names = metadata["name"].astype(str).tolist()
+    strands = (
+        metadata["strand"].astype(str).tolist()
+        if "strand" in metadata.columns
+        else ["."] * len(names)
+    )
+    lookup: dict[str, list[int]] = {}
+    for i, (name, strand) in enumerate(zip(names, strands)):
+        lookup.setdefault(name, []).append(i)
+        lookup.setdefault(f"{name}:{strand}", []).append(i)
+
+    indices = []
+    for track in tracks:
+        if track not in lookup:
+            raise ValueError(f"Unknown track: {track}")
+        indices.extend(lookup[track])
+    return np.array(list(dict.fromkeys(indices)), dtype=np.intp)
+
+
+def downsample(values: np.ndarray, width: int | None, reduce: str = "mean"):
+    """Reduce (bins, tracks) to at most `width` rows by an integer factor.
+
+    Bins are merged in groups of `factor = ceil(bins / width)`, so every
+    output row covers the same number of input bins (the last may be short).
+    NaNs are ignored.
+
+    Returns:
+        Tuple of (downsampled values, factor)
+    """
+    n_bins = len(values)
+    if not width or width >= n_bins:
+        return values, 1
+    factor = -(-n_bins // width)
+    full = n_bins // factor * factor
+    parts = [values[:full].reshape(-1, factor, values.shape[1])]
+    if full < n_bins:
+        parts.append(values[full:][np.newaxis])
+
+    reduced = []
+    for part in parts:
+        part = part.astype(np.float32, copy=False)
+        if reduce == "max":
+            reduced.append(np.fmax.reduce(part, axis=1))
+        else:
+            finite = ~np.isnan(part)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                reduced.append(
+                    np.where(finite, part, 0.0).sum(axis=1) / finite.sum(axis=1)
+                )
+    return np.concatenate(reduced), factor
+
+
+def track_header(
+    track_data,
+    indices: np.ndarray,
+    n_bins: int,
+    bin_size: float,
+    dtype: str,
+    start: int | None = None,
+    end: int | None = None,
+    stats: list[str] | None = None,
+) -> dict:
+    """JSON header describing an exported track matrix.
+
+    With `stats`, every track contributes one column per statistic, in
+    (track, stat) order.
+    """
+    metadata = track_data.metadata.iloc[indices].astype(object)
+    metadata = metadata.where(metadata.notna(), None)
+    interval = track_data.interval
+    header = {
+        "chromosome": interval.chromosome,
+        "start": interval.start if start is None else start,
+        "end": interval.end if end is None else end,
+        "resolution": track_data.resolution,
+        "bin_size": bin_size,
+        "n_bins": n_bins,
+        "n_tracks": len(indices),
+        "dtype": dtype,
+        "byteorder": "little",
+        "layout": "track-major",
+        "tracks": [
+            {"index": int(i), **{k: _plain(v) for k, v in row.items()}}
+            for i, row in zip(indices, metadata.to_dict("records"))
+        ],
+    }
+    if stats:
+        header["stats"] = stats
+    return header
+
+
+def _plain(value):
+    """Metadata value to a JSON-compatible scalar."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def encode_raw(header: dict, values: np.ndarray) -> bytes:
+    """Encode as magic + header length + JSON header + padded track-major values.
+
+    Values start at the first 8-byte boundary after the header, so clients
+    can view them as a typed array without copying.
+    """
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    padding = b"\0" * (-(len(RAW_MAGIC) + 4 + len(header_bytes)) % 8)
+    data = np.ascontiguousarray(
+        values.T, dtype=np.dtype(header["dtype"]).newbyteorder("<")
+    )
+    return b"".join(
+        [
+            RAW_MAGIC,
+            struct.pack("<I", len(header_bytes)),
+            header_bytes,
+            padding,
+            data.tobytes(),
+        ]
+    )
+
+
+def encode_arrow(header: dict, values: np.ndarray) -> bytes:
+    """Encode as an Arrow IPC stream: one column per track, header in metadata."""
+    dtype = pa.float16() if header["dtype"] == "float16" else pa.float32()
+    data = np.ascontiguousarray(values.T, dtype=np.dtype(header["dtype"]))
+    columns = [pa.array(row, type=dtype) for row in data]
+    names = [
+        f"{t['index']}:{t.get('name', '')}:{t.get('strand', '')}"
+        for t in header["tracks"]
+    ]
+    if "stats" in header:
+        names = [f"{name}:{stat}" for name in names for stat in header["stats"]]
+    schema = pa.schema(
+        [pa.field(name, dtype) for name in names],
+        metadata={"alphagenome": json.dumps(header, separators=(",", ":"))},
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+    return sink.getvalue()
+
+
+def encode_tiles(header: dict, tiles: list[np.ndarray]) -> bytes:
+    """Encode (rows, cols, tracks) tiles as magic + header + padded tile values.
+
+    Every tile in `header["tiles"]` gets its byte `offset` (from the start of
+    the values section) and `shape`, so clients can view each track of each
+    tile as a typed array without copying.
+    """
+    dtype = np.dtype(header["dtype"]).newbyteorder("<")
+    data, offset = [], 0
+    for entry, tile in zip(header["tiles"], tiles):
+        values = np.ascontiguousarray(tile.transpose(2, 0, 1), dtype=dtype)
+        entry["offset"] = offset
+        entry["shape"] = list(values.shape)
+        data.append(values.tobytes())
+        padding = -values.nbytes % 8
+        data.append(b"\0" * padding)
+        offset += values.nbytes + padding
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    padding = b"\0" * (-(len(CONTACT_MAGIC) + 4 + len(header_bytes)) % 8)
+    return b"".join(
+        [CONTACT_MAGIC, struct.pack("<I", len(header_bytes)), header_bytes, padding]
+        + data
+    )
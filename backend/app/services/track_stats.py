@@ -0,0 +1,168 @@
+"""Vectorized per-track summary statistics over prediction matrices."""
+
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import TRACK_STATS_PERCENTILE_SAMPLE, TRACK_STATS_PERCENTILES
+
+# float32 elements per block, so the blocks of (bins, tracks) matrices walked
+# together stay cache-sized
+BLOCK_ELEMENTS = 1 << 21
+
+
+@dataclass(frozen=True)
+class TrackSummary:
+    """Per-track statistics as parallel arrays (NaN where a track has no data)."""
+
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    percentiles: dict[str, np.ndarray]
+    argmax_position: np.ndarray | None
+    gene_body_sum: np.ndarray | None
+
+
+def rows_per_block(n_tracks: int, matrices: int = 1) -> int:
+    """Rows per block when `matrices` (bins, n_tracks) matrices are walked together."""
+    return max(1, BLOCK_ELEMENTS // (matrices * max(n_tracks, 1)))
+
+
+def track_labels(metadata, n_tracks: int, output_type: str):
+    """Names, strands and ontology terms of every track from SDK metadata.
+
+    Returns:
+        Tuple of three lists of strings, one entry per track
+    """
+
+    def column(name, fallback=None, default=""):
+        for key in (name, fallback):
+            if key and key in metadata.columns:
+                return metadata[key].fillna(default).astype(str).tolist()
+        return [default] * n_tracks
+
+    return (
+        column("name", default=output_type),
+        column("strand", default="+"),
+        column("ontology_term", "ontology_curie"),
+    )
+
+
+def gene_body_mask(
+    n_bins: int,
+    resolution: int,
+    start: int,
+    body_starts: np.ndarray,
+    body_ends: np.ndarray,
+) -> np.ndarray:
+    """Boolean mask of bins overlapping the union of [start, end) bodies."""
+    lo = np.clip((np.asarray(body_starts) - start) // resolution, 0, n_bins)
+    hi = np.clip(-(-(np.asarray(body_ends) - start) // resolution), 0, n_bins)
+    # Difference array: +1 at each body start bin, -1 past its end bin
+    edges = np.zeros(n_bins + 1, dtype=np.int32)
+    np.add.at(edges, lo, 1)
+    np.add.at(edges, hi, -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+def summarize_tracks(
+    values: np.ndarray,
+    resolution: int | None = None,
+    start: int = 0,
+    body_mask: np.ndarray | None = None,
+    percentiles: tuple[float, ...] = TRACK_STATS_PERCENTILES,
+    percentile_sample: int = TRACK_STATS_PERCENTILE_SAMPLE,
+) -> TrackSummary:
+    """Compute min/max/mean, argmax and gene-body sums in one blocked pass.
+
+    The matrix is walked once in row blocks, so every reduction reads
+    contiguous memory instead of striding down one column per track. NaNs are
+    ignored. Percentiles are exact up to `percentile_sample` bins and are
+    taken over evenly spaced bins beyond that.
+
+    Args:
+        values: Array of shape (bins, tracks)
+        resolution: Base pairs per bin; enables `argmax_position`
+        start: Genomic start of the first bin
+        body_mask: Boolean mask over bins to sum into `gene_body_sum`
+        percentiles: Percentiles to report, in [0, 100]
+        percentile_sample: Maximum bins used for percentiles
+
+    Returns:
+        TrackSummary with one entry per track
+    """
+    n_bins, n_tracks = values.shape
+    mins = np.full(n_tracks, np.inf)
+    maxs = np.full(n_tracks, -np.inf)
+    sums = np.zeros(n_tracks)
+    counts = np.zeros(n_tracks, dtype=np.int64)
+    argmax = np.zeros(n_tracks, dtype=np.int64)
+    body = np.zeros(n_tracks) if body_mask is not None else None
+    columns = np.arange(n_tracks)
+
+    block_rows = rows_per_block(n_tracks)
+    for lo in range(0, n_bins, block_rows):
+        block = np.asarray(values[lo : lo + block_rows], dtype=np.float32)
+        block_sum = block.sum(axis=0)
+        nan_cols = np.flatnonzero(np.isnan(block_sum))
+        counts += len(block)
+        if len(nan_cols):
+            # Only columns that actually contain NaN take the masked path
+            sub = block[:, nan_cols]
+            nan = np.isnan(sub)
+            counts[nan_cols] -= nan.sum(axis=0)
+            block_sum[nan_cols] = np.where(nan, 0.0, sub).sum(axis=0)
+            high = block.copy()
+            high[:, nan_cols] = np.where(nan, -np.inf, sub)
+            if body is not None:
+                block = block.copy()
+                block[:, nan_cols] = np.where(nan, 0.0, sub)
+        else:
+            high = block
+
+        block_argmax = high.argmax(axis=0)
+        block_max = high[block_argmax, columns]
+        better = block_max > maxs
+        argmax[better] = lo + block_argmax[better]
+        maxs = np.maximum(maxs, block_max)
+        mins = np.fmin(mins, np.fmin.reduce(block, axis=0))
+        sums += block_sum
+        if body is not None:
+            body += body_mask[lo : lo + len(block)].astype(np.float32) @ block
+
+    empty = counts == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts
+    mins[empty] = maxs[empty] = mean[empty] = np.nan
+
+    return TrackSummary(
+        min=mins,
+        max=maxs,
+        mean=mean,
+        percentiles=_percentiles(values, percentiles, percentile_sample),
+        argmax_position=(
+            np.where(empty, -1, start + argmax * resolution)
+            if resolution is not None
+            else None
+        ),
+        gene_body_sum=body,
+    )
+
+
+def _percentiles(
+    values: np.ndarray, percentiles: tuple[float, ...], sample: int
+) -> dict[str, np.ndarray]:
+    if not percentiles or len(values) == 0:
+        return {}
+    if len(values) > sample:
+        values = values[np.linspace(0, len(values) - 1, sample).astype(np.intp)]
+    values = np.asarray(values, dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN tracks
+        quantiles = (
+            np.nanpercentile(values, percentiles, axis=0)
+            if np.isnan(values).any()
+            else np.percentile(values, percentiles, axis=0)
+        )
+    return {f"p{q:g}": row for q, row in zip(percentiles, quantiles)}
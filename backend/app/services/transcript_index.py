@@ -0,0 +1,148 @@
+"""Interval index over MANE Select transcripts and exons."""
+
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from alphagenome.data import genome
+from alphagenome.data import transcript as transcript_utils
+
+from app.config import TRANSCRIPT_CACHE_SIZE
+from app.services.metrics import span
+
+
+@dataclass(frozen=True)
+class TranscriptHits:
+    """Transcripts overlapping an interval, as parallel arrays sorted by start."""
+
+    index: np.ndarray
+    transcript_id: np.ndarray
+    gene_id: np.ndarray
+    gene_name: np.ndarray
+    strand: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+@dataclass(frozen=True)
+class _ChromosomeIndex:
+    order: np.ndarray  # transcript indices sorted by start
+    starts: np.ndarray
+    ends: np.ndarray
+    max_ends: np.ndarray  # running maximum of ends, non-decreasing
+
+
+def _column(df: pd.DataFrame, name: str, default: str = "") -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    return df[name].astype(object).where(df[name].notna(), default).to_numpy()
+
+
+class TranscriptIndex:
+    """Sorted-array interval index built once from a GTF table.
+
+    Transcripts are sorted by start per chromosome alongside a running maximum
+    of their ends, so an overlap query is two binary searches plus a scan over
+    the candidate block: O(log n + k). Exon coordinates are stored in CSR form
+    (`exon_offsets`, `exon_starts`, `exon_ends`) keyed by transcript index.
+    """
+
+    def __init__(self, gtf: pd.DataFrame, cache_size: int = TRANSCRIPT_CACHE_SIZE):
+        self._gtf = gtf
+        transcripts = gtf[gtf.Feature == "transcript"].drop_duplicates("transcript_id")
+
+        self.transcript_id = _column(transcripts, "transcript_id")
+        self.gene_id = _column(transcripts, "gene_id")
+        self.gene_name = _column(transcripts, "gene_name")
+        self.strand = _column(transcripts, "Strand", "+")
+        self.start = transcripts["Start"].to_numpy(dtype=np.int64)
+        self.end = transcripts["End"].to_numpy(dtype=np.int64)
+        chromosomes = transcripts["Chromosome"].astype(str).to_numpy()
+
+        self._chromosomes: dict[str, _ChromosomeIndex] = {}
+        for chromosome in np.unique(chromosomes):
+            members = np.flatnonzero(chromosomes == chromosome)
+            order = members[np.argsort(self.start[members], kind="stable")]
+            ends = self.end[order]
+            self._chromosomes[chromosome] = _ChromosomeIndex(
+                order=order,
+                starts=self.start[order],
+                ends=ends,
+                max_ends=np.maximum.accumulate(ends),
+            )
+
+        self._build_exons(gtf[gtf.Feature == "exon"])
+        self._rows_by_transcript = gtf.groupby(
+            gtf["transcript_id"].astype(object), sort=False
+        ).indices
+        self._transcripts: dict[int, transcript_utils.Transcript] = {}
+        self._extract_cached = functools.lru_cache(maxsize=cache_size)(self._extract)
+
+    def _build_exons(self, exons: pd.DataFrame) -> None:
+        """Store exon coordinates grouped by transcript index."""
+        position = {tid: i for i, tid in enumerate(self.transcript_id)}
+        owner = exons["transcript_id"].astype(object).map(position)
+        keep = owner.notna().to_numpy()
+        owner = owner.to_numpy()[keep].astype(np.int64)
+        starts = exons["Start"].to_numpy(dtype=np.int64)[keep]
+        ends = exons["End"].to_numpy(dtype=np.int64)[keep]
+
+        order = np.lexsort((starts, owner))
+        self.exon_starts = starts[order]
+        self.exon_ends = ends[order]
+        counts = np.bincount(owner, minlength=len(self.transcript_id))
+        self.exon_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def query(self, chromosome: str, start: int, end: int) -> np.ndarray:
+        """Indices of transcripts overlapping [start, end], sorted by start."""
+        index = self._chromosomes.get(chromosome)
+        if index is None:
+            return np.empty(0, dtype=np.int64)
+        lo = np.searchsorted(index.max_ends, start, side="left")
+        hi = np.searchsorted(index.starts, end, side="right")
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+        return index.order[lo:hi][index.ends[lo:hi] >= start]
+
+    def hits(self, interval: genome.Interval) -> TranscriptHits:
+        """Overlapping transcripts as compact arrays."""
+        idx = self.query(interval.chromosome, interval.start, interval.end)
+        return TranscriptHits(
+            index=idx,
+            transcript_id=self.transcript_id[idx],
+            gene_id=self.gene_id[idx],
+            gene_name=self.gene_name[idx],
+            strand=self.strand[idx],
+            start=self.start[idx],
+            end=self.end[idx],
+        )
+
+    def exons(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Exon (starts, ends) of transcript `i`."""
+        lo, hi = self.exon_offsets[i], self.exon_offsets[i + 1]
+        return self.exon_starts[lo:hi], self.exon_ends[lo:hi]
+
+    def extract(self, interval: genome.Interval) -> list[transcript_utils.Transcript]:
+        """Transcript objects overlapping an interval (LRU-cached per interval)."""
+        with span("transcript_extract"):
+            return list(
+                self._extract_cached(interval.chromosome, interval.start, interval.end)
+            )
+
+    def _extract(self, chromosome: str, start: int, end: int) -> tuple:
+        return tuple(self._transcript(i) for i in self.query(chromosome, start, end))
+
+    def _transcript(self, i: int) -> transcript_utils.Transcript:
+        """Build (and memoize) the `Transcript` object for transcript `i`."""
+        transcript = self._transcripts.get(int(i))
+        if transcript is None:
+            rows = self._gtf.iloc[self._rows_by_transcript[self.transcript_id[i]]]
+            transcript = transcript_utils.Transcript.fix_truncation(
+                transcript_utils.Transcript.from_gtf_df(rows, ignore_info=False)
+            )
+            self._transcripts[int(i)] = transcript
+        return transcript
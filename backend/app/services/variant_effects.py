@@ -0,0 +1,158 @@
+"""Vectorized per-track REF vs ALT effect statistics for variant predictions."""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import VARIANT_EFFECT_PSEUDOCOUNT, VARIANT_EFFECT_WINDOWS
+from app.services.track_stats import rows_per_block
+
+
+@dataclass(frozen=True)
+class TrackEffects:
+    """Per-track REF/ALT differences as parallel arrays (NaN where undefined)."""
+
+    max_abs_diff: np.ndarray
+    max_abs_diff_position: np.ndarray | None
+    log_fold_change: dict[str, np.ndarray]
+    gene_delta: np.ndarray | None  # (genes, tracks) ALT - REF over each body
+
+
+def bin_ranges(
+    n_bins: int,
+    resolution: int,
+    start: int,
+    range_starts: np.ndarray,
+    range_ends: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Half-open bin ranges [lo, hi) overlapping genomic [start, end) ranges."""
+    lo = np.clip((np.asarray(range_starts) - start) // resolution, 0, n_bins)
+    hi = np.clip(-(-(np.asarray(range_ends) - start) // resolution), 0, n_bins)
+    return lo, hi
+
+
+def compare_tracks(
+    ref: np.ndarray,
+    alt: np.ndarray,
+    resolution: int | None = None,
+    start: int = 0,
+    position: int | None = None,
+    body_starts: np.ndarray | None = None,
+    body_ends: np.ndarray | None = None,
+    windows: tuple[int, ...] = VARIANT_EFFECT_WINDOWS,
+    pseudocount: float = VARIANT_EFFECT_PSEUDOCOUNT,
+) -> TrackEffects:
+    """Compare REF and ALT predictions of every track in one blocked pass.
+
+    Both matrices are walked once in row blocks. Each block yields the
+    largest absolute ALT - REF difference per track and the REF and ALT sums
+    over every window around the variant and every gene body (one small
+    indicator matrix product per block). Bins that are NaN in either arm
+    are ignored; tracks without any valid bin get NaN throughout.
+
+    Args:
+        ref: REF array of shape (bins, tracks)
+        alt: ALT array of the same shape
+        resolution: Base pairs per bin; enables positions, windows and genes
+        start: Genomic start of the first bin
+        position: 0-based variant position, the center of the windows
+        body_starts: Gene body starts for `gene_delta`
+        body_ends: Gene body ends
+        windows: Window widths in base pairs for `log_fold_change`
+        pseudocount: Added to both window sums before the log ratio
+
+    Returns:
+        TrackEffects with one entry per track
+    """
+    n_bins, n_tracks = ref.shape
+    max_abs = np.full(n_tracks, -np.inf)
+    argmax = np.zeros(n_tracks, dtype=np.int64)
+    columns = np.arange(n_tracks)
+
+    # Windows first, then gene bodies, as one list of bin ranges
+    lo = np.zeros(0, dtype=np.int64)
+    hi = np.zeros(0, dtype=np.int64)
+    if resolution is not None and position is not None and windows:
+        half = np.asarray(windows) // 2
+        lo, hi = bin_ranges(
+            n_bins, resolution, start, position - half, position + half + 1
+        )
+    n_windows = len(lo)
+    if resolution is not None and body_starts is not None and len(body_starts):
+        body_lo, body_hi = bin_ranges(n_bins, resolution, start, body_starts, body_ends)
+        lo, hi = np.concatenate([lo, body_lo]), np.concatenate([hi, body_hi])
+    ref_sums = np.zeros((len(lo), n_tracks))
+    alt_sums = np.zeros((len(lo), n_tracks))
+
+    block_rows = rows_per_block(n_tracks, matrices=2)
+    for b in range(0, n_bins, block_rows):
+        ref_block = np.asarray(ref[b : b + block_rows], dtype=np.float32)
+        alt_block = np.asarray(alt[b : b + block_rows], dtype=np.float32)
+        diff = np.abs(alt_block - ref_block)
+        nan = np.isnan(diff)
+        if nan.any():
+            # A bin missing in either arm is left out of both arms' sums
+            diff[nan] = -np.inf
+            ref_block = np.where(nan, 0.0, ref_block)
+            alt_block = np.where(nan, 0.0, alt_block)
+
+        block_argmax = diff.argmax(axis=0)
+        block_max = diff[block_argmax, columns]
+        better = block_max > max_abs
+        argmax[better] = b + block_argmax[better]
+        max_abs = np.maximum(max_abs, block_max)
+
+        if len(lo):
+            rows = np.arange(b, b + len(ref_block))
+            inside = (rows >= lo[:, None]) & (rows < hi[:, None])
+            if inside.any():
+                weights = inside.astype(np.float32)
+                ref_sums += weights @ ref_block
+                alt_sums += weights @ alt_block
+
+    empty = np.isneginf(max_abs)
+    max_abs[empty] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratios = np.log2(
+            (alt_sums[:n_windows] + pseudocount) / (ref_sums[:n_windows] + pseudocount)
+        )
+    deltas = alt_sums[n_windows:] - ref_sums[n_windows:]
+    ratios[:, empty] = deltas[:, empty] = np.nan
+
+    return TrackEffects(
+        max_abs_diff=max_abs,
+        max_abs_diff_position=(
+            np.where(empty, -1, start + argmax * resolution)
+            if resolution is not None
+            else None
+        ),
+        log_fold_change={
+            f"{width}bp": row for width, row in zip(windows, ratios[:n_windows])
+        },
+        gene_delta=(
+            deltas if body_starts is not None and resolution is not None else None
+        ),
+    )
+
+
+def effect_sizes(effects: TrackEffects, by: str) -> np.ndarray:
+    """Per-track effect size to rank by, -inf for tracks without a value.
+
+    `by` is "max_abs_diff" or "abs_log_fold_change" (narrowest window).
+    """
+    if by == "abs_log_fold_change" and effects.log_fold_change:
+        size = np.abs(next(iter(effects.log_fold_change.values())))
+    else:
+        size = effects.max_abs_diff
+    return np.where(np.isnan(size), -np.inf, size)
+
+
+def rank_tracks(effects: TrackEffects, by: str, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` tracks with the largest `effect_sizes`, largest first."""
+    size = effect_sizes(effects, by)
+    top_k = min(top_k, len(size))
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    # Partition first so only top_k values are sorted
+    top = np.argpartition(-size, top_k - 1)[:top_k]
+    return top[np.argsort(-size[top], kind="stable")]
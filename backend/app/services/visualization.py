@@ -9,7 +9,13 @@ matplotlib.use("Agg")  # Non-interactive backend
 import matplotlib.pyplot as plt
 from alphagenome.visualization import plot_components
 
-from app.config import PLOTS_DIR
+from app.config import (
+    CONTACT_PLOT_MAX_BINS,
+    CONTACT_PLOT_MAX_TRACKS,
+    PLOT_DPI,
+    PLOTS_DIR,
+)
+from app.services.metrics import span
 
 
 def ensure_plots_dir():
@@ -17,7 +23,92 @@ def ensure_plots_dir():
     os.makedirs(PLOTS_DIR, exist_ok=True)
 
 
-def generate_interval_plot(output, interval, transcripts, output_type: str) -> str:
+def save_plot(fig, filename: str, output_type: str = "") -> str:
+    """Save `fig` to PLOTS_DIR atomically and close it."""
+    filepath = os.path.join(PLOTS_DIR, filename)
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+    try:
+        with span("savefig", output_type):
+            fig.savefig(tmp_path, format="png", dpi=PLOT_DPI, bbox_inches="tight")
+        os.replace(tmp_path, filepath)
+    finally:
+        plt.close(fig)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return f"/plots/{filename}"
+
+
+class ContactMapHeatmaps(plot_components.AbstractComponent):
+    """One contact map heatmap per track, drawn as an image.
+
+    Same layout and colors as `plot_components.ContactMaps` (diagonal from
+    top left to bottom right), but drawn with `imshow`, which costs one image
+    per track instead of one quad per cell.
+    """
+
+    def __init__(
+        self,
+        tdata,
+        track_height: float = 2.0,
+        vmin: float = -1.0,
+        vmax: float = 2.0,
+        cmap: str = "autumn_r",
+    ):
+        self._tdata = tdata
+        self._track_height = track_height
+        self._vmin = vmin
+        self._vmax = vmax
+        self._cmap = cmap
+
+    def get_ax_height(self, axis_index: int) -> float:
+        return self._track_height
+
+    @property
+    def num_axes(self) -> int:
+        return self._tdata.num_tracks
+
+    def plot_ax(self, ax, axis_index: int, interval):
+        tdata = self._tdata
+        n_bins = tdata.values.shape[0]
+        ax.imshow(
+            tdata.values[:, :, axis_index],
+            extent=(tdata.interval.start, tdata.interval.end, 0, n_bins),
+            origin="upper",
+            aspect="auto",
+            interpolation="nearest",
+            cmap=self._cmap,
+            vmin=self._vmin,
+            vmax=self._vmax,
+        )
+        ax.set_ylabel(
+            str(tdata.metadata["name"].iloc[axis_index]),
+            rotation=0,
+            multialignment="center",
+            va="center",
+            ha="right",
+            labelpad=5,
+        )
+
+
+def _contact_map_plot_data(track_data):
+    """Bound the cells and tracks drawn for a (bins, bins, tracks) TrackData.
+
+    Callers holding `ContactMapTiles` pass a coarse level already; anything
+    larger is tiled here first.
+    """
+    from app.services.contact_maps import ContactMapTiles
+
+    if (
+        len(track_data.values) <= CONTACT_PLOT_MAX_BINS
+        and track_data.num_tracks <= CONTACT_PLOT_MAX_TRACKS
+    ):
+        return track_data
+    return ContactMapTiles.build(track_data).plot_data()
+
+
+def generate_interval_plot(
+    output, interval, transcripts, output_type: str, filename: str | None = None
+) -> str:
     """Generate plot for interval predictions.
 
     Args:
@@ -25,6 +116,7 @@ def generate_interval_plot(output, interval, transcripts, output_type: str) -> s
         interval: Genomic interval
         transcripts: Transcript annotations
         output_type: Output type name (e.g., "RNA_SEQ")
+        filename: File name in PLOTS_DIR (random if omitted)
 
     Returns:
         URL path to the generated plot
@@ -33,57 +125,77 @@ def generate_interval_plot(output, interval, transcripts, output_type: str) -> s
 
     track_data = getattr(output, output_type.lower())
 
-    fig = plot_components.plot(
-        components=[
-            plot_components.TranscriptAnnotation(transcripts),
-            plot_components.Tracks(track_data),
-        ],
-        interval=track_data.interval,
-    )
-
-    filename = f"{uuid.uuid4().hex}_{output_type.lower()}.png"
-    filepath = os.path.join(PLOTS_DIR, filename)
-    plt.savefig(filepath, dpi=150, bbox_inches="tight")
-    plt.close()
-
-    return f"/plots/{filename}"
-
-
-def generate_variant_plot(
-    variant_output, variant, interval, transcripts, output_type: str
+    with span("plot", output_type):
+        if track_data.values.ndim == 3:
+            track_data = _contact_map_plot_data(track_data)
+            component = ContactMapHeatmaps(track_data)
+        else:
+            component = plot_components.Tracks(track_data)
+        fig = plot_components.plot(
+            components=[
+                plot_components.TranscriptAnnotation(transcripts),
+                component,
+            ],
+            interval=track_data.interval,
+        )
+
+    filename = filename or f"{uuid.uuid4().hex}_{output_type.lower()}.png"
+    return save_plot(fig, filename, output_type)
+
+
+# Line colors for ALT alleles overlaid on the grey REF track
+ALT_COLORS = ["red", "royalblue", "darkorange", "seagreen", "purple", "teal"]
+
+
+def _variant_annotation(variants: list) -> plot_components.VariantAnnotation:
+    """Annotate variants; alleles at one position share a single label."""
+    first = variants[0]
+    if len(variants) > 1 and all(v.position == first.position for v in variants):
+        alts = ",".join(v.alternate_bases for v in variants)
+        label = f"{first.chromosome}:{first.position}:{first.reference_bases}>{alts}"
+        return plot_components.VariantAnnotation([first], labels=[label], alpha=0.8)
+    return plot_components.VariantAnnotation(variants, alpha=0.8)
+
+
+def generate_allele_plot(
+    reference,
+    alternates: dict,
+    variants: list,
+    transcripts,
+    output_type: str,
+    filename: str | None = None,
 ) -> str:
-    """Generate overlay plot for variant REF/ALT comparison.
+    """Generate one overlay plot of the REF track and every ALT allele.
 
     Args:
-        variant_output: AlphaGenome variant prediction output
-        variant: Variant object
-        interval: Genomic interval
+        reference: AlphaGenome output for the reference sequence
+        alternates: Legend label -> AlphaGenome output for that ALT allele
+        variants: Variant objects to annotate
         transcripts: Transcript annotations
         output_type: Output type name (e.g., "RNA_SEQ")
+        filename: File name in PLOTS_DIR (random if omitted)
 
     Returns:
         URL path to the generated plot
     """
     ensure_plots_dir()
 
-    ref_track = getattr(variant_output.reference, output_type.lower())
-    alt_track = getattr(variant_output.alternate, output_type.lower())
-
-    fig = plot_components.plot(
-        [
-            plot_components.TranscriptAnnotation(transcripts),
-            plot_components.OverlaidTracks(
-                tdata={"REF": ref_track, "ALT": alt_track},
-                colors={"REF": "dimgrey", "ALT": "red"},
-            ),
-        ],
-        interval=ref_track.interval,
-        annotations=[plot_components.VariantAnnotation([variant], alpha=0.8)],
-    )
-
-    filename = f"{uuid.uuid4().hex}_variant_{output_type.lower()}.png"
-    filepath = os.path.join(PLOTS_DIR, filename)
-    plt.savefig(filepath, dpi=150, bbox_inches="tight")
-    plt.close()
-
-    return f"/plots/{filename}"
+    ref_track = getattr(reference, output_type.lower())
+    tdata = {"REF": ref_track}
+    colors = {"REF": "dimgrey"}
+    for i, (label, alternate) in enumerate(alternates.items()):
+        tdata[label] = getattr(alternate, output_type.lower())
+        colors[label] = ALT_COLORS[i % len(ALT_COLORS)]
+
+    with span("plot", output_type):
+        fig = plot_components.plot(
+            [
+                plot_components.TranscriptAnnotation(transcripts),
+                plot_components.OverlaidTracks(tdata=tdata, colors=colors),
+            ],
+            interval=ref_track.interval,
+            annotations=[_variant_annotation(variants)],
+        )
+
+    filename = filename or f"{uuid.uuid4().hex}_variant_{output_type.lower()}.png"
+    return save_plot(fig, filename, output_type)
@@ -0,0 +1,5 @@
+"""Offline benchmarks for the AlphaGenome Viewer backend.
+
+Run with `python -m benchmarks` from the backend directory; see
+`python -m benchmarks --help`.
+"""
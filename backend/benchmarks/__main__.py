@@ -0,0 +1,177 @@
+"""Command line entry point: `python -m benchmarks [run|compare] ...`."""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+OUTPUT_TYPES = ["RNA_SEQ", "DNASE"]
+ONTOLOGY_TERMS = ["UBERON:0002048"]
+
+
+def _configure(args, workdir: str) -> None:
+    """Point the app at scratch directories before it is imported."""
+    os.environ["PLOTS_DIR"] = os.path.join(workdir, "plots")
+    os.environ["ANNOTATION_CACHE_DIR"] = os.path.join(workdir, "annotations")
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "0")
+    if args.render_workers is not None:
+        os.environ["RENDER_WORKERS"] = str(args.render_workers)
+    if args.gtf_path:
+        os.environ["GTF_PATH"] = args.gtf_path
+    else:
+        from benchmarks.fake_client import synthetic_gtf
+
+        path = os.path.join(workdir, "synthetic_gtf.feather")
+        synthetic_gtf().to_feather(path)
+        os.environ["GTF_PATH"] = path
+
+
+def _run(args) -> int:
+    with tempfile.TemporaryDirectory(prefix="alphagenome-bench-") as workdir:
+        _configure(args, workdir)
+
+        from benchmarks import suite
+        from benchmarks.fake_client import FakeDnaClient, LatencyModel, install
+
+        fake = FakeDnaClient(
+            LatencyModel(scale=args.latency_scale, jitter=args.jitter, seed=args.seed),
+            seed=args.seed,
+            quota=args.quota,
+            error_rate=args.error_rate,
+        )
+        install(fake)
+
+        config = {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("command", "func", "output")
+        }
+        results = {**suite.metadata(config), "endpoints": [], "stages": []}
+
+        if not args.skip_endpoints:
+            results["endpoints"] = asyncio.run(
+                suite.run_endpoints(
+                    args.endpoints,
+                    args.modes,
+                    args.concurrency,
+                    args.requests,
+                    args.width,
+                    args.output_types,
+                    args.ontology_terms,
+                )
+            )
+        if not args.skip_stages:
+            results["stages"] = suite.run_stages(args.repeats, fake)
+        results["remote_calls"] = dict(fake.calls)
+        results["remote_errors"] = dict(fake.errors)
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json",
+    )
+    suite.save(results, output)
+    print(f"Results written to {output}")
+    return 0
+
+
+def _compare(args) -> int:
+    import json
+
+    from benchmarks.suite import compare
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    lines, regressed = compare(baseline, current, args.threshold)
+    print(f"{baseline.get('version')} ({baseline.get('commit')}) -> ", end="")
+    print(f"{current.get('version')} ({current.get('commit')})")
+    print("\n".join(lines))
+    return 1 if regressed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline AlphaGenome Viewer benchmarks against a fake model client",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="Run the benchmarks (default)")
+    run.add_argument(
+        "--endpoints",
+        nargs="+",
+        default=["interval", "variant", "score"],
+        choices=["interval", "variant", "score"],
+    )
+    run.add_argument(
+        "--modes",
+        nargs="+",
+        default=["cold", "warm"],
+        choices=["cold", "warm"],
+        help="cold: a new locus per request; warm: served from caches",
+    )
+    run.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    run.add_argument(
+        "--requests", type=int, default=20, help="Requests per concurrency level"
+    )
+    run.add_argument("--width", type=int, default=131072, help="Interval width")
+    run.add_argument("--output-types", nargs="+", default=OUTPUT_TYPES)
+    run.add_argument("--ontology-terms", nargs="*", default=ONTOLOGY_TERMS)
+    run.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier on the simulated remote latencies (0 disables them)",
+    )
+    run.add_argument("--jitter", type=float, default=0.1)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument(
+        "--quota",
+        type=int,
+        default=None,
+        help="Concurrent remote calls before the fake API throttles",
+    )
+    run.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of remote calls failing with UNAVAILABLE",
+    )
+    run.add_argument(
+        "--repeats", type=int, default=20, help="Repeats per stage benchmark"
+    )
+    run.add_argument("--render-workers", type=int, default=None)
+    run.add_argument(
+        "--gtf-path", default="", help="GTF feather file (default: synthetic genes)"
+    )
+    run.add_argument("--skip-endpoints", action="store_true")
+    run.add_argument("--skip-stages", action="store_true")
+    run.add_argument(
+        "-o", "--output", help="Results file (default: benchmarks/results/<time>.json)"
+    )
+    run.set_defaults(func=_run)
+
+    cmp = sub.add_parser("compare", help="Compare two results files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change counted as a regression (default 0.1 = 10%%)",
+    )
+    cmp.set_defaults(func=_compare)
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("run", "compare", "-h", "--help"):
+        argv = ["run", *argv]
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""Offline stand-in for the AlphaGenome DNA client.
+
+`FakeDnaClient` answers `predict_interval`, `predict_variant` and
+`score_variant` with synthetic outputs shaped like the hosted model's:
+per-output-type resolutions and track counts, ontology-filtered track
+subsets, 2D contact maps, splice junctions and gene-centric score AnnData.
+Each call sleeps for a configurable latency, so benchmarks measure the
+server's own overhead around a remote call of known cost. A concurrency
+quota and a transient error rate simulate a throttling backend.
+"""
+
+import copy
+import threading
+import time
+from dataclasses import dataclass, field
+
+import anndata
+import grpc
+import numpy as np
+import pandas as pd
+from alphagenome.data import genome, junction_data, track_data
+from alphagenome.models import dna_client, dna_output
+
+# Base pairs per bin
+RESOLUTIONS = {
+    "ATAC": 1,
+    "CAGE": 1,
+    "DNASE": 1,
+    "RNA_SEQ": 1,
+    "CHIP_HISTONE": 128,
+    "CHIP_TF": 128,
+    "SPLICE_SITES": 1,
+    "SPLICE_SITE_USAGE": 1,
+    "SPLICE_JUNCTIONS": 1,
+    "CONTACT_MAPS": 2048,
+    "PROCAP": 1,
+}
+
+# Approximate human track counts without an ontology filter, and per
+# requested ontology term
+TRACK_COUNTS = {
+    "ATAC": 167,
+    "CAGE": 546,
+    "DNASE": 305,
+    "RNA_SEQ": 667,
+    "CHIP_HISTONE": 1116,
+    "CHIP_TF": 1617,
+    "SPLICE_SITES": 4,
+    "SPLICE_SITE_USAGE": 734,
+    "SPLICE_JUNCTIONS": 367,
+    "CONTACT_MAPS": 28,
+    "PROCAP": 12,
+}
+TRACKS_PER_TERM = {
+    "ATAC": 1,
+    "CAGE": 2,
+    "DNASE": 1,
+    "RNA_SEQ": 6,
+    "CHIP_HISTONE": 10,
+    "CHIP_TF": 20,
+    "SPLICE_SITE_USAGE": 4,
+    "SPLICE_JUNCTIONS": 4,
+    "CONTACT_MAPS": 1,
+    "PROCAP": 2,
+}
+
+# Illustrative remote latencies (seconds): a base cost per sequence length
+# plus a cost per requested output type. Scale with LatencyModel.scale.
+BASE_LATENCY = {16384: 0.3, 131072: 0.5, 524288: 1.2, 1048576: 2.5}
+OUTPUT_LATENCY = {"CONTACT_MAPS": 0.3, "SPLICE_JUNCTIONS": 0.2}
+DEFAULT_OUTPUT_LATENCY = 0.1
+
+GENES_PER_MB = 20
+JUNCTIONS_PER_MB = 200
+
+
+@dataclass
+class LatencyModel:
+    """Simulated remote call latency per sequence length and output type."""
+
+    base: dict[int, float] = field(default_factory=lambda: dict(BASE_LATENCY))
+    per_output: dict[str, float] = field(default_factory=lambda: dict(OUTPUT_LATENCY))
+    default_output: float = DEFAULT_OUTPUT_LATENCY
+    scale: float = 1.0
+    jitter: float = 0.1  # sigma of a multiplicative lognormal noise
+    seed: int = 0
+
+    def __post_init__(self):
+        self._rng = np.random.default_rng(self.seed)
+        self._lock = threading.Lock()
+
+    def seconds(self, width: int, output_types: list[str], arms: int = 1) -> float:
+        """Latency for one call over `width` bp; `arms` = 2 for REF+ALT."""
+        if width in self.base:
+            base = self.base[width]
+        else:
+            largest = max(self.base)
+            base = self.base[largest] * width / largest
+        total = arms * (
+            base
+            + sum(self.per_output.get(ot, self.default_output) for ot in output_types)
+        )
+        with self._lock:
+            noise = self._rng.lognormal(0.0, self.jitter) if self.jitter else 1.0
+        return self.scale * total * noise
+
+
+# Named biosamples every output type has tracks for; unfiltered outputs add
+# generated UBERON terms
+BIOSAMPLES = {
+    "UBERON:0002048": ("lung", "tissue"),
+    "UBERON:0002107": ("liver", "tissue"),
+    "UBERON:0000955": ("brain", "tissue"),
+    "UBERON:0000948": ("heart", "tissue"),
+    "EFO:0002067": ("K562", "cell_line"),
+    "EFO:0001187": ("HepG2", "cell_line"),
+    "CL:0000182": ("hepatocyte", "primary_cell"),
+    "CL:0000236": ("B cell", "primary_cell"),
+}
+
+
+def _biosample(curie: str | None) -> tuple[str | None, str | None]:
+    if curie is None:
+        return None, None
+    return BIOSAMPLES.get(curie, (f"tissue {curie.rpartition(':')[2]}", "tissue"))
+
+
+def _track_metadata(output_type: str, n_tracks: int, terms: list[str]) -> pd.DataFrame:
+    strands = ["+", "-", "."] if output_type in ("RNA_SEQ", "CAGE", "PROCAP") else ["."]
+    curies = terms or list(BIOSAMPLES) + [
+        f"UBERON:{i:07d}" for i in range(max(1, n_tracks // 3 - len(BIOSAMPLES)))
+    ]
+    biosamples = [_biosample(curies[i % len(curies)]) for i in range(n_tracks)]
+    return pd.DataFrame(
+        {
+            "name": [f"{output_type} track {i}" for i in range(n_tracks)],
+            "strand": [strands[i % len(strands)] for i in range(n_tracks)],
+            "ontology_curie": [curies[i % len(curies)] for i in range(n_tracks)],
+            "biosample_name": [name for name, _ in biosamples],
+            "biosample_type": [kind for _, kind in biosamples],
+            "Assay title": [output_type.lower()] * n_tracks,
+        }
+    )
+
+
+class FakeRpcError(grpc.RpcError):
+    """gRPC error with a status code, as raised by the hosted API."""
+
+    def __init__(self, code: grpc.StatusCode, details: str):
+        super().__init__(details)
+        self._code = code
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        return self._code
+
+    def details(self) -> str:
+        return self._details
+
+
+class FakeDnaClient:
+    """Drop-in for `dna_client.DnaClient` returning synthetic predictions.
+
+    Synthetic arrays are generated once per shape and shared (read-only)
+    between calls, so generating them does not count against the server.
+
+    With `quota`, calls beyond that many in flight per API key fail at once
+    with RESOURCE_EXHAUSTED; `error_rate` fails that fraction of the remaining
+    calls with UNAVAILABLE after their latency.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyModel | None = None,
+        seed: int = 0,
+        quota: int | None = None,
+        error_rate: float = 0.0,
+    ):
+        self.latency = latency or LatencyModel()
+        self.seed = seed
+        self.quota = quota
+        self.error_rate = error_rate
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self._in_flight = 0
+        self._rng = np.random.default_rng(seed)
+        self._arrays: dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._channel = None
+
+    # -- DnaClient API --------------------------------------------------
+
+    def predict_interval(self, interval, requested_outputs, ontology_terms, **kwargs):
+        names = [o.name for o in requested_outputs]
+        self._sleep("predict_interval", interval.width, names)
+        return self._output(interval, names, ontology_terms or [], arm=0)
+
+    def predict_variant(
+        self, interval, variant, requested_outputs, ontology_terms, **kwargs
+    ):
+        names = [o.name for o in requested_outputs]
+        self._sleep("predict_variant", interval.width, names, arms=2)
+        return dna_client.VariantOutput(
+            reference=self._output(interval, names, ontology_terms or [], arm=0),
+            alternate=self._output(interval, names, ontology_terms or [], arm=1),
+        )
+
+    def score_variant(self, interval, variant, variant_scorers, **kwargs):
+        names = [s.requested_output.name for s in variant_scorers]
+        self._sleep("score_variant", interval.width, names, arms=2)
+        return [self._score(interval, variant, scorer) for scorer in variant_scorers]
+
+    def output_metadata(self, organism=None) -> dna_output.OutputMetadata:
+        self._sleep("output_metadata", 0, [])
+        metadata = {}
+        for name, n_tracks in TRACK_COUNTS.items():
+            terms = [None] if name == "SPLICE_SITES" else []
+            metadata[name.lower()] = _track_metadata(name, n_tracks, terms)
+        return dna_output.OutputMetadata(**metadata)
+
+    def for_key(self) -> "FakeDnaClient":
+        """Client for one API key: its own quota, shared data and counters."""
+        client = copy.copy(self)
+        client._in_flight = 0
+        return client
+
+    # -- synthetic data -------------------------------------------------
+
+    def _sleep(self, method: str, width: int, output_types: list[str], arms=1):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if self.quota is not None and self._in_flight >= self.quota:
+                self._fail("RESOURCE_EXHAUSTED")
+            self._in_flight += 1
+            failed = self.error_rate and self._rng.random() < self.error_rate
+        try:
+            time.sleep(self.latency.seconds(width, output_types, arms))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        if failed:
+            with self._lock:
+                self._fail("UNAVAILABLE")
+
+    def _fail(self, code: str):
+        """Count and raise a simulated gRPC error (caller holds the lock)."""
+        self.errors[code] = self.errors.get(code, 0) + 1
+        raise FakeRpcError(getattr(grpc.StatusCode, code), f"Simulated {code}")
+
+    def _array(self, shape: tuple[int, ...], arm: int) -> np.ndarray:
+        key = (shape, arm)
+        with self._lock:
+            array = self._arrays.get(key)
+        if array is None:
+            rng = np.random.default_rng((self.seed, arm, *shape))
+            # Sparse, heavy-tailed signal like coverage tracks
+            array = rng.lognormal(-3.0, 1.5, size=shape).astype(np.float32)
+            array[rng.random(shape, dtype=np.float32) < 0.6] = 0.0
+            array.flags.writeable = False
+            with self._lock:
+                array = self._arrays.setdefault(key, array)
+        return array
+
+    def _n_tracks(self, output_type: str, terms: list[str]) -> int:
+        if not terms or output_type == "SPLICE_SITES":
+            return TRACK_COUNTS[output_type]  # splice sites are not per-biosample
+        return TRACKS_PER_TERM[output_type] * len(terms)
+
+    def _output(self, interval, output_types, terms, arm: int) -> dna_client.Output:
+        return dna_client.Output(
+            **{ot.lower(): self._track(interval, ot, terms, arm) for ot in output_types}
+        )
+
+    def _track(self, interval, output_type: str, terms: list[str], arm: int):
+        n_tracks = self._n_tracks(output_type, terms)
+        metadata = _track_metadata(output_type, n_tracks, terms)
+        if output_type == "SPLICE_JUNCTIONS":
+            n = max(1, interval.width * JUNCTIONS_PER_MB // 1_000_000)
+            starts = interval.start + np.linspace(0, interval.width - 200, n).astype(
+                int
+            )
+            junctions = np.array(
+                [
+                    genome.Interval(
+                        interval.chromosome, int(s), int(s) + 150, "+" if i % 2 else "-"
+                    )
+                    for i, s in enumerate(starts)
+                ]
+            )
+            return junction_data.JunctionData(
+                junctions=junctions,
+                values=self._array((n, n_tracks), arm),
+                metadata=metadata,
+                interval=interval,
+            )
+
+        bins = interval.width // RESOLUTIONS[output_type]
+        shape = (
+            (bins, bins, n_tracks)
+            if output_type == "CONTACT_MAPS"
+            else (bins, n_tracks)
+        )
+        return track_data.TrackData(
+            values=self._array(shape, arm),
+            metadata=metadata,
+            resolution=RESOLUTIONS[output_type],
+            interval=interval,
+        )
+
+    def _score(self, interval, variant, scorer) -> anndata.AnnData:
+        output_type = scorer.requested_output.name
+        n_tracks = TRACK_COUNTS[output_type]
+        var = _track_metadata(output_type, n_tracks, [])
+        var.index = var.index.astype(str)
+        if "Gene" in type(scorer).__name__ or "Junction" in type(scorer).__name__:
+            n_genes = max(1, interval.width * GENES_PER_MB // 1_000_000)
+            obs = pd.DataFrame(
+                {
+                    "gene_id": [f"ENSG{i:011d}.1" for i in range(n_genes)],
+                    "gene_name": [f"GENE{i}" for i in range(n_genes)],
+                    "gene_type": ["protein_coding"] * n_genes,
+                    "strand": ["+" if i % 2 else "-" for i in range(n_genes)],
+                },
+                index=[str(i) for i in range(n_genes)],
+            )
+        else:
+            n_genes, obs = 1, pd.DataFrame(index=["0"])
+
+        rng = np.random.default_rng((self.seed, variant.position, n_genes, n_tracks))
+        raw = rng.normal(0.0, 0.5, size=(n_genes, n_tracks)).astype(np.float32)
+        return anndata.AnnData(
+            X=raw,
+            obs=obs,
+            var=var,
+            layers={"quantiles": np.tanh(raw).astype(np.float32)},
+            uns={
+                "interval": interval,
+                "variant": variant,
+                "variant_scorer": scorer,
+            },
+        )
+
+
+def install(client: FakeDnaClient) -> None:
+    """Route every `dna_client.create` call to `client`.
+
+    Every API key gets its own `client.for_key()`. Pooled clients are never
+    health-checked, since the fake has no channel.
+    """
+    from app.services.client_pool import client_pool
+
+    clients: dict[str, FakeDnaClient] = {}
+    lock = threading.Lock()
+
+    def create(api_key, *args, **kwargs):
+        with lock:
+            if api_key not in clients:
+                clients[api_key] = client.for_key()
+            return clients[api_key]
+
+    dna_client.create = create
+    client_pool.health_check_interval = float("inf")
+
+
+def synthetic_gtf(n_genes: int = 2000, chromosomes=("chr1", "chr2", "chr19", "chr22")):
+    """GENCODE-like gene/transcript/exon table for an offline annotation cache."""
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(n_genes):
+        chromosome = chromosomes[i % len(chromosomes)]
+        start = int(rng.integers(1_000_000, 60_000_000))
+        length = int(rng.integers(2_000, 80_000))
+        base = {
+            "Chromosome": chromosome,
+            "Source": "HAVANA",
+            "Score": np.nan,
+            "Strand": "+" if i % 2 else "-",
+            "Frame": np.nan,
+            "gene_id": f"ENSG{i:011d}.1",
+            "gene_name": f"GENE{i}",
+            "gene_type": "protein_coding",
+            "transcript_id": f"ENST{i:011d}.1",
+            "transcript_type": "protein_coding",
+            "tag": "basic,MANE_Select,Ensembl_canonical",
+        }
+        rows.append(
+            dict(
+                base,
+                Feature="gene",
+                Start=start,
+                End=start + length,
+                transcript_id=None,
+                transcript_type=None,
+                tag=None,
+            )
+        )
+        rows.append(dict(base, Feature="transcript", Start=start, End=start + length))
+        edges = np.linspace(start, start + length, 6).astype(int)
+        for j in range(5):
+            end = int(edges[j]) + 300 if j < 4 else start + length
+            rows.append(
+                dict(
+                    base,
+                    Feature="exon",
+                    Start=int(edges[j]),
+                    End=end,
+                    exon_number=j + 1,
+                )
+            )
+    return pd.DataFrame(rows)
@@ -0,0 +1,446 @@
+"""End-to-end and per-stage benchmarks against the fake AlphaGenome client.
+
+Import this module only after the environment is configured (see
+`benchmarks.__main__`): app.config reads PLOTS_DIR, GTF_PATH and friends
+at import time.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+from alphagenome.data import genome
+
+from app.main import app
+from app.services.metrics import STAGE_SECONDS
+
+from benchmarks.fake_client import FakeDnaClient
+
+SCHEMA_VERSION = 1
+
+ENDPOINTS = {
+    "interval": "/api/predict/interval",
+    "variant": "/api/predict/variant",
+    "score": "/api/score/variant",
+}
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    """Mean and percentiles in milliseconds."""
+    if not seconds:
+        return {"mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+    ms = np.asarray(seconds) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+class Payloads:
+    """Request bodies for each endpoint.
+
+    In "cold" mode every request targets a new locus, so each one pays for
+    a (fake) remote call, stats and rendering. In "warm" mode requests cycle
+    over a few loci and are served from the prediction and plot caches.
+    """
+
+    def __init__(self, mode: str, width: int, output_types, ontology_terms):
+        self.mode = mode
+        self.width = width
+        self.output_types = list(output_types)
+        self.ontology_terms = list(ontology_terms)
+        self._counter = itertools.count()
+
+    def _locus(self) -> tuple[str, int]:
+        i = next(self._counter)
+        if self.mode == "warm":
+            i %= 4
+        chromosome = ("chr1", "chr2", "chr19", "chr22")[i % 4]
+        return chromosome, 2_000_000 + (i // 4) * 1_100_000
+
+    def interval(self) -> dict:
+        chromosome, start = self._locus()
+        return {
+            "chromosome": chromosome,
+            "start": start,
+            "end": start + self.width,
+            "output_types": self.output_types,
+            "ontology_terms": self.ontology_terms,
+        }
+
+    def variant(self) -> dict:
+        chromosome, position = self._locus()
+        return {
+            "chromosome": chromosome,
+            "position": position,
+            "ref": "A",
+            "alt": "C",
+            "output_types": self.output_types,
+            "ontology_terms": self.ontology_terms,
+        }
+
+    def score(self) -> dict:
+        chromosome, position = self._locus()
+        return {
+            "chromosome": chromosome,
+            "position": position,
+            "ref": "A",
+            "alt": "G",
+            "output_types": self.output_types,
+        }
+
+
+def _stage_totals(endpoint: str) -> dict[str, tuple[float, int]]:
+    totals: dict[str, tuple[float, int]] = {}
+    for (stage, stage_endpoint, output_type), (
+        total,
+        count,
+    ) in STAGE_SECONDS.totals().items():
+        if stage_endpoint != endpoint:
+            continue
+        name = f"{stage}[{output_type}]" if output_type else stage
+        previous = totals.get(name, (0.0, 0))
+        totals[name] = (previous[0] + total, previous[1] + count)
+    return totals
+
+
+async def bench_endpoint(
+    client: httpx.AsyncClient,
+    name: str,
+    payloads: Payloads,
+    concurrency: int,
+    n_requests: int,
+) -> dict:
+    """Fire `n_requests` at one endpoint from `concurrency` workers."""
+    path = ENDPOINTS[name]
+    make_payload = getattr(payloads, name)
+    latencies, statuses = [], {}
+    remaining = itertools.count()
+    before = _stage_totals(path)
+
+    async def worker(index: int):
+        # One API key per worker, so the per-key limiter does not cap load
+        headers = {"X-API-Key": f"bench-{index}"}
+        while next(remaining) < n_requests:
+            payload = make_payload()
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload, headers=headers)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    after = _stage_totals(path)
+    stages_ms = {
+        stage: round(
+            (total - before.get(stage, (0.0, 0))[0]) * 1000.0 / max(len(latencies), 1),
+            3,
+        )
+        for stage, (total, count) in sorted(after.items())
+        if count > before.get(stage, (0.0, 0))[1]
+    }
+    return {
+        "endpoint": name,
+        "path": path,
+        "mode": payloads.mode,
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "latency_ms": latency_summary(latencies),
+        # Mean time per successful request spent in each server stage
+        "stages_ms": stages_ms,
+    }
+
+
+async def run_endpoints(
+    endpoints: list[str],
+    modes: list[str],
+    concurrency_levels: list[int],
+    n_requests: int,
+    width: int,
+    output_types: list[str],
+    ontology_terms: list[str],
+    progress=print,
+) -> list[dict]:
+    """Benchmark every endpoint, cache mode and concurrency level in-process."""
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=600
+        ) as client:
+            for mode in modes:
+                payloads = Payloads(mode, width, output_types, ontology_terms)
+                if mode == "warm":
+                    # Fill the caches before measuring
+                    for name in endpoints:
+                        await bench_endpoint(client, name, payloads, 4, 4)
+                for name in endpoints:
+                    for concurrency in concurrency_levels:
+                        result = await bench_endpoint(
+                            client, name, payloads, concurrency, n_requests
+                        )
+                        progress(_describe(result))
+                        results.append(result)
+    return results
+
+
+def _describe(result: dict) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{result['endpoint']:>8} {result['mode']:>4} c={result['concurrency']:<3} "
+        f"{result['throughput_rps']:>8.2f} req/s  p50={latency['p50']}ms  "
+        f"p99={latency['p99']}ms  statuses={result['statuses']}"
+    )
+
+
+def _repeat(fn, repeats: int) -> dict:
+    fn()  # warm-up
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return {"repeats": repeats, "ms": latency_summary(seconds)}
+
+
+def run_stages(repeats: int, fake: FakeDnaClient, progress=print) -> list[dict]:
+    """Benchmark stats, rendering, serialization and export without HTTP."""
+    from alphagenome.models import dna_client
+
+    from app.routers.predictions import _track_infos
+    from app.routers.variants import _track_effects
+    from alphagenome.models import variant_scorers
+
+    from app.services.alphagenome import AlphaGenomeService, get_sequence_length_name
+    from app.services.contact_maps import ContactMapTiles
+    from app.services.scores import score_records
+    from app.services.serialization import model_response
+    from app.services.track_export import encode_arrow, select_tracks, track_header
+    from app.services.visualization import generate_interval_plot
+
+    service = AlphaGenomeService("bench-stages")
+    results = []
+
+    def add(stage: str, case: str, fn, n: int = repeats):
+        result = {"stage": stage, "case": case, **_repeat(fn, n)}
+        progress(f"{stage:>10} {case:<28} p50={result['ms']['p50']}ms")
+        results.append(result)
+
+    def predict(ot: str, width: int, terms: list[str]):
+        interval = genome.Interval("chr1", 2_000_000, 2_000_000 + width)
+        output = fake._output(interval, [ot], terms, arm=0)
+        return getattr(output, ot.lower()), interval
+
+    cases = [
+        ("RNA_SEQ", 131072, ["UBERON:0002048"]),
+        ("RNA_SEQ", 1048576, ["UBERON:0002048"]),
+        ("CHIP_TF", 1048576, []),
+        ("CONTACT_MAPS", 1048576, []),
+    ]
+    for ot, width, terms in cases:
+        tdata, interval = predict(ot, width, terms)
+        hits = service.transcript_hits(interval)
+        case = f"{ot} {width // 1024}KB x{tdata.values.shape[-1]}"
+        add("stats", case, lambda: _track_infos(tdata, ot, hits))
+
+    # REF/ALT effects over a variant's 16KB window, all tracks ranked
+    for ot in ("RNA_SEQ", "CHIP_TF"):
+        interval = genome.Interval("chr1", 2_000_000, 2_016_384)
+        ref = fake._track(interval, ot, [], arm=0)
+        alt = fake._track(interval, ot, [], arm=1)
+        hits = service.transcript_hits(interval)
+        add(
+            "effects",
+            f"{ot} 16KB x{ref.values.shape[-1]}",
+            lambda: _track_effects(
+                ref, alt, ot, "C", hits, 2_008_192, "max_abs_diff", 20
+            ),
+        )
+
+    tdata, _ = predict("CONTACT_MAPS", 1048576, [])
+    add(
+        "tiles",
+        f"CONTACT_MAPS 1024KB x{tdata.values.shape[-1]}",
+        lambda: ContactMapTiles.build(tdata),
+    )
+
+    # Rendering runs in-process here: this is the per-plot cost a renderer
+    # process pays, without pool queueing
+    for ot, width, terms in (
+        ("RNA_SEQ", 131072, ["UBERON:0002048"]),
+        ("RNA_SEQ", 1048576, ["UBERON:0002048"]),
+        ("CONTACT_MAPS", 1048576, []),
+    ):
+        tdata, interval = predict(ot, width, terms)
+        transcripts = service.transcript_index.extract(interval)
+        output = dna_client.Output(**{ot.lower(): tdata})
+        add(
+            "render",
+            f"{ot} {width // 1024}KB",
+            lambda: generate_interval_plot(
+                output, interval, transcripts, ot, "bench-render.png"
+            ),
+            max(3, repeats // 5),
+        )
+
+    tdata, interval = predict("CHIP_TF", 1048576, [])
+    hits = service.transcript_hits(interval)
+    tracks = _track_infos(tdata, "CHIP_TF", hits)
+    interval_response = {
+        "plot_urls": ["/plots/bench.png"],
+        "interval": {
+            "chromosome": interval.chromosome,
+            "start": interval.start,
+            "end": interval.end,
+            "width": interval.width,
+            "sequence_length": get_sequence_length_name(interval.width),
+        },
+        "tracks": tracks,
+        "transcripts": [
+            {"gene_name": name, "gene_id": gene_id, "strand": strand}
+            for name, gene_id, strand in zip(
+                hits.gene_name.tolist(), hits.gene_id.tolist(), hits.strand.tolist()
+            )
+        ],
+    }
+    add(
+        "serialize",
+        f"interval x{len(tracks)} tracks",
+        lambda: model_response(interval_response),
+    )
+
+    variant = genome.Variant("chr1", 2_500_000, "A", "C")
+    score_interval = variant.reference_interval.resize(1048576)
+    scores = [
+        fake._score(
+            score_interval, variant, variant_scorers.RECOMMENDED_VARIANT_SCORERS[ot]
+        )
+        for ot in ("RNA_SEQ", "DNASE")
+    ]
+    tidy = variant_scorers.tidy_scores(scores, match_gene_strand=True)
+    add("tidy", f"RNA_SEQ+DNASE {len(tidy)} rows", lambda: score_records(tidy))
+    records = score_records(tidy)
+    page = records[:1000]
+    score_response = {
+        "variant": {
+            "chromosome": variant.chromosome,
+            "position": variant.position,
+            "ref": variant.reference_bases,
+            "alt": variant.alternate_bases,
+        },
+        "scores": page,
+        "pagination": {"total": len(records), "page": 1, "page_size": len(page)},
+    }
+    add("serialize", f"scores x{len(page)}", lambda: model_response(score_response))
+
+    tdata, interval = predict("RNA_SEQ", 1048576, ["UBERON:0002048"])
+    indices = select_tracks(tdata.metadata, None)
+    header = track_header(tdata, indices, len(tdata.values), 1, "float32")
+    add("export", "arrow RNA_SEQ 1MB", lambda: encode_arrow(header, tdata.values))
+
+    return results
+
+
+def metadata(args: dict) -> dict:
+    """Environment details stored next to the results."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "schema": SCHEMA_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": app.version,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "args": args,
+    }
+
+
+def save(results: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[str], bool]:
+    """Report per-benchmark changes; True if anything regressed past `threshold`.
+
+    Endpoints regress when p50/p99 latency grows or throughput drops by more
+    than `threshold` (a fraction); stages when their p50 grows.
+    """
+    lines, regressed = [], False
+
+    def change(old, new):
+        if old in (None, 0) or new is None:
+            return None
+        return (new - old) / old
+
+    def row(label, metric, old, new, higher_is_better=False):
+        nonlocal regressed
+        delta = change(old, new)
+        flag = ""
+        if delta is not None:
+            worse = -delta if higher_is_better else delta
+            if worse > threshold:
+                flag, regressed = "  REGRESSION", True
+            delta_text = f"{delta:+.1%}"
+        else:
+            delta_text = "n/a"
+        lines.append(
+            f"{label:<40} {metric:<14} {old!s:>10} -> {new!s:>10} {delta_text:>8}{flag}"
+        )
+
+    old_endpoints = {
+        (r["endpoint"], r["mode"], r["concurrency"]): r for r in baseline["endpoints"]
+    }
+    for r in current["endpoints"]:
+        key = (r["endpoint"], r["mode"], r["concurrency"])
+        old = old_endpoints.get(key)
+        if old is None:
+            continue
+        label = f"{r['endpoint']} {r['mode']} c={r['concurrency']}"
+        row(label, "throughput", old["throughput_rps"], r["throughput_rps"], True)
+        row(label, "p50 ms", old["latency_ms"]["p50"], r["latency_ms"]["p50"])
+        row(label, "p99 ms", old["latency_ms"]["p99"], r["latency_ms"]["p99"])
+
+    old_stages = {(r["stage"], r["case"]): r for r in baseline["stages"]}
+    for r in current["stages"]:
+        old = old_stages.get((r["stage"], r["case"]))
+        if old is None:
+            continue
+        row(f"{r['stage']} {r['case']}", "p50 ms", old["ms"]["p50"], r["ms"]["p50"])
+    return lines, regressed
@@ -0,0 +1,17 @@
+"""Shared fixtures: the benchmarks' fake AlphaGenome client and synthetic GTF."""
+
+import pytest
+
+from benchmarks.fake_client import FakeDnaClient, LatencyModel, synthetic_gtf
+
+
+@pytest.fixture(scope="session")
+def fake() -> FakeDnaClient:
+    """Fake client without simulated latency, for synthetic predictions."""
+    return FakeDnaClient(LatencyModel(scale=0))
+
+
+@pytest.fixture(scope="session")
+def gtf():
+    """Synthetic GENCODE-like table, dense enough for overlapping transcripts."""
+    return synthetic_gtf(n_genes=400, chromosomes=("chr1", "chr22"))
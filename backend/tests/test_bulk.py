@@ -0,0 +1,116 @@
+"""BED parsing, greedy window planning and per-region slicing."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.config import SEQUENCE_LENGTHS
+from app.services.batch import ParseError
+from app.services.bulk import BedRegion, parse_bed, plan_windows, region_rows
+
+MAX_WIDTH = max(SEQUENCE_LENGTHS)
+
+
+def _regions(spans, chromosome="chr1") -> list[BedRegion]:
+    return [
+        BedRegion(i, chromosome, start, end, f"r{i}")
+        for i, (start, end) in enumerate(spans)
+    ]
+
+
+def _random_regions(seed: int, n: int = 500) -> list[BedRegion]:
+    rng = np.random.default_rng(seed)
+    regions = []
+    for i in range(n):
+        chromosome = str(rng.choice(["chr1", "chr2", "chrX"]))
+        start = int(rng.integers(0, 20_000_000))
+        width = int(rng.choice([1, 500, 20_000, 300_000, MAX_WIDTH]))
+        regions.append(BedRegion(i, chromosome, start, start + width, f"r{i}"))
+    return regions
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_every_region_lands_in_one_containing_window(seed):
+    regions = _random_regions(seed)
+    windows = plan_windows(regions)
+
+    placed = sorted(r.index for w in windows for r in w.regions)
+    assert placed == list(range(len(regions)))
+    for window in windows:
+        interval = window.interval
+        assert interval.width in SEQUENCE_LENGTHS
+        for region in window.regions:
+            assert region.chromosome == interval.chromosome
+            assert interval.start <= region.start and region.end <= interval.end
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_window_count_is_minimal(seed):
+    # The leftmost region of each window cannot share any window with the
+    # leftmost region of another, so no plan can use fewer windows
+    windows = plan_windows(_random_regions(seed))
+    anchors = [min(w.regions, key=lambda r: (r.start, r.end)) for w in windows]
+    for a, b in itertools.combinations(anchors, 2):
+        if a.chromosome == b.chromosome:
+            assert max(a.end, b.end) - min(a.start, b.start) > MAX_WIDTH
+
+
+def test_nearby_regions_share_the_smallest_window():
+    windows = plan_windows(_regions([(10_000, 10_100), (12_000, 12_500)]))
+    assert len(windows) == 1
+    assert windows[0].interval.width == 16_384
+    # Centered on the regions' span, like a single-interval request
+    assert windows[0].interval.center() == (10_000 + 12_500) // 2
+
+
+def test_regions_too_far_apart_get_their_own_windows():
+    spans = [(0, 100), (MAX_WIDTH - 100, MAX_WIDTH), (MAX_WIDTH, MAX_WIDTH + 1)]
+    windows = plan_windows(_regions(spans))
+    assert [[r.name for r in w.regions] for w in windows] == [["r0", "r1"], ["r2"]]
+    assert [w.interval.width for w in windows] == [MAX_WIDTH, 16_384]
+
+
+def test_chromosomes_are_planned_separately():
+    regions = _regions([(1000, 2000)]) + _regions([(1000, 2000)], "chr2")
+    windows = plan_windows(regions)
+    assert [w.interval.chromosome for w in windows] == ["chr1", "chr2"]
+
+
+def test_parse_bed_normalizes_and_reports_bad_lines():
+    lines = [
+        "track name=peaks",
+        "# comment",
+        "chr1\t100\t200\tpeak1",
+        "2 300 400",
+        "chr1\t500\t500",
+        "chrZ\t1\t2",
+        "chr1\t5",
+    ]
+    parsed = list(parse_bed(lines))
+    regions = [p for p in parsed if isinstance(p, BedRegion)]
+    errors = [p for p in parsed if isinstance(p, ParseError)]
+    assert regions == [
+        BedRegion(0, "chr1", 100, 200, "peak1"),
+        BedRegion(1, "chr2", 300, 400, "chr2:300-400"),
+    ]
+    assert [e.line_number for e in errors] == [5, 6, 7]
+
+
+def test_region_rows_slice_each_region_out_of_its_window(fake):
+    regions = _regions([(2_000_000, 2_000_300), (2_010_000, 2_050_000)])
+    (window,) = plan_windows(regions)
+    track = fake._track(window.interval, "CHIP_TF", ["UBERON:0002107"], arm=0)
+    values = np.asarray(track.values)
+
+    rows = region_rows(window, track, "CHIP_TF", width=8)
+    assert [row["name"] for row in rows] == ["r0", "r1"]
+    for row, region in zip(rows, regions):
+        lo = (region.start - window.interval.start) // track.resolution
+        hi = -(-(region.end - window.interval.start) // track.resolution)
+        expected = values[lo:hi]
+        assert len(row["tracks"]) == values.shape[1]
+        assert [t["max"] for t in row["tracks"]] == pytest.approx(
+            expected.max(axis=0).tolist()
+        )
+        assert all(len(t["values"]) <= 8 for t in row["tracks"])
@@ -0,0 +1,181 @@
+"""PredictionCache byte accounting, LRU eviction and single-flight loading."""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+from alphagenome.data import genome
+
+from app.services.prediction_cache import PredictionCache, estimate_nbytes
+
+
+def _value(nbytes: int) -> np.ndarray:
+    return np.zeros(nbytes, dtype=np.uint8)
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_estimate_counts_values_and_metadata(fake):
+    interval = genome.Interval("chr1", 2_000_000, 2_016_384)
+    track = fake._track(interval, "DNASE", ["UBERON:0002107"], arm=0)
+    metadata = int(track.metadata.memory_usage(index=True, deep=True).sum())
+    assert estimate_nbytes(track) == track.values.nbytes + metadata
+    assert estimate_nbytes((track, track)) == 2 * estimate_nbytes(track)
+
+
+def test_bytes_follow_inserts_replacements_and_clear():
+    cache = PredictionCache(max_bytes=1000)
+    cache.put("a", _value(300))
+    cache.put("b", _value(200))
+    assert cache.stats()["bytes"] == 500
+    cache.put("a", _value(100))  # replacing releases the old size
+    assert cache.stats()["bytes"] == 300
+    cache.clear()
+    stats = cache.stats()
+    assert stats["bytes"] == 0 and stats["entries"] == 0
+
+
+def test_evicts_least_recently_used_until_within_budget():
+    cache = PredictionCache(max_bytes=1000)
+    for key in "abc":
+        cache.put(key, _value(300))
+    cache.get("a")  # b is now the least recently used
+    cache.put("d", _value(400))  # 1300 bytes: dropping b alone is enough
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 1000
+    cache.put("e", _value(500))  # c, then a, are the oldest now
+    assert cache.get("c") is None and cache.get("a") is None
+    assert cache.get("d") is not None and cache.get("e") is not None
+    stats = cache.stats()
+    assert stats["bytes"] == 900 and stats["evictions"] == 3
+
+
+def test_value_over_budget_is_not_kept():
+    cache = PredictionCache(max_bytes=1000)
+    cache.put("a", _value(300))
+    cache.put("big", _value(1001))
+    assert cache.get("big") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["bytes"] == 300
+
+
+def test_fetches_only_missing_keys():
+    cache = PredictionCache(max_bytes=1000)
+    cache.put("a", _value(10))
+    calls = []
+
+    def fetch(keys):
+        calls.append(keys)
+        return {key: _value(20) for key in keys}
+
+    results = cache.get_or_fetch(["a", "b", "b"], fetch)
+    assert calls == [["b"]]
+    assert set(results) == {"a", "b"}
+    assert cache.stats()["bytes"] == 30
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = PredictionCache(max_bytes=1000)
+    release = threading.Event()
+    calls = []
+
+    def fetch(keys):
+        calls.append(keys)
+        release.wait(5)
+        return {key: _value(10) for key in keys}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_fetch(["a"], fetch))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.stats()["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [["a"]]
+    assert len(results) == 4
+    assert all(r["a"] is results[0]["a"] for r in results)
+
+
+def test_async_callers_coalesce_with_threads():
+    cache = PredictionCache(max_bytes=1000)
+    release = threading.Event()
+
+    def fetch(keys):
+        release.wait(5)
+        return {key: _value(10) for key in keys}
+
+    owner = threading.Thread(target=cache.get_or_fetch, args=(["a"], fetch))
+    owner.start()
+    _wait_for(lambda: cache.stats()["misses"] == 1)
+
+    async def never(keys):
+        raise AssertionError("coalesced key was fetched again")
+
+    async def wait():
+        task = asyncio.ensure_future(cache.aget_or_fetch(["a"], never))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await task
+
+    assert asyncio.run(wait())["a"] is cache.get("a")
+    owner.join(5)
+
+
+def test_failed_fetch_reaches_waiters_and_is_not_cached():
+    cache = PredictionCache(max_bytes=1000)
+    release = threading.Event()
+
+    def fetch(keys):
+        release.wait(5)
+        raise RuntimeError("remote failed")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_fetch(["a"], fetch)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    # Nothing is left loading: the next caller fetches again
+    assert cache.get_or_fetch(["a"], lambda keys: {"a": _value(1)})["a"].size == 1
+
+
+def test_keys_missing_from_fetch_fail_but_others_are_cached():
+    cache = PredictionCache(max_bytes=1000)
+    with pytest.raises(LookupError):
+        cache.get_or_fetch(["a", "b"], lambda keys: {"a": _value(10)})
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get_or_fetch(["b"], lambda keys: {"b": _value(5)})["b"].size == 5
+
+
+def test_setdefault_keeps_cached_value():
+    cache = PredictionCache(max_bytes=1000)
+    first = _value(10)
+    assert cache.setdefault("a", first) is first
+    assert cache.setdefault("a", _value(20)) is first
+    assert cache.stats()["bytes"] == 10
@@ -0,0 +1,135 @@
+"""TrackPyramid region queries against direct reductions of the base matrix."""
+
+import numpy as np
+import pytest
+from alphagenome.data import genome, track_data
+
+from app.services.pyramid import TrackPyramid, summary_levels
+
+START = 2_000_000
+
+
+@pytest.fixture(scope="module")
+def dnase(fake):
+    """1bp-resolution tracks over 128KB."""
+    interval = genome.Interval("chr1", START, START + 131_072)
+    return fake._track(interval, "DNASE", ["UBERON:0002107"], arm=0)
+
+
+@pytest.fixture(scope="module")
+def chip(fake):
+    """128bp-resolution tracks over 1MB."""
+    interval = genome.Interval("chr1", START, START + 1_048_576)
+    return fake._track(interval, "CHIP_TF", ["UBERON:0002107"], arm=0)
+
+
+def _with_values(track, values):
+    return track_data.TrackData(
+        values=values,
+        metadata=track.metadata,
+        resolution=track.resolution,
+        interval=track.interval,
+    )
+
+
+def _check_envelope(summary, values, lo, hi):
+    """Every column lies within the base bins [lo, hi) it was read from."""
+    assert np.all(summary.min <= summary.mean + 1e-6)
+    assert np.all(summary.mean <= summary.max + 1e-6)
+    np.testing.assert_allclose(summary.min.min(axis=0), values[lo:hi].min(axis=0))
+    np.testing.assert_allclose(summary.max.max(axis=0), values[lo:hi].max(axis=0))
+
+
+def test_level_bin_sizes_double_down_to_one_bin(dnase):
+    levels = summary_levels(dnase, min_factor=4)
+    assert [level.bin_size for level in levels][:3] == [4, 8, 16]
+    assert len(levels[-1].min) == 1
+    assert all(len(level.min) == -(-131_072 // level.bin_size) for level in levels)
+
+
+@pytest.mark.parametrize("pixels", [1, 16, 60])
+def test_aligned_query_matches_reduction(dnase, pixels):
+    # Pixels of 2048bp map onto whole bins of the 2048bp level
+    values = np.asarray(dnase.values)
+    pyramid = TrackPyramid.build(dnase)
+    offset = 4096
+    summary = pyramid.query(START + offset, START + offset + pixels * 2048, pixels)
+
+    assert summary.level_bin_size == 2048
+    blocks = values[offset : offset + pixels * 2048].reshape(pixels, 2048, -1)
+    np.testing.assert_allclose(summary.min, blocks.min(axis=1))
+    np.testing.assert_allclose(summary.max, blocks.max(axis=1))
+    np.testing.assert_allclose(summary.mean, blocks.mean(axis=1), rtol=1e-4)
+
+
+def test_unaligned_query_stays_within_region(chip):
+    values = np.asarray(chip.values)
+    pyramid = TrackPyramid.build(chip)
+    start, end, width = START + 100_000, START + 900_001, 700
+    summary = pyramid.query(start, end, width)
+
+    assert summary.min.shape == (width, values.shape[1])
+    assert summary.start == start and summary.end == end
+    assert chip.resolution < summary.level_bin_size <= summary.bin_size
+    # Columns read whole level bins, which may reach just past the region
+    step = summary.level_bin_size // chip.resolution
+    lo = (start - START) // chip.resolution // step * step
+    hi = -(-(end - START) // summary.level_bin_size) * step
+    _check_envelope(summary, values, lo, hi)
+
+
+def test_narrow_query_returns_base_bins(chip):
+    values = np.asarray(chip.values)
+    pyramid = TrackPyramid.build(chip)
+    summary = pyramid.query(START + 1000, START + 3000, 100)
+
+    assert summary.level_bin_size == chip.resolution
+    assert (summary.start, summary.end) == (START + 896, START + 3072)
+    np.testing.assert_array_equal(summary.min, values[7:24])
+    assert summary.min is summary.max is summary.mean
+
+
+def test_query_clamps_to_prediction_and_rejects_outside(chip):
+    pyramid = TrackPyramid.build(chip)
+    summary = pyramid.query(START - 500_000, START + 2_000_000, 256)
+    assert (summary.start, summary.end) == (START, START + 1_048_576)
+    with pytest.raises(ValueError):
+        pyramid.query(START + 2_000_000, START + 3_000_000, 256)
+
+
+def test_track_selection(chip):
+    pyramid = TrackPyramid.build(chip)
+    tracks = np.array([5, 0, 3])
+    full = pyramid.query(START, START + 1_048_576, 300)
+    chosen = pyramid.query(START, START + 1_048_576, 300, tracks=tracks)
+    for stat in ("min", "max", "mean"):
+        np.testing.assert_allclose(
+            getattr(chosen, stat), getattr(full, stat)[:, tracks]
+        )
+
+
+def test_nan_bins_are_ignored(chip):
+    # 2048bp pixels of 16 bins each
+    values = np.array(chip.values)
+    values[:24, 0] = np.nan  # the first pixel and half of the second
+    values[:, 1] = np.nan  # a track without data
+    pyramid = TrackPyramid.build(_with_values(chip, values))
+    summary = pyramid.query(START, START + 16 * 2048, 16)
+
+    assert np.isnan(summary.min[0, 0]) and np.isnan(summary.mean[0, 0])
+    assert summary.min[1, 0] == values[24:32, 0].min()
+    assert summary.max[1, 0] == values[24:32, 0].max()
+    np.testing.assert_allclose(summary.mean[1, 0], values[24:32, 0].mean(), rtol=1e-5)
+    assert np.all(np.isnan(summary.mean[:, 1]))
+    assert not np.isnan(summary.mean[:, 2:]).any()
+
+
+def test_from_summaries_matches_build(chip):
+    built = TrackPyramid.build(chip)
+    restored = TrackPyramid.from_summaries(chip, summary_levels(chip))
+    assert restored.levels[0].min is np.asarray(chip.values)
+    for args in ((START, START + 1_048_576, 300), (START + 5000, START + 9000, 10)):
+        a, b = built.query(*args), restored.query(*args)
+        np.testing.assert_array_equal(a.min, b.min)
+        np.testing.assert_array_equal(a.max, b.max)
+        np.testing.assert_array_equal(a.mean, b.mean)
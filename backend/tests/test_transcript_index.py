@@ -0,0 +1,109 @@
+"""TranscriptIndex must find exactly the transcripts TranscriptExtractor does."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from alphagenome.data import genome
+from alphagenome.data import transcript as transcript_utils
+
+from app.services.transcript_index import TranscriptIndex
+
+
+@pytest.fixture(scope="module")
+def index(gtf) -> TranscriptIndex:
+    return TranscriptIndex(gtf)
+
+
+@pytest.fixture(scope="module")
+def extractor(gtf) -> transcript_utils.TranscriptExtractor:
+    return transcript_utils.TranscriptExtractor(gtf)
+
+
+def _gtf(spans: list[tuple[int, int]]):
+    """Minimal GTF with one single-exon transcript per (start, end) span."""
+    rows = []
+    for i, (start, end) in enumerate(spans):
+        base = {
+            "Chromosome": "chr1",
+            "Start": start,
+            "End": end,
+            "Strand": "+",
+            "gene_id": f"ENSG{i}",
+            "gene_name": f"GENE{i}",
+            "transcript_id": f"ENST{i}",
+            "transcript_type": "protein_coding",
+        }
+        rows.append(dict(base, Feature="transcript"))
+        rows.append(dict(base, Feature="exon", exon_number=1))
+    return pd.DataFrame(rows)
+
+
+def _expected(extractor, interval) -> list[str]:
+    return sorted(t.transcript_id for t in extractor.extract(interval))
+
+
+def _found(index, interval) -> list[str]:
+    idx = index.query(interval.chromosome, interval.start, interval.end)
+    return sorted(index.transcript_id[idx])
+
+
+def test_random_intervals_match_extractor(index, extractor):
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        chromosome = str(rng.choice(["chr1", "chr22"]))
+        start = int(rng.integers(0, 62_000_000))
+        width = int(rng.choice([1, 16_384, 131_072, 1_048_576, 5_000_000]))
+        interval = genome.Interval(chromosome, start, start + width)
+        assert _found(index, interval) == _expected(extractor, interval)
+
+
+def test_boundaries_match_extractor(index, extractor, gtf):
+    # Both ends of a transcript are inclusive: touching it counts as overlap
+    transcripts = gtf[gtf.Feature == "transcript"].head(50)
+    for row in transcripts.itertuples():
+        start, end = int(row.Start), int(row.End)
+        for lo, hi in [
+            (end, end + 10),
+            (end + 1, end + 10),
+            (start - 10, start),
+            (start - 10, start - 1),
+            (start + 1, end - 1),
+        ]:
+            interval = genome.Interval(row.Chromosome, lo, hi)
+            assert _found(index, interval) == _expected(extractor, interval)
+
+
+def test_nested_transcripts_found_past_long_one():
+    # A long transcript followed by short ones it contains: the running
+    # maximum of ends must keep the long one a candidate for later queries
+    gtf = _gtf([(100, 10_000), (200, 300), (5_000, 5_100)])
+    index = TranscriptIndex(gtf)
+    extractor = transcript_utils.TranscriptExtractor(gtf)
+    for lo, hi in [(400, 500), (5_050, 5_060), (9_999, 20_000), (10_001, 20_000)]:
+        interval = genome.Interval("chr1", lo, hi)
+        assert _found(index, interval) == _expected(extractor, interval)
+    assert _found(index, genome.Interval("chr1", 400, 500)) == ["ENST0"]
+
+
+def test_unknown_chromosome_is_empty(index):
+    assert len(index.query("chrY", 0, 1_000_000)) == 0
+
+
+def test_hits_and_extract_agree_with_query(index, gtf):
+    row = gtf[gtf.Feature == "transcript"].iloc[0]
+    interval = genome.Interval(row.Chromosome, int(row.Start), int(row.End))
+    hits = index.hits(interval)
+    assert np.all(np.diff(hits.start) >= 0)
+    assert sorted(hits.transcript_id) == _found(index, interval)
+    assert [t.transcript_id for t in index.extract(interval)] == list(
+        hits.transcript_id
+    )
+
+
+def test_exons_grouped_by_transcript(index, gtf):
+    exons = gtf[gtf.Feature == "exon"]
+    for i in range(0, len(index.transcript_id), 37):
+        starts, ends = index.exons(i)
+        expected = exons[exons.transcript_id == index.transcript_id[i]]
+        assert starts.tolist() == sorted(expected.Start.tolist())
+        assert np.all(ends > starts)